@@ -1,4 +1,9 @@
 import asyncio
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
 
 from aioch import Client  # type: ignore
 from asgiref.sync import async_to_sync  # type: ignore
@@ -9,8 +14,14 @@ from posthog.settings import (
     CLICKHOUSE,
     CLICKHOUSE_ASYNC,
     CLICKHOUSE_CA,
+    CLICKHOUSE_CONNECTIONS_MAX,
+    CLICKHOUSE_CONNECTIONS_MIN,
+    CLICKHOUSE_CONNECTIONS_PER_TEAM,
     CLICKHOUSE_DATABASE,
     CLICKHOUSE_HOST,
+    CLICKHOUSE_MAX_EXECUTION_TIME,
+    CLICKHOUSE_MAX_MEMORY_USAGE,
+    CLICKHOUSE_MAX_THREADS,
     CLICKHOUSE_PASSWORD,
     CLICKHOUSE_SECURE,
     CLICKHOUSE_VERIFY,
@@ -18,14 +29,78 @@ from posthog.settings import (
     TEST,
 )
 
+KILL_QUERIES_SQL = """
+KILL QUERY WHERE query_id LIKE %(query_id)s ASYNC
+"""
+
+# What the queries run in this context are for, eg the team and insight, see `query_tags`
+_query_tags: ContextVar[Dict[str, Any]] = ContextVar("clickhouse_query_tags", default={})
+
+_team_slots: Dict[int, threading.BoundedSemaphore] = {}
+_team_slots_lock = threading.Lock()
+
+
+@contextmanager
+def query_tags(**tags: Any) -> Iterator[None]:
+    """
+    Tags the queries run within, on top of the tags of outer contexts. Queries tagged with a `team_id` get the
+    query limits from settings and share the team's connections, `kind` and `client_query_id` end up in the query
+    ids, so that `cancel_queries` can find them.
+    """
+    token = _query_tags.set({**_query_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _query_tags.reset(token)
+
+
+def make_query_id() -> str:
+    # <team_id>:<kind>:<client_query_id>:<random>, tags that aren't set are left empty
+    tags = _query_tags.get()
+    return "{}:{}:{}:{}".format(
+        tags.get("team_id", ""), tags.get("kind", ""), tags.get("client_query_id", ""), uuid.uuid4().hex
+    )
+
+
+def query_settings(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    if "team_id" not in _query_tags.get():
+        # Eg ingestion and migrations, which shouldn't be cut off
+        return settings or {}
+    limits = {
+        "max_execution_time": CLICKHOUSE_MAX_EXECUTION_TIME,
+        "max_memory_usage": CLICKHOUSE_MAX_MEMORY_USAGE,
+        "max_threads": CLICKHOUSE_MAX_THREADS,
+    }
+    return {**{name: value for name, value in limits.items() if value}, **(settings or {})}
+
+
+@contextmanager
+def _team_slot() -> Iterator[None]:
+    team_id = _query_tags.get().get("team_id")
+    if team_id is None:
+        yield
+        return
+    with _team_slots_lock:
+        slot = _team_slots.setdefault(team_id, threading.BoundedSemaphore(CLICKHOUSE_CONNECTIONS_PER_TEAM))
+    with slot:
+        yield
+
+
+def cancel_queries(team_id: int, client_query_id: str) -> None:
+    """
+    Kills the team's queries that were run for this `client_query_id`, eg when the request they're for is abandoned.
+    """
+    sync_execute(KILL_QUERIES_SQL, {"query_id": "{}:%:{}:%".format(team_id, client_query_id)})
+
+
 if PRIMARY_DB != CLICKHOUSE:
     ch_client = None  # type: Client
     ch_sync_pool = None  # type: ChPool
 
-    def async_execute(query, args=None):
+    def async_execute(query, args=None, settings=None):
         return
 
-    def sync_execute(query, args=None):
+    def sync_execute(query, args=None, settings=None):
         return
 
 
@@ -41,9 +116,11 @@ else:
         )
 
         @async_to_sync
-        async def async_execute(query, args=None):
+        async def async_execute(query, args=None, settings=None):
             loop = asyncio.get_event_loop()
-            task = loop.create_task(ch_client.execute(query, args))
+            task = loop.create_task(
+                ch_client.execute(query, args, settings=query_settings(settings), query_id=make_query_id())
+            )
             return task
 
     else:
@@ -57,8 +134,8 @@ else:
             verify=CLICKHOUSE_VERIFY,
         )
 
-        def async_execute(query, args=None):
-            return sync_execute(query, args)
+        def async_execute(query, args=None, settings=None):
+            return sync_execute(query, args, settings)
 
     ch_sync_pool = ChPool(
         host=CLICKHOUSE_HOST,
@@ -67,11 +144,11 @@ else:
         password=CLICKHOUSE_PASSWORD,
         ca_certs=CLICKHOUSE_CA,
         verify=CLICKHOUSE_VERIFY,
-        connections_min=20,
-        connections_max=100,
+        connections_min=CLICKHOUSE_CONNECTIONS_MIN,
+        connections_max=CLICKHOUSE_CONNECTIONS_MAX,
     )
 
-    def sync_execute(query, args=None):
-        with ch_sync_pool.get_client() as client:
-            result = client.execute(query, args)
+    def sync_execute(query, args=None, settings=None):
+        with _team_slot(), ch_sync_pool.get_client() as client:
+            result = client.execute(query, args, settings=query_settings(settings), query_id=make_query_id())
         return result
@@ -0,0 +1,15 @@
+from infi.clickhouse_orm import migrations  # type: ignore
+
+from ee.clickhouse.sql.elements import (
+    ELEMENTS_CHAIN_TABLE_MV_SQL,
+    ELEMENTS_CHAIN_TABLE_SQL,
+    ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL,
+    KAFKA_ELEMENTS_CHAIN_TABLE_SQL,
+)
+
+operations = [
+    migrations.RunSQL(ELEMENTS_CHAIN_TABLE_SQL),
+    migrations.RunSQL(ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL),
+    migrations.RunSQL(KAFKA_ELEMENTS_CHAIN_TABLE_SQL),
+    migrations.RunSQL(ELEMENTS_CHAIN_TABLE_MV_SQL),
+]
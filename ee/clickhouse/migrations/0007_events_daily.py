@@ -0,0 +1,18 @@
+from infi.clickhouse_orm import migrations  # type: ignore
+
+from ee.clickhouse.sql.events import (
+    ATTACH_EVENTS_MV_SQL,
+    BACKFILL_EVENTS_DAILY_SQL,
+    DETACH_EVENTS_MV_SQL,
+    EVENTS_DAILY_MV_SQL,
+    EVENTS_DAILY_TABLE_SQL,
+)
+
+# Events aren't ingested while the existing ones are counted, they're consumed from Kafka once it's done
+operations = [
+    migrations.RunSQL(DETACH_EVENTS_MV_SQL),
+    migrations.RunSQL(EVENTS_DAILY_TABLE_SQL),
+    migrations.RunSQL(EVENTS_DAILY_MV_SQL),
+    migrations.RunSQL(BACKFILL_EVENTS_DAILY_SQL),
+    migrations.RunSQL(ATTACH_EVENTS_MV_SQL),
+]
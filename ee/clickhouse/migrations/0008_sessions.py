@@ -0,0 +1,6 @@
+from infi.clickhouse_orm import migrations  # type: ignore
+
+from ee.clickhouse.sql.sessions import SESSIONS_TABLE_SQL
+
+# The table is filled by the first `update_sessions`
+operations = [migrations.RunSQL(SESSIONS_TABLE_SQL)]
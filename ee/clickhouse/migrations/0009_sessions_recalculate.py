@@ -0,0 +1,5 @@
+from infi.clickhouse_orm import migrations  # type: ignore
+
+from ee.clickhouse.sql.sessions import SESSIONS_RECALCULATE_TABLE_SQL
+
+operations = [migrations.RunSQL(SESSIONS_RECALCULATE_TABLE_SQL)]
@@ -1,29 +1,38 @@
 import datetime
 import json
 from datetime import timezone
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from django.utils.timezone import now
 from rest_framework import serializers
 
 from ee.clickhouse.client import sync_execute
-from ee.clickhouse.sql.elements import GET_ALL_ELEMENTS_SQL, GET_ELEMENTS_BY_ELEMENTS_HASHES_SQL, INSERT_ELEMENTS_SQL
+from ee.clickhouse.sql.elements import (
+    GET_ALL_ELEMENTS_SQL,
+    GET_ELEMENTS_BY_ELEMENTS_HASHES_SQL,
+    INSERT_ELEMENTS_CHAIN_SQL,
+    INSERT_ELEMENTS_SQL,
+)
 from ee.kafka.client import ClickhouseProducer
-from ee.kafka.topics import KAFKA_ELEMENTS
+from ee.kafka.topics import KAFKA_ELEMENTS, KAFKA_ELEMENTS_CHAIN
 from posthog.cache import get_cached_value, set_cached_value
 from posthog.models.element import Element
 from posthog.models.element_group import hash_elements
 from posthog.models.team import Team
 from posthog.models.utils import UUIDT
+from posthog.settings import CLICKHOUSE_ELEMENTS_CHAIN
 
+# Elements hashes known to have been written, also kept in process so that repeated chains skip the Redis round-trip.
+# Written hashes are never removed from Redis, so the local copy can't go stale. Least recently used hashes come first
+_known_elements_hashes: Dict[Tuple[int, str], None] = {}
+KNOWN_ELEMENTS_HASHES_MAX_SIZE = 100000
 
-def create_element(
-    element: Element, team: Team, event_uuid: UUID, elements_hash: str, timestamp: Optional[datetime.datetime] = None,
-) -> None:
-    if not timestamp:
-        timestamp = now()
-    data = {
+
+def _element_data(
+    element: Element, team: Team, event_uuid: UUID, elements_hash: str, timestamp: datetime.datetime
+) -> Dict[str, Any]:
+    return {
         "uuid": str(UUIDT()),
         "event_uuid": str(event_uuid),
         "created_at": timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
@@ -39,6 +48,55 @@ def create_element(
         "team_id": team.pk,
         "elements_hash": elements_hash,
     }
+
+
+def _elements_chain_data(
+    elements: List[Element], team: Team, event_uuid: UUID, elements_hash: str, timestamp: datetime.datetime
+) -> Dict[str, Any]:
+    # The whole chain as one row, with a column per element field
+    return {
+        "event_uuid": str(event_uuid),
+        "created_at": timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        "texts": [element.text or "" for element in elements],
+        "tag_names": [element.tag_name or "" for element in elements],
+        "hrefs": [element.href or "" for element in elements],
+        "attr_ids": [element.attr_id or "" for element in elements],
+        "attr_classes": [element.attr_class or [] for element in elements],
+        "nth_childs": [element.nth_child or 0 for element in elements],
+        "nth_of_types": [element.nth_of_type or 0 for element in elements],
+        "attributes_list": [json.dumps(element.attributes or {}) for element in elements],
+        "orders": [element.order or 0 for element in elements],
+        "team_id": team.pk,
+        "elements_hash": elements_hash,
+    }
+
+
+def _remember_elements_hash(team_id: int, elements_hash: str) -> None:
+    _known_elements_hashes.pop((team_id, elements_hash), None)
+    _known_elements_hashes[(team_id, elements_hash)] = None
+    if len(_known_elements_hashes) > KNOWN_ELEMENTS_HASHES_MAX_SIZE:
+        _known_elements_hashes.pop(next(iter(_known_elements_hashes)))
+
+
+def _elements_hash_known(team_id: int, elements_hash: str) -> bool:
+    if (team_id, elements_hash) not in _known_elements_hashes and not get_cached_value(
+        team_id, "elements/{}".format(elements_hash)
+    ):
+        return False
+    _remember_elements_hash(team_id, elements_hash)
+    return True
+
+
+def clear_known_elements_hashes() -> None:
+    _known_elements_hashes.clear()
+
+
+def create_element(
+    element: Element, team: Team, event_uuid: UUID, elements_hash: str, timestamp: Optional[datetime.datetime] = None,
+) -> None:
+    if not timestamp:
+        timestamp = now()
+    data = _element_data(element, team, event_uuid, elements_hash, timestamp)
     p = ClickhouseProducer()
     p.produce(topic=KAFKA_ELEMENTS, sql=INSERT_ELEMENTS_SQL, data=data)
 
@@ -49,17 +107,25 @@ def create_elements(event_uuid: UUID, elements: List[Element], team: Team, use_c
         element.order = index
     elements_hash = hash_elements(elements)
 
-    if use_cache and get_cached_value(team.pk, "elements/{}".format(elements_hash)):
+    if use_cache and _elements_hash_known(team.pk, elements_hash):
         return elements_hash
 
     # create elements
-    for index, element in enumerate(elements):
-        create_element(
-            element=element, team=team, event_uuid=event_uuid, elements_hash=elements_hash,
+    timestamp = now()
+    p = ClickhouseProducer()
+    if CLICKHOUSE_ELEMENTS_CHAIN:
+        data = _elements_chain_data(elements, team, event_uuid, elements_hash, timestamp)
+        p.produce(topic=KAFKA_ELEMENTS_CHAIN, sql=INSERT_ELEMENTS_CHAIN_SQL, data=data)
+    else:
+        p.produce_many(
+            topic=KAFKA_ELEMENTS,
+            sql=INSERT_ELEMENTS_SQL,
+            data=[_element_data(element, team, event_uuid, elements_hash, timestamp) for element in elements],
         )
 
     if use_cache:
         set_cached_value(team.pk, "elements/{}".format(elements_hash), "1")
+        _remember_elements_hash(team.pk, elements_hash)
 
     return elements_hash
 
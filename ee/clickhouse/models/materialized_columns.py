@@ -0,0 +1,65 @@
+import re
+import time
+from typing import Dict, Optional
+
+from ee.clickhouse.client import sync_execute
+from ee.clickhouse.sql.events import (
+    ADD_MATERIALIZED_COLUMN_SQL,
+    GET_MATERIALIZED_COLUMNS_SQL,
+    MATERIALIZED_COLUMN_COMMENT,
+)
+from posthog.settings import CLICKHOUSE_DATABASE
+
+# Columns are added by a management command, so other processes pick them up after at most this long
+MATERIALIZED_COLUMNS_CACHE_SECONDS = 15 * 60
+
+# property -> column on events holding the raw JSON value of that property, '' if the event doesn't have it
+MATERIALIZED_COLUMNS_CACHE: Dict[str, str] = {}
+_cache_loaded_at: Optional[float] = None
+
+
+def get_materialized_columns(use_cache: bool = True) -> Dict[str, str]:
+    global _cache_loaded_at
+    if (
+        use_cache
+        and _cache_loaded_at is not None
+        and time.monotonic() - _cache_loaded_at < MATERIALIZED_COLUMNS_CACHE_SECONDS
+    ):
+        return MATERIALIZED_COLUMNS_CACHE
+
+    rows = sync_execute(GET_MATERIALIZED_COLUMNS_SQL, {"database": CLICKHOUSE_DATABASE}) or []
+    prefix = MATERIALIZED_COLUMN_COMMENT.format(property="")
+    MATERIALIZED_COLUMNS_CACHE.clear()
+    MATERIALIZED_COLUMNS_CACHE.update({comment[len(prefix) :]: column for column, comment in rows})
+    _cache_loaded_at = time.monotonic()
+    return MATERIALIZED_COLUMNS_CACHE
+
+
+def clear_materialized_columns_cache() -> None:
+    global _cache_loaded_at
+    MATERIALIZED_COLUMNS_CACHE.clear()
+    _cache_loaded_at = None
+
+
+def materialize(property: str) -> str:
+    """
+    Adds a column to events with the value of `property`, in the same raw JSON format as events_properties_view.
+    Existing parts compute the column when it's read until they're merged, new events store it on insert.
+    """
+    materialized_columns = get_materialized_columns(use_cache=False)
+    if property in materialized_columns:
+        return materialized_columns[property]
+
+    # Different properties can have the same name once sanitized
+    column = base_column = "mat_{}".format(re.sub(r"[^a-zA-Z0-9_]", "_", property))
+    suffix = 1
+    while column in materialized_columns.values():
+        column = "{}_{}".format(base_column, suffix)
+        suffix += 1
+
+    sync_execute(
+        ADD_MATERIALIZED_COLUMN_SQL.format(column=column),
+        {"property": property, "comment": MATERIALIZED_COLUMN_COMMENT.format(property=property)},
+    )
+    clear_materialized_columns_cache()
+    return column
@@ -13,7 +13,6 @@ from ee.clickhouse.sql.person import (
     DELETE_PERSON_BY_ID,
     DELETE_PERSON_DISTINCT_ID_BY_PERSON_ID,
     GET_DISTINCT_IDS_SQL,
-    GET_DISTINCT_IDS_SQL_BY_ID,
     GET_PERSON_BY_DISTINCT_ID,
     GET_PERSON_SQL,
     GET_PERSONS_BY_DISTINCT_IDS,
@@ -21,7 +20,7 @@ from ee.clickhouse.sql.person import (
     INSERT_PERSON_SQL,
     PERSON_DISTINCT_ID_EXISTS_SQL,
     PERSON_EXISTS_SQL,
-    UPDATE_PERSON_ATTACHED_DISTINCT_ID,
+    UPDATE_PERSON_DISTINCT_IDS_PERSON_ID,
     UPDATE_PERSON_IS_IDENTIFIED,
     UPDATE_PERSON_PROPERTIES,
 )
@@ -166,17 +165,11 @@ def merge_people(team_id: int, target: Dict, old_id: int, old_props: Dict) -> No
 
     update_person_properties(team_id=team_id, id=target["id"], properties=properties)
 
-    other_person_distinct_ids = sync_execute(
-        GET_DISTINCT_IDS_SQL_BY_ID, {"person_id": old_id, "team_id": target["team_id"]}
+    # One mutation for all of the old person's distinct ids, mutations of a table are applied in order so the
+    # distinct ids are moved before the old person's are deleted
+    sync_execute(
+        UPDATE_PERSON_DISTINCT_IDS_PERSON_ID, {"person_id": target["id"], "team_id": team_id, "old_person_id": old_id},
     )
-
-    parsed_other_person_distinct_ids = ClickhousePersonDistinctIdSerializer(other_person_distinct_ids, many=True).data
-
-    for person_distinct_id in parsed_other_person_distinct_ids:
-        sync_execute(
-            UPDATE_PERSON_ATTACHED_DISTINCT_ID,
-            {"person_id": target["id"], "distinct_id": person_distinct_id["distinct_id"]},
-        )
     delete_person(old_id)
 
 
@@ -2,6 +2,7 @@ from typing import Dict, List, Optional, Tuple
 
 from ee.clickhouse.client import sync_execute
 from ee.clickhouse.models.cohort import format_cohort_table_name
+from ee.clickhouse.models.materialized_columns import get_materialized_columns
 from ee.clickhouse.sql.cohort import COHORT_DISTINCT_ID_FILTER_SQL
 from ee.clickhouse.sql.events import EVENT_PROP_CLAUSE, SELECT_PROP_VALUES_SQL, SELECT_PROP_VALUES_SQL_WITH_FILTER
 from ee.clickhouse.sql.person import GET_DISTINCT_IDS_BY_PROPERTY_SQL
@@ -10,9 +11,16 @@ from posthog.models.property import Property
 from posthog.models.team import Team
 
 
-def parse_prop_clauses(key: str, filters: List[Property], team: Team, prepend: str = "") -> Tuple[str, Dict]:
+def parse_prop_clauses(
+    key: str, filters: List[Property], team: Team, prepend: str = "", allow_denormalized_props: bool = False
+) -> Tuple[str, Dict]:
+    """
+    With `allow_denormalized_props` event properties that have a materialized column are filtered on that column,
+    only pass it when the clauses end up in a query on the events table.
+    """
     final = ""
     params = {}
+    materialized_columns = get_materialized_columns() if allow_denormalized_props else {}
 
     for idx, prop in enumerate(filters):
 
@@ -32,6 +40,13 @@ def parse_prop_clauses(key: str, filters: List[Property], team: Team, prepend: s
                 {"k{}_{}".format(prepend, idx): prop.key, "v{}_{}".format(prepend, idx): _pad_value(prop.value)}
             )
 
+        elif prop.key in materialized_columns:
+            column = materialized_columns[prop.key]
+            final += "AND {column} != '' AND {column} {operator} %(v{prepend}_{idx})s ".format(
+                column=column, operator=get_operator(prop.operator), prepend=prepend, idx=idx
+            )
+            params.update({"v{}_{}".format(prepend, idx): _pad_value(prop.value)})
+
         else:
             filter = "(ep.key = %(k{prepend}_{idx})s) AND (ep.value {operator} %(v{prepend}_{idx})s)".format(
                 idx=idx, operator=get_operator(prop.operator), prepend=prepend
@@ -0,0 +1,56 @@
+import logging
+import time
+
+from django.core.cache import cache
+
+from ee.clickhouse.client import sync_execute
+from ee.clickhouse.sql.sessions import (
+    CLOSE_SESSIONS_SQL,
+    DELETE_RECALCULATED_SESSIONS_SQL,
+    GET_SESSIONS_UPDATED_AT_SQL,
+    INSERT_RECALCULATED_SESSIONS_SQL,
+    INSERT_SESSIONS_RECALCULATE_SQL,
+    TRUNCATE_SESSIONS_RECALCULATE_SQL,
+)
+
+# Events are ingested a while after Kafka timestamps them, so events from just before the last update are looked at again
+SESSIONS_INGESTION_LAG_SECONDS = 10 * 60
+# Sessions are updated by one worker at a time, the lock only expires in case that worker died
+SESSIONS_UPDATE_LOCK_KEY = "update_sessions_lock"
+SESSIONS_UPDATE_LOCK_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def update_sessions() -> None:
+    """
+    Adds the events ingested since the last update to the sessions table, extending, merging and splitting the stored
+    sessions of their distinct ids where needed, and closes sessions that have been inactive for longer than the session
+    timeout. The first update calculates all sessions. Skipped while another update is running.
+    """
+    if not cache.add(SESSIONS_UPDATE_LOCK_KEY, True, SESSIONS_UPDATE_LOCK_TIMEOUT):
+        logger.info("Sessions are still being updated, skipping the update")
+        return
+    try:
+        _update_sessions()
+    finally:
+        cache.delete(SESSIONS_UPDATE_LOCK_KEY)
+
+
+def _update_sessions() -> None:
+    updated_at, until = sync_execute(GET_SESSIONS_UPDATED_AT_SQL)[0]
+    since = max(updated_at - SESSIONS_INGESTION_LAG_SECONDS, 0)
+    params = {
+        "since": since,
+        "until": until,
+        # Later updates win, and within an update recalculated sessions win over the deleted ones with the same key,
+        # closed sessions over both
+        "version": int(time.time() * 1000000) * 3,
+    }
+    sync_execute(TRUNCATE_SESSIONS_RECALCULATE_SQL)
+    sync_execute(INSERT_SESSIONS_RECALCULATE_SQL, params)
+    # Deleting first would lose where the stored sessions started, so recalculated sessions are inserted first and
+    # then stored sessions from the same start onwards are deleted, which the recalculated ones outrank
+    sync_execute(INSERT_RECALCULATED_SESSIONS_SQL, params)
+    sync_execute(DELETE_RECALCULATED_SESSIONS_SQL, params)
+    sync_execute(CLOSE_SESSIONS_SQL, params)
@@ -1,5 +1,12 @@
+from unittest.mock import patch
+
 from ee.clickhouse.client import sync_execute
-from ee.clickhouse.models.element import create_elements, get_all_elements, get_elements_by_elements_hash
+from ee.clickhouse.models.element import (
+    _elements_hash_known,
+    create_elements,
+    get_all_elements,
+    get_elements_by_elements_hash,
+)
 from ee.clickhouse.util import ClickhouseTestMixin
 from posthog.api.test.base import BaseTest
 from posthog.models import Element
@@ -86,3 +93,47 @@ class TestClickhouseElement(ClickhouseTestMixin, BaseTest):
         )
 
         self.assertEqual(len(get_all_elements()), 4)
+
+    @patch("ee.clickhouse.models.element.CLICKHOUSE_ELEMENTS_CHAIN", True)
+    def test_create_elements_chain(self) -> None:
+        elements_hash = create_elements(
+            event_uuid=UUIDT(),
+            team=self.team,
+            elements=[
+                Element(
+                    tag_name="a",
+                    href="/a-url",
+                    nth_child=1,
+                    nth_of_type=0,
+                    attr_class=["btn"],
+                    attributes={"attr__data-attr": "link"},
+                ),
+                Element(tag_name="div", nth_child=0, nth_of_type=0, attr_id="nested"),
+            ],
+            use_cache=False,
+        )
+
+        self.assertEqual(sync_execute("SELECT count(*) FROM elements_chain")[0][0], 1)
+        elements = get_elements_by_elements_hash(elements_hash=elements_hash, team_id=self.team.pk)
+        self.assertEqual([element["tag_name"] for element in elements], ["a", "div"])
+        self.assertEqual([element["order"] for element in elements], [0, 1])
+        self.assertEqual(elements[0]["attr_class"], ["btn"])
+        self.assertEqual(elements[1]["attr_id"], "nested")
+        self.assertEqual(elements[0]["attributes"], {"attr__data-attr": "link"})
+
+    def test_create_elements_remembers_hashes_in_process(self) -> None:
+        elements = [Element(tag_name="a", href="/a-url"), Element(tag_name="div")]
+        create_elements(event_uuid=UUIDT(), team=self.team, elements=elements)
+
+        with patch("ee.clickhouse.models.element.get_cached_value") as patch_get_cached_value:
+            create_elements(event_uuid=UUIDT(), team=self.team, elements=elements)
+            patch_get_cached_value.assert_not_called()
+        self.assertEqual(len(get_all_elements(final=True)), 2)
+
+    @patch("ee.clickhouse.models.element.KNOWN_ELEMENTS_HASHES_MAX_SIZE", 1)
+    def test_forgotten_hashes_fall_back_to_redis(self) -> None:
+        elements_hash = create_elements(event_uuid=UUIDT(), team=self.team, elements=[Element(tag_name="a")])
+        create_elements(event_uuid=UUIDT(), team=self.team, elements=[Element(tag_name="div")])
+
+        self.assertTrue(_elements_hash_known(self.team.pk, elements_hash))
+        self.assertFalse(_elements_hash_known(self.team.pk, "missing"))
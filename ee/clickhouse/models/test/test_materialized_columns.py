@@ -0,0 +1,48 @@
+from uuid import uuid4
+
+from freezegun import freeze_time
+
+from ee.clickhouse.models.event import create_event
+from ee.clickhouse.models.materialized_columns import get_materialized_columns, materialize
+from ee.clickhouse.queries.clickhouse_trends import ClickhouseTrends
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.api.test.base import BaseTest
+from posthog.models.filter import Filter
+
+
+class TestMaterializedColumns(ClickhouseTestMixin, BaseTest):
+    def _create_events(self):
+        for browser in ["Chrome", "Chrome", "Safari", None]:
+            create_event(
+                event_uuid=uuid4(),
+                event="$pageview",
+                team=self.team,
+                distinct_id="whatever",
+                properties={"$browser": browser} if browser else {},
+            )
+
+    def _run(self, data):
+        return ClickhouseTrends().run(
+            Filter(data={"date_from": "-7d", "events": [{"id": "$pageview"}], **data}), self.team
+        )
+
+    def test_materialize(self):
+        self.assertEqual(materialize("$browser"), "mat__browser")
+        self.assertEqual(materialize("$browser"), "mat__browser")
+        self.assertEqual(materialize("_browser"), "mat__browser_1")
+        self.assertEqual(get_materialized_columns(), {"$browser": "mat__browser", "_browser": "mat__browser_1"})
+
+    def test_trends_use_materialized_column(self):
+        with freeze_time("2020-01-04T13:01:01Z"):
+            self._create_events()
+            filtered = self._run({"properties": [{"key": "$browser", "value": "Chrome"}]})
+            breakdown = self._run({"breakdown": "$browser"})
+
+            materialize("$browser")
+            self.assertEqual(self._run({"properties": [{"key": "$browser", "value": "Chrome"}]}), filtered)
+            self.assertEqual(self._run({"breakdown": "$browser"}), breakdown)
+
+        self.assertEqual(filtered[0]["count"], 2)
+        self.assertEqual(
+            sorted((result["breakdown_value"], result["count"]) for result in breakdown), [("Chrome", 2), ("Safari", 1)]
+        )
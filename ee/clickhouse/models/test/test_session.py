@@ -0,0 +1,79 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from ee.clickhouse.client import sync_execute
+from ee.clickhouse.models.event import create_event
+from ee.clickhouse.models.session import SESSIONS_UPDATE_LOCK_KEY, update_sessions
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.api.test.base import BaseTest
+
+
+class TestClickhouseSession(ClickhouseTestMixin, BaseTest):
+    def _create_event(self, distinct_id: str, minutes_ago: int, url: str = "") -> None:
+        create_event(
+            event_uuid=uuid4(),
+            event="$pageview",
+            team=self.team,
+            distinct_id=distinct_id,
+            timestamp=self.now - timedelta(minutes=minutes_ago),
+            properties={"$current_url": url} if url else {},
+        )
+
+    def _sessions(self):
+        return sync_execute(
+            """
+            SELECT distinct_id, duration_seconds, event_count, first_url, last_url, is_closed
+            FROM sessions FINAL
+            WHERE team_id = %(team_id)s AND NOT is_deleted
+            ORDER BY distinct_id, session_start
+            """,
+            {"team_id": self.team.pk},
+        )
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.now = timezone.now().replace(microsecond=0)
+
+    def test_update_sessions(self) -> None:
+        self._create_event("1", 120, "/start")
+        self._create_event("1", 110)
+        self._create_event("1", 100, "/end")
+        self._create_event("1", 10, "/later")
+        self._create_event("2", 5, "/open")
+
+        update_sessions()
+
+        self.assertEqual(
+            self._sessions(),
+            [("1", 1200, 3, "/start", "/end", 1), ("1", 0, 1, "/later", "/later", 0), ("2", 0, 1, "/open", "/open", 0)],
+        )
+
+    def test_update_sessions_with_new_events(self) -> None:
+        self._create_event("1", 120, "/start")
+        self._create_event("1", 70, "/middle")
+        self._create_event("1", 10, "/later")
+        update_sessions()
+
+        # Extends the last session, and bridges the gap between the first two
+        self._create_event("1", 5, "/latest")
+        self._create_event("1", 95)
+        update_sessions()
+
+        self.assertEqual(
+            self._sessions(), [("1", 3000, 3, "/start", "/middle", 1), ("1", 300, 2, "/later", "/latest", 0)],
+        )
+
+    def test_update_sessions_skipped_while_another_update_runs(self) -> None:
+        self._create_event("1", 5, "/open")
+        cache.set(SESSIONS_UPDATE_LOCK_KEY, True)
+        try:
+            update_sessions()
+        finally:
+            cache.delete(SESSIONS_UPDATE_LOCK_KEY)
+        self.assertEqual(self._sessions(), [])
+
+        update_sessions()
+        self.assertEqual(self._sessions(), [("1", 0, 1, "/open", "/open", 0)])
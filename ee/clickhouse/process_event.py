@@ -1,8 +1,9 @@
 import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from celery import shared_task
+from sentry_sdk import capture_exception
 
 from ee.clickhouse.models.element import create_elements
 from ee.clickhouse.models.event import create_event
@@ -11,7 +12,12 @@ from posthog.ee import check_ee_enabled
 from posthog.models.element import Element
 from posthog.models.team import Team
 from posthog.models.utils import UUIDT
-from posthog.tasks.process_event import handle_timestamp, store_names_and_properties
+from posthog.tasks.event_definitions import flush_event_definitions_if_due, store_names_and_properties
+from posthog.tasks.process_event import handle_timestamp
+
+
+def _get_team_for_capture_ee(team_id: int) -> Team:
+    return Team.objects.only("slack_incoming_webhook", "anonymize_ips").get(pk=team_id)
 
 
 def _capture_ee(
@@ -24,6 +30,7 @@ def _capture_ee(
     distinct_id: str,
     properties: Dict,
     timestamp: datetime.datetime,
+    team: Optional[Team] = None,
 ) -> None:
     elements = properties.get("$elements")
     elements_list = []
@@ -43,15 +50,12 @@ def _capture_ee(
             for index, el in enumerate(elements)
         ]
 
-    team = Team.objects.only("slack_incoming_webhook", "event_names", "event_properties", "anonymize_ips").get(
-        pk=team_id
-    )
+    if team is None:
+        team = _get_team_for_capture_ee(team_id)
 
     if not team.anonymize_ips and "$ip" not in properties:
         properties["$ip"] = ip
 
-    store_names_and_properties(team=team, event=event, properties=properties)
-
     # determine/create elements
     elements_hash = create_elements(event_uuid=event_uuid, elements=elements_list, team=team)
 
@@ -73,13 +77,21 @@ def _capture_ee(
         timestamp=timestamp,
         properties=properties,
     )
+    store_names_and_properties(team=team, event=event, properties=properties)
+    flush_event_definitions_if_due()
 
 
 if check_ee_enabled():
 
-    @shared_task
-    def process_event_ee(
-        distinct_id: str, ip: str, site_url: str, data: dict, team_id: int, now: str, sent_at: Optional[str],
+    def _process_event_ee(
+        distinct_id: str,
+        ip: str,
+        site_url: str,
+        data: dict,
+        team_id: int,
+        now: str,
+        sent_at: Optional[str],
+        team: Optional[Team] = None,
     ) -> None:
         properties = data.get("properties", None)
         person_uuid = UUIDT()
@@ -143,8 +155,37 @@ if check_ee_enabled():
             distinct_id=distinct_id,
             properties=properties,
             timestamp=ts,
+            team=team,
+        )
+
+    @shared_task
+    def process_event_ee(
+        distinct_id: str, ip: str, site_url: str, data: dict, team_id: int, now: str, sent_at: Optional[str],
+    ) -> None:
+        _process_event_ee(
+            distinct_id=distinct_id, ip=ip, site_url=site_url, data=data, team_id=team_id, now=now, sent_at=sent_at,
         )
 
+    @shared_task
+    def process_event_ee_batch(
+        events: List[Dict], ip: str, site_url: str, team_id: int, now: str, sent_at: Optional[str],
+    ) -> None:
+        team = _get_team_for_capture_ee(team_id)
+        for event in events:
+            try:
+                _process_event_ee(
+                    distinct_id=event["distinct_id"],
+                    ip=ip,
+                    site_url=site_url,
+                    data=event["data"],
+                    team_id=team_id,
+                    now=now,
+                    sent_at=sent_at,
+                    team=team,
+                )
+            except Exception as e:
+                capture_exception(e)
+
 
 else:
 
@@ -152,3 +193,8 @@ else:
     def process_event_ee(*args, **kwargs) -> None:
         # Noop if ee is not enabled
         return
+
+    @shared_task
+    def process_event_ee_batch(*args, **kwargs) -> None:
+        # Noop if ee is not enabled
+        return
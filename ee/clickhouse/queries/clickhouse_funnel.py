@@ -1,7 +1,7 @@
 from collections import namedtuple
 from typing import Any, Dict, List, Tuple
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import query_tags, sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.util import parse_timestamps
@@ -119,7 +119,8 @@ class ClickhouseFunnel(Funnel):
         return sync_execute(query, self.params)
 
     def run(self, *args, **kwargs) -> List[Dict[str, Any]]:
-        results = self._exec_query()
+        with query_tags(team_id=self._team.pk, kind="funnel"):
+            results = self._exec_query()
         if len(results) == 0:
             return []
         width = len(results[0])  # the three
@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import query_tags, sync_execute
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.util import parse_timestamps
 from posthog.constants import AUTOCAPTURE_EVENT, CUSTOM_EVENT, SCREEN_EVENT
@@ -223,4 +223,5 @@ class ClickhousePaths(BaseQuery):
         return resp
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
-        return self.calculate_paths(filter=filter, team=team)
+        with query_tags(team_id=team.pk, kind="paths"):
+            return self.calculate_paths(filter=filter, team=team)
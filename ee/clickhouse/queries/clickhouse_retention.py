@@ -4,7 +4,7 @@ from typing import Any, Dict, List, Tuple, Union
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import query_tags, sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.sql.retention import RETENTION_SQL
@@ -103,4 +103,5 @@ class ClickhouseRetention(BaseQuery):
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
         total_intervals = kwargs.get("total_intervals", 11)
-        return self.calculate_retention(filter, team, total_intervals)
+        with query_tags(team_id=team.pk, kind="retention"):
+            return self.calculate_retention(filter, team, total_intervals)
@@ -1,15 +1,26 @@
-from typing import Any, Dict, List, Tuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytz
 
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import query_tags, sync_execute
 from ee.clickhouse.models.element import get_elements_by_elements_hashes
 from ee.clickhouse.models.event import ClickhouseEventSerializer
 from ee.clickhouse.models.person import get_persons_by_distinct_ids
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.util import get_interval_annotation_ch, get_time_diff, parse_timestamps
 from ee.clickhouse.sql.events import GET_EARLIEST_TIMESTAMP_SQL, NULL_SQL
+from ee.clickhouse.sql.sessions import (
+    SESSION_EVENTS_CONDITION_SQL,
+    SESSIONS_CURSOR_HAVING_SQL,
+    SESSIONS_LIST_CURSOR_SQL,
+    SESSIONS_DURATION_SQL,
+    SESSIONS_LIST_EVENTS_SQL,
+    SESSIONS_LIST_SQL,
+)
 from posthog.constants import SESSION_AVG, SESSION_DIST
 from posthog.models.filter import Filter
 from posthog.models.team import Team
@@ -210,34 +221,101 @@ DIST_SQL = """
         countIf(session_duration_seconds > 3600)  as tenth
     FROM 
         ({sessions})
-""".format(
-    sessions=SESSIONS_NO_EVENTS_SQL
-)
+"""
 
 # TODO: handle date and defaults
 class ClickhouseSessions(BaseQuery):
-    def calculate_list(self, filter: Filter, team: Team, limit: int, offset: int):
-        filters, params = parse_prop_clauses("uuid", filter.properties, team)
-
+    def calculate_list(
+        self, filter: Filter, team: Team, limit: int, offset: int, cursor: Optional[Tuple[datetime, str]] = None
+    ):
         if not filter._date_from:
             filter._date_from = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
         if not filter._date_to and filter.date_from:
             filter._date_to = filter.date_from + relativedelta(days=1)
 
+        if filter.properties:
+            result = self._calculate_list_from_events(filter, team, limit, offset, cursor)
+        else:
+            result = self._calculate_list_from_sessions(filter, team, limit, offset, cursor)
+
+        self._add_elements(team, result)
+        self._add_person_properties(team, result)
+
+        return result
+
+    def _calculate_list_from_events(
+        self, filter: Filter, team: Team, limit: int, offset: int, cursor: Optional[Tuple[datetime, str]]
+    ):
+        # Property filters leave out events, which can split sessions, so these are sessionized from the matching events
+        filters, params = parse_prop_clauses("uuid", filter.properties, team)
+
         date_from, date_to = parse_timestamps(filter)
-        params = {**params, "team_id": team.pk, "limit": limit, "offset": offset}
+        params = {**params, "team_id": team.pk, "limit": limit, "offset": offset, **_cursor_params(cursor)}
         query = SESSION_SQL.format(
             date_from=date_from,
             date_to=date_to,
-            filters="{}".format(filters) if filter.properties else "",
-            sessions_limit="LIMIT %(offset)s, %(limit)s",
+            filters=filters,
+            sessions_limit="{} ORDER BY start_time DESC, distinct_id DESC LIMIT %(offset)s, %(limit)s".format(
+                SESSIONS_CURSOR_HAVING_SQL if cursor else ""
+            ),
         )
         query_result = sync_execute(query, params)
-        result = self._parse_list_results(query_result)
+        return self._parse_list_results(query_result)
+
+    def _calculate_list_from_sessions(
+        self, filter: Filter, team: Team, limit: int, offset: int, cursor: Optional[Tuple[datetime, str]]
+    ):
+        date_from, date_to = parse_timestamps(filter, column="session_start")
+        sessions = sync_execute(
+            SESSIONS_LIST_SQL.format(
+                date_from=date_from, date_to=date_to, cursor=SESSIONS_LIST_CURSOR_SQL if cursor else ""
+            ),
+            {"team_id": team.pk, "limit": limit, "offset": offset, **_cursor_params(cursor)},
+        )
+        if not sessions:
+            return []
 
-        self._add_elements(team, result)
-        self._add_person_properties(team, result)
+        # Timestamps are passed to ClickHouse in whole seconds, and sessions are at least the timeout apart
+        bounds = [
+            (distinct_id, start.replace(microsecond=0), end.replace(microsecond=0) + timedelta(seconds=1))
+            for distinct_id, start, end, _ in sessions
+        ]
+        params: Dict[str, Any] = {"team_id": team.pk}
+        for index, (distinct_id, start, end) in enumerate(bounds):
+            params["distinct_id_{}".format(index)] = distinct_id
+            params["start_{}".format(index)] = start
+            params["end_{}".format(index)] = end
+        events = sync_execute(
+            SESSIONS_LIST_EVENTS_SQL.format(
+                sessions=" OR ".join(SESSION_EVENTS_CONDITION_SQL.format(index=index) for index in range(len(bounds)))
+            ),
+            params,
+        )
 
+        events_by_distinct_id: Dict[str, List[Tuple]] = {}
+        for event in events:
+            events_by_distinct_id.setdefault(event[4], []).append(event)
+
+        result = []
+        for index, ((distinct_id, start, end), session) in enumerate(zip(bounds, sessions)):
+            session_events = [
+                ClickhouseEventSerializer(
+                    [uuid, event, properties, timestamp, None, distinct_id, elements_hash, None, None], many=False
+                ).data
+                for uuid, event, properties, timestamp, _, elements_hash in events_by_distinct_id.get(distinct_id, [])
+                if start <= timestamp < end
+            ]
+            result.append(
+                {
+                    "distinct_id": distinct_id,
+                    "global_session_id": offset + index + 1,
+                    "length": session[3],
+                    "start_time": session[1],
+                    "event_count": len(session_events),
+                    "events": session_events,
+                    "properties": {},
+                }
+            )
         return result
 
     def _parse_list_results(self, results: List[Tuple]):
@@ -317,21 +395,24 @@ class ClickhouseSessions(BaseQuery):
             if distinct_to_person.get(session["distinct_id"], None):
                 session["properties"] = distinct_to_person[session["distinct_id"]]["properties"]
 
-    def calculate_avg(self, filter: Filter, team: Team):
-        parsed_date_from, parsed_date_to = parse_timestamps(filter)
+    def _sessions_query(self, filter: Filter, team: Team) -> Tuple[str, Dict[str, Any]]:
+        # The start and duration of sessions, calculated from the events matching the property filters if there are any
+        if not filter.properties:
+            parsed_date_from, parsed_date_to = parse_timestamps(filter, column="session_start")
+            return SESSIONS_DURATION_SQL.format(date_from=parsed_date_from, date_to=parsed_date_to), {}
 
+        parsed_date_from, parsed_date_to = parse_timestamps(filter)
         filters, params = parse_prop_clauses("uuid", filter.properties, team)
+        query = SESSIONS_NO_EVENTS_SQL.format(
+            date_from=parsed_date_from, date_to=parsed_date_to, filters=filters, sessions_limit="",
+        )
+        return query, params
 
+    def calculate_avg(self, filter: Filter, team: Team):
         interval_notation = get_interval_annotation_ch(filter.interval)
         num_intervals, seconds_in_interval = get_time_diff(filter.interval or "day", filter.date_from, filter.date_to)
 
-        avg_query = SESSIONS_NO_EVENTS_SQL.format(
-            team_id=team.pk,
-            date_from=parsed_date_from,
-            date_to=parsed_date_to,
-            filters="{}".format(filters) if filter.properties else "",
-            sessions_limit="",
-        )
+        avg_query, params = self._sessions_query(filter, team)
         per_period_query = AVERAGE_PER_PERIOD_SQL.format(sessions=avg_query, interval=interval_notation)
 
         null_sql = NULL_SQL.format(
@@ -378,17 +459,8 @@ class ClickhouseSessions(BaseQuery):
         return time_series_data
 
     def calculate_dist(self, filter: Filter, team: Team):
-
-        parsed_date_from, parsed_date_to = parse_timestamps(filter)
-
-        filters, params = parse_prop_clauses("uuid", filter.properties, team)
-        dist_query = DIST_SQL.format(
-            team_id=team.pk,
-            date_from=parsed_date_from,
-            date_to=parsed_date_to,
-            filters="{}".format(filters) if filter.properties else "",
-            sessions_limit="",
-        )
+        sessions_query, params = self._sessions_query(filter, team)
+        dist_query = DIST_SQL.format(sessions=sessions_query)
 
         params = {**params, "team_id": team.pk}
 
@@ -412,30 +484,42 @@ class ClickhouseSessions(BaseQuery):
         return res
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
-        limit = kwargs.get("limit", SESSIONS_LIST_DEFAULT_LIMIT)
-        offset = kwargs.get("offset", 0)
-
-        result: List = []
-        if filter.session_type == SESSION_AVG:
-
-            if filter.compare:
-                current_response = self.calculate_avg(filter, team)
-                parsed_response = convert_to_comparison(current_response, "current", filter)
-                result.extend(parsed_response)
-
-                compared_filter = determine_compared_filter(filter)
-                compared_result = self.calculate_avg(compared_filter, team)
-                compared_res = convert_to_comparison(compared_result, "previous", filter)
-                result.extend(compared_res)
+        with query_tags(team_id=team.pk, kind="sessions"):
+            limit = kwargs.get("limit", SESSIONS_LIST_DEFAULT_LIMIT)
+            offset = kwargs.get("offset", 0)
+            cursor = kwargs.get("cursor")
+
+            result: List = []
+            if filter.session_type == SESSION_AVG:
+
+                if filter.compare:
+                    current_response = self.calculate_avg(filter, team)
+                    parsed_response = convert_to_comparison(current_response, "current", filter)
+                    result.extend(parsed_response)
+
+                    compared_filter = determine_compared_filter(filter)
+                    compared_result = self.calculate_avg(compared_filter, team)
+                    compared_res = convert_to_comparison(compared_result, "previous", filter)
+                    result.extend(compared_res)
+                else:
+                    result = self.calculate_avg(filter, team)
+
+            elif filter.session_type == SESSION_DIST:
+                result = self.calculate_dist(filter, team)
             else:
-                result = self.calculate_avg(filter, team)
+                result = self.calculate_list(filter, team, limit, offset, cursor)
 
-        elif filter.session_type == SESSION_DIST:
-            result = self.calculate_dist(filter, team)
-        else:
-            result = self.calculate_list(filter, team, limit, offset)
+            return result
 
-        return result
+
+def _cursor_params(cursor: Optional[Tuple[datetime, str]]) -> Dict[str, Any]:
+    if cursor is None:
+        return {}
+    start_time, distinct_id = cursor
+    if start_time.tzinfo:
+        start_time = start_time.astimezone(pytz.utc)
+    # Passed as a string, datetime parameters lose their microseconds
+    return {"cursor_start": start_time.strftime("%Y-%m-%d %H:%M:%S.%f"), "cursor_distinct_id": distinct_id}
 
 
 def convert_to_comparison(trend_entity: List[Dict[str, Any]], label: str, filter: Filter) -> List[Dict[str, Any]]:
@@ -1,9 +1,10 @@
 import copy
+from functools import partial
 from typing import Any, Dict, List, Optional
 
 from django.utils import timezone
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import query_tags, sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.util import parse_timestamps
@@ -12,7 +13,7 @@ from posthog.models.action import Action
 from posthog.models.entity import Entity
 from posthog.models.filter import Filter
 from posthog.models.team import Team
-from posthog.queries.base import BaseQuery, determine_compared_filter
+from posthog.queries.base import BaseQuery, determine_compared_filter, run_in_parallel
 from posthog.utils import relative_date_parse
 
 STICKINESS_SQL = """
@@ -126,15 +127,15 @@ class ClickhouseStickiness(BaseQuery):
         if not filter._date_to:
             filter._date_to = timezone.now()
 
-        result = []
-
         for entity in filter.entities:
             if entity.type == TREND_FILTER_TYPE_ACTIONS:
                 entity.name = Action.objects.only("name").get(team=team, pk=entity.id).name
-            entity_result = self._serialize_entity(entity, filter, team)
-            result.extend(entity_result)
 
-        return result
+        results = run_in_parallel(
+            [partial(self._serialize_entity, entity, copy.deepcopy(filter), team) for entity in filter.entities]
+        )
+        return [serialized for result in results for serialized in result]
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
-        return self._calculate_stickiness(filter, team)
+        with query_tags(team_id=team.pk, kind="stickiness"):
+            return self._calculate_stickiness(filter, team)
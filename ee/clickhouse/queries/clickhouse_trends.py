@@ -6,9 +6,10 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 from django.db.models.manager import BaseManager
 from django.utils import timezone
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import query_tags, sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.cohort import format_cohort_table_name
+from ee.clickhouse.models.materialized_columns import get_materialized_columns
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.util import get_interval_annotation_ch, get_time_diff, parse_timestamps
 from ee.clickhouse.sql.events import (
@@ -23,7 +24,7 @@ from posthog.models.cohort import Cohort
 from posthog.models.entity import Entity
 from posthog.models.filter import Filter
 from posthog.models.team import Team
-from posthog.queries.base import BaseQuery, convert_to_comparison, determine_compared_filter
+from posthog.queries.base import BaseQuery, handle_compare_entities
 from posthog.utils import relative_date_parse
 
 # TODO: use timezone from timestamp request and not UTC remove from all below—should be localized to requester timezone
@@ -35,6 +36,10 @@ VOLUME_ACTIONS_SQL = """
 SELECT {aggregate_operation} as total, toDateTime({interval}({timestamp}), 'UTC') as day_start from events {event_join} where team_id = {team_id} and uuid IN ({actions_query}) {filters} {parsed_date_from} {parsed_date_to} GROUP BY {interval}({timestamp})
 """
 
+VOLUME_DAILY_SQL = """
+SELECT countMerge(count) as total, toDateTime({interval}(day), 'UTC') as day_start from events_daily where team_id = {team_id} and event = %(event)s {parsed_date_from} {parsed_date_to} GROUP BY {interval}(day)
+"""
+
 AGGREGATE_SQL = """
 SELECT groupArray(day_start), groupArray(count) FROM (
     SELECT SUM(total) AS count, day_start from ({null_sql} UNION ALL {content_sql}) group by day_start order by day_start
@@ -57,6 +62,17 @@ SELECT groupArray(value) FROM (
 )
 """
 
+TOP_ELEMENTS_ARRAY_OF_COLUMN_SQL = """
+SELECT groupArray(value) FROM (
+    SELECT {column} as value, count(*) as count
+    FROM events e
+    WHERE team_id = %(team_id)s AND {column} != '' {parsed_date_from} {parsed_date_to}
+    GROUP BY value
+    ORDER BY count DESC
+    LIMIT %(limit)s
+)
+"""
+
 TOP_PERSON_PROPS_ARRAY_OF_KEY_SQL = """
 SELECT groupArray(value) FROM (
     SELECT value, count(*) as count
@@ -101,7 +117,7 @@ SELECT groupArray(day_start), groupArray(count), breakdown_value FROM (
                 ) as sec
             ORDER BY breakdown_value, day_start
             UNION ALL 
-            SELECT {aggregate_operation} as total, toDateTime(toStartOfDay(timestamp), 'UTC') as day_start, value as breakdown_value
+            SELECT {aggregate_operation} as total, toDateTime(toStartOfDay(timestamp), 'UTC') as day_start, {breakdown_value} as breakdown_value
             FROM 
             events e {event_join} {breakdown_filter}
             GROUP BY day_start, breakdown_value
@@ -164,7 +180,12 @@ INNER JOIN (
     FROM events_properties_view AS ep
     WHERE key = %(key)s and team_id = %(team_id)s
 ) ep 
-ON uuid = ep.event_id where e.team_id = %(team_id)s {event_filter} {parsed_date_from} {parsed_date_to}
+ON uuid = ep.event_id where e.team_id = %(team_id)s {event_filter} {filters} {parsed_date_from} {parsed_date_to}
+AND breakdown_value in (%(values)s) {actions_query}
+"""
+
+BREAKDOWN_PROP_COLUMN_SQL = """
+where e.team_id = %(team_id)s {event_filter} {filters} {parsed_date_from} {parsed_date_to}
 AND breakdown_value in (%(values)s) {actions_query}
 """
 
@@ -235,7 +256,9 @@ class ClickhouseTrends(BaseQuery):
         parsed_date_from, parsed_date_to = parse_timestamps(filter=filter)
 
         props_to_filter = [*filter.properties, *entity.properties]
-        prop_filters, prop_filter_params = parse_prop_clauses("uuid", props_to_filter, team)
+        prop_filters, prop_filter_params = parse_prop_clauses(
+            "uuid", props_to_filter, team, allow_denormalized_props=True
+        )
 
         action_query = ""
         action_params: Dict = {}
@@ -293,6 +316,7 @@ class ClickhouseTrends(BaseQuery):
                 breakdown_query = BREAKDOWN_QUERY_SQL.format(
                     null_sql=null_sql,
                     breakdown_filter=breakdown_filter,
+                    breakdown_value="value",
                     event_join=join_condition,
                     aggregate_operation=aggregate_operation,
                 )
@@ -323,13 +347,16 @@ class ClickhouseTrends(BaseQuery):
             breakdown_query = BREAKDOWN_QUERY_SQL.format(
                 null_sql=null_sql,
                 breakdown_filter=breakdown_filter,
+                breakdown_value="value",
                 event_join=join_condition,
                 aggregate_operation=aggregate_operation,
             )
         else:
+            # Event properties with a materialized column are broken down without joining events_properties_view
+            column = get_materialized_columns().get(str(filter.breakdown))
             element_params = {**params, "key": filter.breakdown, "limit": 20}
-            element_query = TOP_ELEMENTS_ARRAY_OF_KEY_SQL.format(
-                parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to
+            element_query = (TOP_ELEMENTS_ARRAY_OF_COLUMN_SQL if column else TOP_ELEMENTS_ARRAY_OF_KEY_SQL).format(
+                column=column, parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to
             )
 
             try:
@@ -345,7 +372,7 @@ class ClickhouseTrends(BaseQuery):
                 "event": entity.id,
                 **action_params,
             }
-            breakdown_filter = BREAKDOWN_PROP_JOIN_SQL.format(
+            breakdown_filter = (BREAKDOWN_PROP_COLUMN_SQL if column else BREAKDOWN_PROP_JOIN_SQL).format(
                 parsed_date_from=parsed_date_from,
                 parsed_date_to=parsed_date_to,
                 actions_query="and uuid IN ({})".format(action_query) if action_query else "",
@@ -355,6 +382,7 @@ class ClickhouseTrends(BaseQuery):
             breakdown_query = BREAKDOWN_QUERY_SQL.format(
                 null_sql=null_sql,
                 breakdown_filter=breakdown_filter,
+                breakdown_value=column or "value",
                 event_join=join_condition,
                 aggregate_operation=aggregate_operation,
             )
@@ -472,6 +500,17 @@ class ClickhouseTrends(BaseQuery):
 
         return aggregate_operation, join_condition, params
 
+    def _can_use_daily_rollup(
+        self, entity: Entity, filter: Filter, props_to_filter: List, aggregate_operation: str
+    ) -> bool:
+        # events_daily only has the number of events per day, and date filters for these intervals are whole days
+        return (
+            entity.type != TREND_FILTER_TYPE_ACTIONS
+            and not props_to_filter
+            and aggregate_operation == "count(*)"
+            and filter.interval in (None, "day", "week", "month")
+        )
+
     def _format_normal_query(self, entity: Entity, filter: Filter, team: Team) -> List[Dict[str, Any]]:
 
         inteval_annotation = get_interval_annotation_ch(filter.interval)
@@ -479,7 +518,9 @@ class ClickhouseTrends(BaseQuery):
         parsed_date_from, parsed_date_to = parse_timestamps(filter=filter)
 
         props_to_filter = [*filter.properties, *entity.properties]
-        prop_filters, prop_filter_params = parse_prop_clauses("uuid", props_to_filter, team)
+        prop_filters, prop_filter_params = parse_prop_clauses(
+            "uuid", props_to_filter, team, allow_denormalized_props=True
+        )
 
         aggregate_operation, join_condition, math_params = self._process_math(entity)
 
@@ -504,6 +545,15 @@ class ClickhouseTrends(BaseQuery):
                 )
             except:
                 return []
+        elif self._can_use_daily_rollup(entity, filter, props_to_filter, aggregate_operation):
+            parsed_date_from, parsed_date_to = parse_timestamps(filter=filter, column="day")
+            content_sql = VOLUME_DAILY_SQL.format(
+                interval=inteval_annotation,
+                team_id=team.pk,
+                parsed_date_from=(parsed_date_from or ""),
+                parsed_date_to=(parsed_date_to or ""),
+            )
+            params = {**params, "event": entity.id}
         else:
             content_sql = VOLUME_SQL.format(
                 interval=inteval_annotation,
@@ -546,23 +596,13 @@ class ClickhouseTrends(BaseQuery):
         if not filter._date_to:
             filter._date_to = timezone.now()
 
-        result = []
-        for entity in filter.entities:
-            if filter.compare:
-                compare_filter = determine_compared_filter(filter=filter)
-                entity_result = self._serialize_entity(entity, filter, team)
-                entity_result = convert_to_comparison(entity_result, filter, "{} - {}".format(entity.name, "current"))
-                result.extend(entity_result)
-                previous_entity_result = self._serialize_entity(entity, compare_filter, team)
-                previous_entity_result = convert_to_comparison(
-                    previous_entity_result, filter, "{} - {}".format(entity.name, "previous")
-                )
-                result.extend(previous_entity_result)
-            else:
-                entity_result = self._serialize_entity(entity, filter, team)
-                result.extend(entity_result)
-
-        return result
+        return handle_compare_entities(
+            filter.entities,
+            filter=filter,
+            func=lambda entity, filter, team_id: self._serialize_entity(entity, filter, team),
+            team_id=team.pk,
+        )
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
-        return self._calculate_trends(filter, team)
+        with query_tags(team_id=team.pk, kind="trends"):
+            return self._calculate_trends(filter, team)
@@ -1,6 +1,7 @@
 from uuid import uuid4
 
 from ee.clickhouse.models.event import create_event
+from ee.clickhouse.models.session import update_sessions
 from ee.clickhouse.queries.clickhouse_sessions import ClickhouseSessions
 from ee.clickhouse.util import ClickhouseTestMixin
 from posthog.queries.test.test_sessions import sessions_test_factory
@@ -11,5 +12,12 @@ def _create_event(**kwargs):
     create_event(**kwargs)
 
 
-class TestClickhouseSessions(ClickhouseTestMixin, sessions_test_factory(ClickhouseSessions, _create_event)):  # type: ignore
+class UpdatedClickhouseSessions(ClickhouseSessions):
+    # The tests query sessions right after creating events, without waiting for the periodic update
+    def run(self, *args, **kwargs):
+        update_sessions()
+        return super().run(*args, **kwargs)
+
+
+class TestClickhouseSessions(ClickhouseTestMixin, sessions_test_factory(UpdatedClickhouseSessions, _create_event)):  # type: ignore
     pass
@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from uuid import uuid4
 
 from freezegun import freeze_time
@@ -133,3 +134,12 @@ class TestClickhouseTrends(ClickhouseTestMixin, trend_test_factory(ClickhouseTre
         self.assertEqual(sum(event_response[1]["data"]), 1)
         self.assertEqual(event_response[1]["data"][4], 1)
         self.assertTrue(self._compare_entity_response(action_response, event_response))
+
+    def test_daily_rollup_matches_events(self):
+        self._create_events()
+        with freeze_time("2020-01-04T13:01:01Z"):
+            for interval in ["day", "week", "month"]:
+                filter = Filter(data={"date_from": "-14d", "interval": interval, "events": [{"id": "sign up"}]})
+                with patch.object(ClickhouseTrends, "_can_use_daily_rollup", return_value=False):
+                    expected = ClickhouseTrends().run(filter, self.team)
+                self.assertEqual(ClickhouseTrends().run(filter, self.team), expected)
@@ -15,6 +15,12 @@ TABLE_MERGE_ENGINE = (
     else "MergeTree()"
 )
 
+AGGREGATING_TABLE_ENGINE = (
+    "ReplicatedAggregatingMergeTree('/clickhouse/tables/{{shard}}/posthog.{table}', '{{replica}}')"
+    if CLICKHOUSE_REPLICATION
+    else "AggregatingMergeTree()"
+)
+
 KAFKA_ENGINE = "Kafka('{kafka_host}', '{topic}', '{group}', '{serialization}')"
 
 DROP_TABLE_IF_EXISTS_SQL = """
@@ -38,5 +44,9 @@ def table_engine(table: str, ver: Optional[str] = None) -> str:
         return TABLE_MERGE_ENGINE.format(table=table)
 
 
+def aggregating_table_engine(table: str) -> str:
+    return AGGREGATING_TABLE_ENGINE.format(table=table)
+
+
 def kafka_engine(topic: str, kafka_host=KAFKA_HOSTS, group="group1", serialization="JSONEachRow"):
     return KAFKA_ENGINE.format(topic=topic, kafka_host=kafka_host, group=group, serialization=serialization)
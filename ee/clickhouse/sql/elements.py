@@ -1,4 +1,4 @@
-from ee.kafka.topics import KAFKA_ELEMENTS
+from ee.kafka.topics import KAFKA_ELEMENTS, KAFKA_ELEMENTS_CHAIN
 
 from .clickhouse import KAFKA_COLUMNS, STORAGE_POLICY, kafka_engine, table_engine
 
@@ -6,6 +6,14 @@ DROP_ELEMENTS_TABLE_SQL = """
 DROP TABLE elements
 """
 
+DROP_ELEMENTS_CHAIN_TABLE_SQL = """
+DROP TABLE elements_chain
+"""
+
+DROP_ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL = """
+DROP TABLE elements_chain_to_elements_mv
+"""
+
 ELEMENTS_TABLE = "elements"
 
 ELEMENTS_TABLE_BASE_SQL = """
@@ -197,3 +205,123 @@ GROUP BY tag_name, tag_hash
 ORDER BY tag_count desc, tag_name
 LIMIT %(limit)s
 """
+
+ELEMENTS_CHAIN_TABLE = "elements_chain"
+
+ELEMENTS_CHAIN_TABLE_BASE_SQL = """
+CREATE TABLE {table_name}
+(
+    event_uuid UUID,
+    texts Array(VARCHAR),
+    tag_names Array(VARCHAR),
+    hrefs Array(VARCHAR),
+    attr_ids Array(VARCHAR),
+    attr_classes Array(Array(VARCHAR)),
+    nth_childs Array(Int64),
+    nth_of_types Array(Int64),
+    attributes_list Array(VARCHAR),
+    orders Array(Int64),
+    team_id Int64,
+    created_at DateTime64,
+    elements_hash VARCHAR
+    {extra_fields}
+) ENGINE = {engine} 
+"""
+
+ELEMENTS_CHAIN_TABLE_SQL = (
+    ELEMENTS_CHAIN_TABLE_BASE_SQL
+    + """PARTITION BY toYYYYMM(created_at)
+ORDER BY (team_id, elements_hash)
+{storage_policy}
+"""
+).format(
+    table_name=ELEMENTS_CHAIN_TABLE,
+    engine=table_engine(ELEMENTS_CHAIN_TABLE, "_timestamp"),
+    extra_fields=KAFKA_COLUMNS,
+    storage_policy=STORAGE_POLICY,
+)
+
+KAFKA_ELEMENTS_CHAIN_TABLE_SQL = ELEMENTS_CHAIN_TABLE_BASE_SQL.format(
+    table_name="kafka_" + ELEMENTS_CHAIN_TABLE, engine=kafka_engine(topic=KAFKA_ELEMENTS_CHAIN), extra_fields=""
+)
+
+ELEMENTS_CHAIN_TABLE_MV_SQL = """
+CREATE MATERIALIZED VIEW {table_name}_mv 
+TO {table_name} 
+AS SELECT
+event_uuid,
+texts,
+tag_names,
+hrefs,
+attr_ids,
+attr_classes,
+nth_childs,
+nth_of_types,
+attributes_list,
+orders,
+team_id,
+created_at,
+elements_hash,
+_timestamp,
+_offset
+FROM kafka_{table_name} 
+""".format(
+    table_name=ELEMENTS_CHAIN_TABLE
+)
+
+# Expands chains into the elements table, so that queries on elements work the same for both ingestion modes.
+# The chain's column is `attributes_list` rather than `attributes`, as aliases apply to the whole query and
+# `attributes AS attribute` next to `attribute AS attributes` would be cyclic
+ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL = """
+CREATE MATERIALIZED VIEW {table_name}_to_{elements_table}_mv 
+TO {elements_table} 
+AS SELECT
+generateUUIDv4() AS uuid,
+event_uuid,
+text,
+tag_name,
+href,
+attr_id,
+attr_class,
+nth_child,
+nth_of_type,
+attribute AS attributes,
+order,
+team_id,
+created_at,
+elements_hash,
+_timestamp,
+_offset
+FROM {table_name} 
+ARRAY JOIN
+    texts AS text,
+    tag_names AS tag_name,
+    hrefs AS href,
+    attr_ids AS attr_id,
+    attr_classes AS attr_class,
+    nth_childs AS nth_child,
+    nth_of_types AS nth_of_type,
+    attributes_list AS attribute,
+    orders AS order
+""".format(
+    table_name=ELEMENTS_CHAIN_TABLE, elements_table=ELEMENTS_TABLE
+)
+
+INSERT_ELEMENTS_CHAIN_SQL = """
+INSERT INTO elements_chain SELECT 
+    %(event_uuid)s, 
+    %(texts)s,
+    %(tag_names)s,
+    %(hrefs)s,
+    %(attr_ids)s,
+    %(attr_classes)s,
+    %(nth_childs)s,
+    %(nth_of_types)s,
+    %(attributes_list)s,
+    %(orders)s,
+    %(team_id)s,
+    now(),
+    %(elements_hash)s,
+    now(), 
+    0
+"""
@@ -1,6 +1,6 @@
 from ee.kafka.topics import KAFKA_EVENTS
 
-from .clickhouse import KAFKA_COLUMNS, STORAGE_POLICY, kafka_engine, table_engine
+from .clickhouse import KAFKA_COLUMNS, STORAGE_POLICY, aggregating_table_engine, kafka_engine, table_engine
 
 DROP_EVENTS_TABLE_SQL = """
 DROP TABLE events
@@ -18,6 +18,14 @@ DROP_MAT_EVENTS_PROP_TABLE_SQL = """
 DROP TABLE events_properties_view
 """
 
+DROP_EVENTS_DAILY_TABLE_SQL = """
+DROP TABLE events_daily
+"""
+
+DROP_EVENTS_DAILY_MV_SQL = """
+DROP TABLE events_daily_mv
+"""
+
 EVENTS_TABLE = "events"
 
 EVENTS_TABLE_BASE_SQL = """
@@ -76,6 +84,61 @@ INSERT_EVENT_SQL = """
 INSERT INTO events SELECT %(uuid)s, %(event)s, %(properties)s, %(timestamp)s, %(team_id)s, %(distinct_id)s, %(elements_hash)s, %(created_at)s, now(), 0
 """
 
+EVENTS_DAILY_TABLE = "events_daily"
+
+# Number of events per team, event and day, used by trends instead of events when no event properties are needed.
+# Every row inserted into events is counted, duplicates included, although the ReplacingMergeTree events table
+# deduplicates them later, so counts can be slightly higher than those queried from events
+EVENTS_DAILY_TABLE_SQL = """
+CREATE TABLE {table_name}
+(
+    team_id Int64,
+    event VARCHAR,
+    day DateTime('UTC'),
+    count AggregateFunction(count)
+) ENGINE = {engine}
+PARTITION BY toYYYYMM(day)
+ORDER BY (team_id, event, day)
+{storage_policy}
+""".format(
+    table_name=EVENTS_DAILY_TABLE, engine=aggregating_table_engine(EVENTS_DAILY_TABLE), storage_policy=STORAGE_POLICY
+)
+
+EVENTS_DAILY_MV_SQL = """
+CREATE MATERIALIZED VIEW {table_name}_mv
+TO {table_name}
+AS SELECT
+team_id,
+event,
+toStartOfDay(timestamp) AS day,
+countState() AS count
+FROM events
+GROUP BY team_id, event, day
+""".format(
+    table_name=EVENTS_DAILY_TABLE
+)
+
+# Counts the events inserted before the materialized view was created. Run while ingestion from Kafka is paused with
+# `DETACH_EVENTS_MV_SQL`, so that every event is counted either by the view or by the backfill. Neither `_timestamp`
+# (when Kafka received an event, not when it was inserted) nor the view's creation time can tell them apart.
+BACKFILL_EVENTS_DAILY_SQL = """
+INSERT INTO {table_name}
+SELECT team_id, event, toStartOfDay(timestamp) AS day, countState() AS count
+FROM events
+GROUP BY team_id, event, day
+""".format(
+    table_name=EVENTS_DAILY_TABLE
+)
+
+# Pauses and resumes consuming events from Kafka, consumer offsets are kept so no events are lost meanwhile
+DETACH_EVENTS_MV_SQL = """
+DETACH TABLE events_mv
+"""
+
+ATTACH_EVENTS_MV_SQL = """
+ATTACH TABLE events_mv
+"""
+
 GET_EVENTS_SQL = """
 SELECT * FROM events_with_array_props_view
 """
@@ -196,3 +259,16 @@ INNER JOIN person_distinct_id as pid ON events.distinct_id = pid.distinct_id
 EVENT_JOIN_PROPERTY_WITH_KEY_SQL = """
 INNER JOIN (SELECT event_id, toInt64OrNull(value) as value FROM events_properties_view WHERE team_id = %(team_id)s AND key = %(join_property_key)s AND value IS NOT NULL) as pid ON events.uuid = pid.event_id
 """
+
+MATERIALIZED_COLUMN_COMMENT = "column_materializer::{property}"
+
+GET_MATERIALIZED_COLUMNS_SQL = """
+SELECT name, comment FROM system.columns
+WHERE database = %(database)s AND table = 'events' AND comment LIKE 'column_materializer::%%'
+"""
+
+ADD_MATERIALIZED_COLUMN_SQL = """
+ALTER TABLE events
+ADD COLUMN IF NOT EXISTS {column} VARCHAR MATERIALIZED JSONExtractRaw(properties, %(property)s)
+COMMENT %(comment)s
+"""
@@ -215,8 +215,8 @@ UPDATE_PERSON_PROPERTIES = """
 ALTER TABLE person UPDATE properties = %(properties)s where id = %(id)s
 """
 
-UPDATE_PERSON_ATTACHED_DISTINCT_ID = """
-ALTER TABLE person_distinct_id UPDATE person_id = %(person_id)s where distinct_id = %(distinct_id)s
+UPDATE_PERSON_DISTINCT_IDS_PERSON_ID = """
+ALTER TABLE person_distinct_id UPDATE person_id = %(person_id)s where team_id = %(team_id)s AND person_id = %(old_person_id)s
 """
 
 DELETE_PERSON_BY_ID = """
@@ -0,0 +1,264 @@
+from .clickhouse import STORAGE_POLICY, table_engine
+
+SESSIONS_TABLE = "sessions"
+
+# Seconds without events after which the next event starts a new session
+SESSION_TIMEOUT_SECONDS = 30 * 60
+
+DROP_SESSIONS_TABLE_SQL = """
+DROP TABLE sessions
+"""
+
+# Sessions per distinct id, kept up to date by `update_sessions`. Sessions are rewritten with a higher `_version`
+# when their events change, sessions that were merged into an earlier one are rewritten with `is_deleted` set
+SESSIONS_TABLE_SQL = """
+CREATE TABLE {table_name}
+(
+    team_id Int64,
+    distinct_id VARCHAR,
+    session_start DateTime64(6, 'UTC'),
+    session_end DateTime64(6, 'UTC'),
+    duration_seconds Int64,
+    event_count UInt64,
+    first_url VARCHAR,
+    last_url VARCHAR,
+    event_uuids Array(UUID),
+    is_closed UInt8,
+    is_deleted UInt8,
+    _version UInt64,
+    _timestamp DateTime
+) ENGINE = {engine}
+PARTITION BY toYYYYMM(session_start)
+ORDER BY (team_id, distinct_id, session_start)
+{storage_policy}
+""".format(
+    table_name=SESSIONS_TABLE, engine=table_engine(SESSIONS_TABLE, "_version"), storage_policy=STORAGE_POLICY
+)
+
+# Where each distinct id changed by the running update has its sessions recalculated from, filled once per update
+# so that all of its queries work on the same distinct ids, however many events are ingested while it runs
+SESSIONS_RECALCULATE_TABLE = "sessions_recalculate"
+
+DROP_SESSIONS_RECALCULATE_TABLE_SQL = """
+DROP TABLE sessions_recalculate
+"""
+
+SESSIONS_RECALCULATE_TABLE_SQL = """
+CREATE TABLE {table_name}
+(
+    team_id Int64,
+    distinct_id VARCHAR,
+    recalculate_from DateTime64(6, 'UTC')
+) ENGINE = {engine}
+ORDER BY (team_id, distinct_id)
+""".format(
+    table_name=SESSIONS_RECALCULATE_TABLE, engine=table_engine(SESSIONS_RECALCULATE_TABLE)
+)
+
+TRUNCATE_SESSIONS_RECALCULATE_SQL = """
+TRUNCATE TABLE sessions_recalculate
+"""
+
+# When sessions were last updated, as unix timestamps
+GET_SESSIONS_UPDATED_AT_SQL = """
+SELECT toUnixTimestamp(max(_timestamp)), toUnixTimestamp(now()) FROM sessions
+"""
+
+# The distinct ids with events ingested since the last update, and where their sessions have to be recalculated from:
+# the start of the stored session that their earliest new event belongs to, or that event if it starts a new session
+SESSIONS_RECALCULATE_FROM_SQL = """
+SELECT
+    team_id,
+    distinct_id,
+    if(
+        countIf(dateDiff('second', toDateTime(session_end), toDateTime(first_timestamp)) <= {timeout}) > 0,
+        least(
+            first_timestamp,
+            minIf(session_start, dateDiff('second', toDateTime(session_end), toDateTime(first_timestamp)) <= {timeout})
+        ),
+        first_timestamp
+    ) AS recalculate_from
+FROM (
+    SELECT team_id, distinct_id, min(timestamp) AS first_timestamp
+    FROM events
+    WHERE _timestamp >= toDateTime(%(since)s)
+    GROUP BY team_id, distinct_id
+) AS changed
+LEFT JOIN (
+    SELECT team_id, distinct_id, session_start, session_end
+    FROM sessions FINAL
+    WHERE NOT is_deleted AND (team_id, distinct_id) IN (
+        SELECT team_id, distinct_id
+        FROM events
+        WHERE _timestamp >= toDateTime(%(since)s)
+    )
+) AS stored USING (team_id, distinct_id)
+GROUP BY team_id, distinct_id, first_timestamp
+""".format(
+    timeout=SESSION_TIMEOUT_SECONDS
+)
+
+INSERT_SESSIONS_RECALCULATE_SQL = """
+INSERT INTO sessions_recalculate
+{recalculate_from}
+""".format(
+    recalculate_from=SESSIONS_RECALCULATE_FROM_SQL
+)
+
+# Stored sessions that were recalculated, run after inserting the recalculated sessions, which have a higher version
+DELETE_RECALCULATED_SESSIONS_SQL = """
+INSERT INTO sessions
+SELECT
+    team_id,
+    distinct_id,
+    session_start,
+    session_end,
+    duration_seconds,
+    event_count,
+    first_url,
+    last_url,
+    event_uuids,
+    is_closed,
+    1 AS is_deleted,
+    %(version)s AS _version,
+    toDateTime(%(until)s) AS _timestamp
+FROM sessions FINAL
+INNER JOIN sessions_recalculate USING (team_id, distinct_id)
+WHERE NOT is_deleted AND session_start >= recalculate_from
+"""
+
+# Splits each distinct id's events into sessions wherever there's a gap of more than the timeout between two events.
+# Events are narrowed down to the changed distinct ids from the earliest point any of them is recalculated from before
+# the join, so that it doesn't read the whole events table
+INSERT_RECALCULATED_SESSIONS_SQL = """
+INSERT INTO sessions
+SELECT
+    team_id,
+    distinct_id,
+    tupleElement(session[1], 1) AS session_start,
+    tupleElement(session[-1], 1) AS session_end,
+    dateDiff('second', toDateTime(session_start), toDateTime(session_end)) AS duration_seconds,
+    length(session) AS event_count,
+    arrayFirst(url -> url != '', arrayMap(event -> tupleElement(event, 3), session)) AS first_url,
+    arrayFirst(url -> url != '', arrayReverse(arrayMap(event -> tupleElement(event, 3), session))) AS last_url,
+    arrayMap(event -> tupleElement(event, 2), session) AS event_uuids,
+    dateDiff('second', toDateTime(session_end), toDateTime(%(until)s)) > {timeout} AS is_closed,
+    0 AS is_deleted,
+    %(version)s + 1 AS _version,
+    toDateTime(%(until)s) AS _timestamp
+FROM (
+    SELECT
+        team_id,
+        distinct_id,
+        arraySort(groupUniqArray((timestamp, uuid, JSONExtractString(properties, '$current_url')))) AS session_events,
+        arrayMap(event -> toInt64(toUnixTimestamp(toDateTime(tupleElement(event, 1)))), session_events) AS seconds,
+        arraySplit((event, gap) -> gap > {timeout}, session_events, arrayDifference(seconds)) AS split_sessions
+    FROM (
+        SELECT team_id, distinct_id, timestamp, uuid, properties
+        FROM events
+        WHERE
+            (team_id, distinct_id) IN (SELECT team_id, distinct_id FROM sessions_recalculate)
+            AND timestamp >= (SELECT min(recalculate_from) FROM sessions_recalculate)
+    ) AS events
+    INNER JOIN sessions_recalculate USING (team_id, distinct_id)
+    WHERE timestamp >= recalculate_from
+    GROUP BY team_id, distinct_id
+)
+ARRAY JOIN split_sessions AS session
+""".format(
+    timeout=SESSION_TIMEOUT_SECONDS
+)
+
+# Sessions that can't be extended by new events anymore
+CLOSE_SESSIONS_SQL = """
+INSERT INTO sessions
+SELECT
+    team_id,
+    distinct_id,
+    session_start,
+    session_end,
+    duration_seconds,
+    event_count,
+    first_url,
+    last_url,
+    event_uuids,
+    1 AS is_closed,
+    is_deleted,
+    %(version)s + 2 AS _version,
+    toDateTime(%(until)s) AS _timestamp
+FROM sessions FINAL
+WHERE NOT is_closed AND NOT is_deleted AND dateDiff('second', toDateTime(session_end), toDateTime(%(until)s)) > {timeout}
+""".format(
+    timeout=SESSION_TIMEOUT_SECONDS
+)
+
+# Same columns as `SESSIONS_NO_EVENTS_SQL`, for the average and distribution queries
+SESSIONS_DURATION_SQL = """
+SELECT
+    distinct_id,
+    session_start AS timestamp,
+    duration_seconds AS session_duration_seconds
+FROM sessions FINAL
+WHERE
+    team_id = %(team_id)s
+    AND NOT is_deleted
+    {date_from}
+    {date_to}
+"""
+
+SESSIONS_LIST_SQL = """
+SELECT
+    distinct_id,
+    session_start,
+    session_end,
+    duration_seconds
+FROM sessions FINAL
+WHERE
+    team_id = %(team_id)s
+    AND NOT is_deleted
+    {date_from}
+    {date_to}
+    {cursor}
+ORDER BY
+    session_start DESC,
+    distinct_id DESC
+LIMIT %(offset)s, %(limit)s
+"""
+
+# Only the sessions after the cursor's session in the list
+SESSIONS_LIST_CURSOR_SQL = """
+AND (session_start, distinct_id) < (toDateTime64(%(cursor_start)s, 6, 'UTC'), %(cursor_distinct_id)s)
+"""
+
+# The events of a distinct id between the start and end of one of its sessions are that session's events
+SESSIONS_LIST_EVENTS_SQL = """
+SELECT
+    uuid,
+    event,
+    properties,
+    timestamp,
+    distinct_id,
+    elements_hash
+FROM events
+WHERE
+    team_id = %(team_id)s
+    AND ({sessions})
+GROUP BY
+    uuid,
+    event,
+    properties,
+    timestamp,
+    distinct_id,
+    elements_hash
+ORDER BY
+    timestamp
+"""
+
+# The same for sessions calculated from events, see `SESSION_SQL`
+SESSIONS_CURSOR_HAVING_SQL = """
+HAVING (start_time, distinct_id) < (toDateTime64(%(cursor_start)s, 6, 'UTC'), %(cursor_distinct_id)s)
+"""
+
+SESSION_EVENTS_CONDITION_SQL = """
+(distinct_id = %(distinct_id_{index})s AND timestamp >= %(start_{index})s AND timestamp < %(end_{index})s)
+"""
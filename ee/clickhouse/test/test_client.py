@@ -0,0 +1,24 @@
+from ee.clickhouse.client import query_tags, sync_execute
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.api.test.base import BaseTest
+from posthog.settings import CLICKHOUSE_MAX_EXECUTION_TIME
+
+GET_OWN_QUERY_ID_SQL = "SELECT query_id FROM system.processes WHERE query LIKE '%own query id%'"
+GET_MAX_EXECUTION_TIME_SQL = "SELECT value FROM system.settings WHERE name = 'max_execution_time'"
+
+
+class TestClickhouseClient(ClickhouseTestMixin, BaseTest):
+    def test_query_id(self) -> None:
+        with query_tags(team_id=self.team.pk, kind="trends"), query_tags(client_query_id="abc-123"):
+            query_id = sync_execute(GET_OWN_QUERY_ID_SQL)[0][0]
+        self.assertTrue(query_id.startswith("{}:trends:abc-123:".format(self.team.pk)))
+
+        self.assertTrue(sync_execute(GET_OWN_QUERY_ID_SQL)[0][0].startswith(":::"))
+
+    def test_team_queries_get_limits(self) -> None:
+        with query_tags(team_id=self.team.pk):
+            self.assertEqual(sync_execute(GET_MAX_EXECUTION_TIME_SQL), [(str(CLICKHOUSE_MAX_EXECUTION_TIME),)])
+            self.assertEqual(
+                sync_execute(GET_MAX_EXECUTION_TIME_SQL, settings={"max_execution_time": 5}), [("5",)],
+            )
+        self.assertEqual(sync_execute(GET_MAX_EXECUTION_TIME_SQL), [("0",)])
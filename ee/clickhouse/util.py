@@ -6,12 +6,25 @@ from django.conf import settings
 from django.db import DEFAULT_DB_ALIAS
 
 from ee.clickhouse.client import sync_execute
-from ee.clickhouse.sql.elements import DROP_ELEMENTS_TABLE_SQL, ELEMENTS_TABLE_SQL
+from ee.clickhouse.models.element import clear_known_elements_hashes
+from ee.clickhouse.models.materialized_columns import clear_materialized_columns_cache
+from ee.clickhouse.sql.elements import (
+    DROP_ELEMENTS_CHAIN_TABLE_SQL,
+    DROP_ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL,
+    DROP_ELEMENTS_TABLE_SQL,
+    ELEMENTS_CHAIN_TABLE_SQL,
+    ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL,
+    ELEMENTS_TABLE_SQL,
+)
 from ee.clickhouse.sql.events import (
+    DROP_EVENTS_DAILY_MV_SQL,
+    DROP_EVENTS_DAILY_TABLE_SQL,
     DROP_EVENTS_TABLE_SQL,
     DROP_EVENTS_WITH_ARRAY_PROPS_TABLE_SQL,
     DROP_MAT_EVENTS_PROP_TABLE_SQL,
     DROP_MAT_EVENTS_WITH_ARRAY_PROPS_TABLE_SQL,
+    EVENTS_DAILY_MV_SQL,
+    EVENTS_DAILY_TABLE_SQL,
     EVENTS_TABLE_SQL,
     EVENTS_WITH_PROPS_TABLE_SQL,
     MAT_EVENT_PROP_TABLE_SQL,
@@ -23,18 +36,30 @@ from ee.clickhouse.sql.person import (
     PERSONS_DISTINCT_ID_TABLE_SQL,
     PERSONS_TABLE_SQL,
 )
+from ee.clickhouse.sql.sessions import (
+    DROP_SESSIONS_RECALCULATE_TABLE_SQL,
+    DROP_SESSIONS_TABLE_SQL,
+    SESSIONS_RECALCULATE_TABLE_SQL,
+    SESSIONS_TABLE_SQL,
+)
 
 
 class ClickhouseTestMixin:
     def tearDown(self):
+        # The elements of remembered hashes are dropped along with the tables
+        clear_known_elements_hashes()
         try:
             self._destroy_event_tables()
+            sync_execute(DROP_ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL)
             sync_execute(DROP_ELEMENTS_TABLE_SQL)
+            sync_execute(DROP_ELEMENTS_CHAIN_TABLE_SQL)
             sync_execute(DROP_PERSON_TABLE_SQL)
             sync_execute(DROP_PERSON_DISTINCT_ID_TABLE_SQL)
 
             self._create_event_tables()
             sync_execute(ELEMENTS_TABLE_SQL)
+            sync_execute(ELEMENTS_CHAIN_TABLE_SQL)
+            sync_execute(ELEMENTS_CHAIN_TO_ELEMENTS_MV_SQL)
             sync_execute(PERSONS_TABLE_SQL)
             sync_execute(PERSONS_DISTINCT_ID_TABLE_SQL)
         except ServerException:
@@ -45,12 +70,22 @@ class ClickhouseTestMixin:
         sync_execute(DROP_EVENTS_WITH_ARRAY_PROPS_TABLE_SQL)
         sync_execute(DROP_MAT_EVENTS_WITH_ARRAY_PROPS_TABLE_SQL)
         sync_execute(DROP_MAT_EVENTS_PROP_TABLE_SQL)
+        sync_execute(DROP_EVENTS_DAILY_MV_SQL)
+        sync_execute(DROP_EVENTS_DAILY_TABLE_SQL)
+        sync_execute(DROP_SESSIONS_TABLE_SQL)
+        sync_execute(DROP_SESSIONS_RECALCULATE_TABLE_SQL)
 
     def _create_event_tables(self):
+        # Recreating events drops any materialized columns
+        clear_materialized_columns_cache()
         sync_execute(EVENTS_TABLE_SQL)
         sync_execute(EVENTS_WITH_PROPS_TABLE_SQL)
         sync_execute(MAT_EVENTS_WITH_PROPS_TABLE_SQL)
         sync_execute(MAT_EVENT_PROP_TABLE_SQL)
+        sync_execute(EVENTS_DAILY_TABLE_SQL)
+        sync_execute(EVENTS_DAILY_MV_SQL)
+        sync_execute(SESSIONS_TABLE_SQL)
+        sync_execute(SESSIONS_RECALCULATE_TABLE_SQL)
 
     @contextmanager
     def _assertNumQueries(self, func):
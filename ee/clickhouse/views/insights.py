@@ -1,9 +1,12 @@
-from typing import Any
+import re
+from typing import Any, Dict, List
 
+from rest_framework import exceptions, status
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from ee.clickhouse.client import cancel_queries, query_tags
 from ee.clickhouse.queries.clickhouse_funnel import ClickhouseFunnel
 from ee.clickhouse.queries.clickhouse_paths import ClickhousePaths
 from ee.clickhouse.queries.clickhouse_retention import ClickhouseRetention
@@ -20,17 +23,53 @@ from ee.clickhouse.util import (
 )
 from posthog.api.insight import InsightViewSet
 from posthog.constants import TRENDS_STICKINESS
+from posthog.decorators import (
+    CLICKHOUSE_BACKEND,
+    FUNNEL_CACHE_EXPIRY,
+    FUNNEL_ENDPOINT,
+    PATHS_ENDPOINT,
+    RETENTION_ENDPOINT,
+    SESSIONS_ENDPOINT,
+    TRENDS_ENDPOINT,
+    cached_function,
+)
 from posthog.models.filter import Filter
+from posthog.queries.sessions import session_cursor
+
+
+# Ids the frontend gives the queries of a request, so that it can cancel them when it no longer needs the result
+CLIENT_QUERY_ID_REGEX = re.compile(r"^[a-zA-Z0-9-]{1,64}$")
+
+
+def _client_query_id(value: Any) -> str:
+    return value if isinstance(value, str) and CLIENT_QUERY_ID_REGEX.match(value) else ""
 
 
 class ClickhouseInsights(InsightViewSet):
+    def dispatch(self, request, *args, **kwargs):
+        with query_tags(client_query_id=_client_query_id(request.GET.get("client_query_id"))):
+            return super().dispatch(request, *args, **kwargs)
+
+    @action(methods=["POST"], detail=False)
+    def cancel(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        client_query_id = _client_query_id(request.data.get("client_query_id"))
+        if not client_query_id:
+            raise exceptions.ValidationError({"client_query_id": "A client_query_id is required."})
+        cancel_queries(request.user.team.pk, client_query_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(methods=["GET"], detail=False)
     def trend(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         if not endpoint_enabled(CH_TREND_ENDPOINT, request.user.distinct_id):
             result = super().calculate_trends(request)
             return Response(result)
 
-        team = request.user.team_set.get()
+        result = self.calculate_ch_trends(request)
+        return Response(result)
+
+    @cached_function(cache_type=TRENDS_ENDPOINT, backend=CLICKHOUSE_BACKEND)
+    def calculate_ch_trends(self, request: Request) -> List[Dict[str, Any]]:
+        team = request.user.team
         filter = Filter(request=request)
 
         if filter.shown_as == TRENDS_STICKINESS:
@@ -40,28 +79,39 @@ class ClickhouseInsights(InsightViewSet):
 
         self._refresh_dashboard(request=request)
 
-        return Response(result)
+        return result
 
     @action(methods=["GET"], detail=False)
     def session(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         if not endpoint_enabled(CH_SESSION_ENDPOINT, request.user.distinct_id):
-            result = super().calculate_session(request)
-            return Response(result)
+            return super().session(request, *args, **kwargs)
 
-        team = request.user.team_set.get()
+        team = request.user.team
         filter = Filter(request=request)
+        if filter.session_type is not None:
+            return Response({"result": self.calculate_ch_session_graph(request)})
 
         limit = int(request.GET.get("limit", SESSIONS_LIST_DEFAULT_LIMIT))
         offset = int(request.GET.get("offset", 0))
+        cursor = self._session_cursor(request)
 
-        response = ClickhouseSessions().run(team=team, filter=filter, limit=limit + 1, offset=offset)
+        response = ClickhouseSessions().run(team=team, filter=filter, limit=limit + 1, offset=offset, cursor=cursor)
 
         if len(response) > limit:
             response.pop()
-            return Response({"result": response, "offset": offset + limit})
+            pagination: Dict[str, Any] = {"cursor": session_cursor(response[-1])}
+            if cursor is None:
+                pagination["offset"] = offset + limit
+            return Response({"result": response, **pagination})
         else:
             return Response({"result": response,})
 
+    @cached_function(cache_type=SESSIONS_ENDPOINT, backend=CLICKHOUSE_BACKEND)
+    def calculate_ch_session_graph(self, request: Request) -> List[Dict[str, Any]]:
+        team = request.user.team
+        filter = Filter(request=request)
+        return ClickhouseSessions().run(team=team, filter=filter)
+
     @action(methods=["GET"], detail=False)
     def path(self, request: Request, *args: Any, **kwargs: Any) -> Response:
 
@@ -69,11 +119,15 @@ class ClickhouseInsights(InsightViewSet):
             result = super().calculate_path(request)
             return Response(result)
 
-        team = request.user.team_set.get()
-        filter = Filter(request=request)
-        resp = ClickhousePaths().run(filter=filter, team=team)
+        resp = self.calculate_ch_path(request)
         return Response(resp)
 
+    @cached_function(cache_type=PATHS_ENDPOINT, backend=CLICKHOUSE_BACKEND)
+    def calculate_ch_path(self, request: Request) -> List[Dict[str, Any]]:
+        team = request.user.team
+        filter = Filter(request=request)
+        return ClickhousePaths().run(filter=filter, team=team)
+
     @action(methods=["GET"], detail=False)
     def funnel(self, request: Request, *args: Any, **kwargs: Any) -> Response:
 
@@ -81,11 +135,15 @@ class ClickhouseInsights(InsightViewSet):
             result = super().calculate_funnel(request)
             return Response(result)
 
-        team = request.user.team_set.get()
-        filter = Filter(request=request)
-        response = ClickhouseFunnel(team=team, filter=filter).run()
+        response = self.calculate_ch_funnel(request)
         return Response(response)
 
+    @cached_function(cache_type=FUNNEL_ENDPOINT, expiry=FUNNEL_CACHE_EXPIRY, backend=CLICKHOUSE_BACKEND)
+    def calculate_ch_funnel(self, request: Request) -> List[Dict[str, Any]]:
+        team = request.user.team
+        filter = Filter(request=request)
+        return ClickhouseFunnel(team=team, filter=filter).run()
+
     @action(methods=["GET"], detail=False)
     def retention(self, request: Request, *args: Any, **kwargs: Any) -> Response:
 
@@ -93,7 +151,11 @@ class ClickhouseInsights(InsightViewSet):
             result = super().calculate_retention(request)
             return Response({"data": result})
 
-        team = request.user.team_set.get()
-        filter = Filter(request=request)
-        result = ClickhouseRetention().run(filter, team)
+        result = self.calculate_ch_retention(request)
         return Response({"data": result})
+
+    @cached_function(cache_type=RETENTION_ENDPOINT, backend=CLICKHOUSE_BACKEND)
+    def calculate_ch_retention(self, request: Request) -> List[Dict[str, Any]]:
+        team = request.user.team
+        filter = Filter(request=request)
+        return ClickhouseRetention().run(filter, team)
@@ -1,7 +1,12 @@
+from unittest.mock import patch
 from uuid import uuid4
 
+from rest_framework import status
+
 from ee.clickhouse.models.event import create_event
+from ee.clickhouse.queries.test.test_sessions import UpdatedClickhouseSessions
 from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.api.test.base import APIBaseTest
 from posthog.api.test.test_insight import insight_test_factory
 from posthog.models.person import Person
 
@@ -16,7 +21,20 @@ def _create_event(**kwargs):
     create_event(**kwargs)
 
 
+@patch("ee.clickhouse.views.insights.ClickhouseSessions", UpdatedClickhouseSessions)
 class ClickhouseTestInsights(
     ClickhouseTestMixin, insight_test_factory(_create_event, _create_person)  # type: ignore
 ):
     pass
+
+
+class ClickhouseTestCancelInsights(ClickhouseTestMixin, APIBaseTest):
+    @patch("ee.clickhouse.views.insights.cancel_queries")
+    def test_cancel(self, patch_cancel_queries) -> None:
+        response = self.client.post("/api/insight/cancel", {"client_query_id": "abc-123"})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        patch_cancel_queries.assert_called_once_with(self.team.pk, "abc-123")
+
+        response = self.client.post("/api/insight/cancel", {"client_query_id": "abc%"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        patch_cancel_queries.assert_called_once()
@@ -1,20 +1,37 @@
 import json
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Dict, List
 
 import kafka_helper  # type: ignore
+import statsd  # type: ignore
 from kafka import KafkaProducer as KP  # type: ignore
 
 from ee.clickhouse.client import async_execute, sync_execute
 from ee.settings import KAFKA_ENABLED
-from posthog.settings import IS_HEROKU, KAFKA_HOSTS, TEST
+from posthog.settings import (
+    IS_HEROKU,
+    KAFKA_BATCH_SIZE,
+    KAFKA_COMPRESSION_TYPE,
+    KAFKA_HOSTS,
+    KAFKA_LINGER_MS,
+    STATSD_HOST,
+    STATSD_PREFIX,
+    TEST,
+)
 from posthog.utils import SingletonDecorator
 
+# How often delivery metrics are sent to statsd
+KAFKA_METRICS_INTERVAL_SECONDS = 10
+
+_json_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
 
 class TestKafkaProducer:
     def __init__(self):
         pass
 
-    def send(self, topic: str, data: Dict[str, Any]):
+    def send(self, topic: str, data: Any):
         return
 
     def flush(self):
@@ -23,21 +40,80 @@ class TestKafkaProducer:
 
 class _KafkaProducer:
     def __init__(self):
+        config = {
+            "linger_ms": KAFKA_LINGER_MS,
+            "batch_size": KAFKA_BATCH_SIZE,
+            "compression_type": KAFKA_COMPRESSION_TYPE,
+        }
         if TEST:
             self.producer = TestKafkaProducer()
         elif not IS_HEROKU:
-            self.producer = KP(bootstrap_servers=KAFKA_HOSTS)
+            self.producer = KP(bootstrap_servers=KAFKA_HOSTS, **config)
         else:
-            self.producer = kafka_helper.get_kafka_producer(value_serializer=lambda d: d)
+            # kafka_helper.get_kafka_producer doesn't take producer options, so it's only used for the SSL setup
+            self.producer = KP(
+                bootstrap_servers=kafka_helper.get_kafka_brokers(),
+                security_protocol="SSL",
+                ssl_context=kafka_helper.get_kafka_ssl_context(),
+                acks="all",
+                **config
+            )
+
+        # Delivery callbacks run on the producer's IO thread
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.produced = 0
+        self.failed = 0
+        self._last_metrics_at = time.monotonic()
 
     @staticmethod
     def json_serializer(d):
-        b = json.dumps(d).encode("utf-8")
-        return b
+        return _json_encoder.encode(d).encode("utf-8")
 
     def produce(self, topic: str, data: Dict[str, Any]):
-        b = self.json_serializer(data)
-        self.producer.send(topic, b)
+        self._send(topic, data)
+        self._report_metrics()
+
+    def produce_many(self, topic: str, data: List[Dict[str, Any]]):
+        """
+        Queues all messages without waiting for them to be delivered, the producer sends them in batches.
+        """
+        for item in data:
+            self._send(topic, item)
+        self._report_metrics()
+
+    def _send(self, topic: str, data: Dict[str, Any]):
+        future = self.producer.send(topic, self.json_serializer(data))
+        if future is None:
+            return
+        with self._lock:
+            self.queued += 1
+        future.add_callback(self._on_delivery, success=True).add_errback(self._on_delivery, success=False)
+
+    def _on_delivery(self, _, success: bool):
+        with self._lock:
+            self.queued -= 1
+            if success:
+                self.produced += 1
+            else:
+                self.failed += 1
+
+    def _report_metrics(self):
+        if not STATSD_HOST or time.monotonic() - self._last_metrics_at < KAFKA_METRICS_INTERVAL_SECONDS:
+            return
+        with self._lock:
+            produced, failed, queued = self.produced, self.failed, self.queued
+            self.produced, self.failed = 0, 0
+            self._last_metrics_at = time.monotonic()
+        try:
+            prefix = "%s_posthog_kafka" % (STATSD_PREFIX,)
+            counter = statsd.Counter(prefix)
+            counter.increment("produced", produced)
+            counter.increment("failed", failed)
+            statsd.Gauge(prefix).send("queued", queued)
+        except:
+            # if we can't connect to statsd don't complain about it.
+            return
 
     def close(self):
         self.producer.flush()
@@ -46,7 +122,7 @@ class _KafkaProducer:
 KafkaProducer = SingletonDecorator(_KafkaProducer)
 
 
-class ClickhouseProducer:
+class _ClickhouseProducer:
     def __init__(self):
         if KAFKA_ENABLED:
             self.send_to_kafka = True
@@ -62,3 +138,13 @@ class ClickhouseProducer:
                 sync_execute(sql, data)
             else:
                 async_execute(sql, data)
+
+    def produce_many(self, sql: str, topic: str, data: List[Dict[str, Any]], sync: bool = True):
+        if self.send_to_kafka:
+            self.producer.produce_many(topic=topic, data=data)
+        else:
+            for item in data:
+                self.produce(sql=sql, topic=topic, data=item, sync=sync)
+
+
+ClickhouseProducer = SingletonDecorator(_ClickhouseProducer)
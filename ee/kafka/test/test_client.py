@@ -0,0 +1,51 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import kafka_helper  # type: ignore
+
+from kafka.future import Future  # type: ignore
+
+from ee.kafka.client import _KafkaProducer
+from posthog.settings import KAFKA_BATCH_SIZE, KAFKA_COMPRESSION_TYPE, KAFKA_LINGER_MS
+
+
+class TestKafkaProducer(TestCase):
+    def test_produce_many_tracks_deliveries(self):
+        producer = _KafkaProducer()
+        futures = [Future(), Future(), Future()]
+        send = MagicMock(side_effect=futures)
+        producer.producer = MagicMock(send=send)
+
+        producer.produce_many("topic", [{"a": 1}, {"a": 2}, {"a": "ü"}])
+
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(send.call_args[0], ("topic", '{"a":"ü"}'.encode("utf-8")))
+        self.assertEqual(producer.queued, 3)
+
+        futures[0].success(None)
+        futures[1].success(None)
+        futures[2].failure(Exception())
+        self.assertEqual((producer.queued, producer.produced, producer.failed), (0, 2, 1))
+
+    @patch("ee.kafka.client.KP")
+    @patch("ee.kafka.client.kafka_helper", autospec=kafka_helper)
+    @patch("ee.kafka.client.IS_HEROKU", True)
+    @patch("ee.kafka.client.TEST", False)
+    def test_heroku_producer_gets_producer_options(self, patch_kafka_helper, patch_kafka_producer):
+        patch_kafka_helper.get_kafka_brokers.return_value = ["kafka:9096"]
+
+        producer = _KafkaProducer()
+
+        self.assertEqual(producer.producer, patch_kafka_producer.return_value)
+        kwargs = patch_kafka_producer.call_args[1]
+        self.assertEqual(kwargs["bootstrap_servers"], ["kafka:9096"])
+        self.assertEqual(kwargs["ssl_context"], patch_kafka_helper.get_kafka_ssl_context.return_value)
+        self.assertEqual(
+            {key: kwargs[key] for key in ["security_protocol", "linger_ms", "batch_size", "compression_type"]},
+            {
+                "security_protocol": "SSL",
+                "linger_ms": KAFKA_LINGER_MS,
+                "batch_size": KAFKA_BATCH_SIZE,
+                "compression_type": KAFKA_COMPRESSION_TYPE,
+            },
+        )
@@ -1,5 +1,6 @@
 KAFKA_EVENTS = "clickhouse_events"
 KAFKA_ELEMENTS = "clickhouse_elements"
+KAFKA_ELEMENTS_CHAIN = "clickhouse_elements_chain"
 KAFKA_PERSON = "clickhouse_person"
 KAFKA_PERSON_UNIQUE_ID = "clickhouse_person_unique_id"
 KAFKA_OMNI_PERSON = "clickhouse_omni_person"
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ee.clickhouse.models.materialized_columns import materialize
+
+
+class Command(BaseCommand):
+    help = "Materialize event properties into their own columns, so filtering and breaking down by them is faster"
+
+    def add_arguments(self, parser):
+        parser.add_argument("properties", nargs="+", help="Event properties to materialize, e.g. $current_url")
+
+    def handle(self, *args, **options):
+        for property in options["properties"]:
+            column = materialize(property)
+            self.stdout.write("Materialized {} as {}".format(property, column))
@@ -0,0 +1,33 @@
+import api from 'lib/api'
+
+// Insight requests send a client_query_id, so that their ClickHouse queries can be cancelled once the result is no
+// longer needed: when a newer request for the same insight replaces them, or when the insight is closed.
+const runningQueries = {}
+
+function generateClientQueryId() {
+    return Date.now().toString(36) + '-' + Math.random().toString(36).substring(2, 12)
+}
+
+export async function getInsight(insightKey, url) {
+    cancelInsight(insightKey)
+    const clientQueryId = generateClientQueryId()
+    runningQueries[insightKey] = clientQueryId
+    const separator = url.indexOf('?') === -1 ? (url[url.length - 1] === '/' ? '?' : '/?') : '&'
+    try {
+        return await api.get(url + separator + 'client_query_id=' + clientQueryId)
+    } finally {
+        if (runningQueries[insightKey] === clientQueryId) {
+            delete runningQueries[insightKey]
+        }
+    }
+}
+
+export function cancelInsight(insightKey) {
+    const clientQueryId = runningQueries[insightKey]
+    if (!clientQueryId) {
+        return
+    }
+    delete runningQueries[insightKey]
+    // Best effort, the endpoint answers with an empty body and only exists with ClickHouse
+    api.create('api/insight/cancel', { client_query_id: clientQueryId }).catch(() => {})
+}
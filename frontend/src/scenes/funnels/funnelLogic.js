@@ -1,5 +1,6 @@
 import { kea } from 'kea'
 import api from 'lib/api'
+import { cancelInsight, getInsight } from 'lib/insightQueries'
 import { ViewType, insightLogic } from 'scenes/insights/insightLogic'
 import { objectsEqual, toParams } from 'lib/utils'
 import { insightHistoryLogic } from 'scenes/insights/InsightHistoryPanel/insightHistoryLogic'
@@ -12,7 +13,7 @@ function wait(ms = 1000) {
 const SECONDS_TO_POLL = 120
 
 export async function pollFunnel(params = {}) {
-    let result = await api.get('api/insight/funnel/?' + toParams(params))
+    let result = await getInsight('funnel', 'api/insight/funnel/?' + toParams(params))
     let count = 0
     while (result.loading && count < SECONDS_TO_POLL) {
         await wait()
@@ -177,4 +178,9 @@ export const funnelLogic = kea({
             }
         },
     }),
+    events: () => ({
+        beforeUnmount: () => {
+            cancelInsight('funnel')
+        },
+    }),
 })
@@ -1,6 +1,7 @@
 import { kea } from 'kea'
 
 import api from 'lib/api'
+import { cancelInsight, getInsight } from 'lib/insightQueries'
 import { objectsEqual, toParams as toAPIParams } from 'lib/utils'
 import { actionsModel } from '~/models/actionsModel'
 import { userLogic } from 'scenes/userLogic'
@@ -117,21 +118,23 @@ export const trendsLogic = kea({
         actions: [insightLogic, ['setAllFilters'], insightHistoryLogic, ['createInsight']],
     },
 
-    loaders: ({ values, props }) => ({
+    loaders: ({ values, props, key }) => ({
         results: {
             __default: [],
             loadResults: async (refresh = false, breakpoint) => {
                 if (values.results.length === 0 && props.cachedResults) return props.cachedResults
                 let response
                 if (props.view === ViewType.SESSIONS || props.filters?.session) {
-                    response = await api.get(
+                    response = await getInsight(
+                        `trends_${key}`,
                         'api/insight/session/?' +
                             (refresh ? 'refresh=true&' : '') +
                             toAPIParams(filterClientSideParams(values.filters))
                     )
                     response = response.result
                 } else {
-                    response = await api.get(
+                    response = await getInsight(
+                        `trends_${key}`,
                         'api/insight/trend/?' +
                             (refresh ? 'refresh=true&' : '') +
                             toAPIParams(filterClientSideParams(values.filters))
@@ -302,4 +305,9 @@ export const trendsLogic = kea({
             }
         },
     }),
+    events: ({ key }) => ({
+        beforeUnmount: () => {
+            cancelInsight(`trends_${key}`)
+        },
+    }),
 })
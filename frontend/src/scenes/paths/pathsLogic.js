@@ -1,6 +1,6 @@
 import { kea } from 'kea'
 import { toParams, objectsEqual } from 'lib/utils'
-import api from 'lib/api'
+import { cancelInsight, getInsight } from 'lib/insightQueries'
 import { router } from 'kea-router'
 import { ViewType, insightLogic } from 'scenes/insights/insightLogic'
 import { insightHistoryLogic } from 'scenes/insights/InsightHistoryPanel/insightHistoryLogic'
@@ -46,7 +46,7 @@ export const pathsLogic = kea({
                 loadPaths: async (_, breakpoint) => {
                     const filter = { ...values.filter, properties: values.properties }
                     const params = toParams(filter)
-                    const paths = await api.get(`api/insight/path${params ? `/?${params}` : ''}`)
+                    const paths = await getInsight('paths', `api/insight/path${params ? `/?${params}` : ''}`)
                     breakpoint()
                     return { paths, filter }
                 },
@@ -167,5 +167,8 @@ export const pathsLogic = kea({
     }),
     events: ({ actions }) => ({
         afterMount: actions.loadPaths,
+        beforeUnmount: () => {
+            cancelInsight('paths')
+        },
     }),
 })
@@ -1,6 +1,7 @@
 import { kea } from 'kea'
 import { router } from 'kea-router'
 import api from 'lib/api'
+import { cancelInsight, getInsight } from 'lib/insightQueries'
 import { toParams, objectsEqual } from 'lib/utils'
 import { ViewType, insightLogic } from 'scenes/insights/insightLogic'
 import { insightHistoryLogic } from 'scenes/insights/InsightHistoryPanel/insightHistoryLogic'
@@ -22,7 +23,7 @@ export const retentionTableLogic = kea({
                 params['properties'] = values.properties
                 if (values.startEntity) params['target_entity'] = values.startEntity
                 const urlParams = toParams(params)
-                return await api.get(`api/insight/retention/?${urlParams}`)
+                return await getInsight('retention', `api/insight/retention/?${urlParams}`)
             },
         },
         people: {
@@ -108,6 +109,9 @@ export const retentionTableLogic = kea({
     }),
     events: ({ actions }) => ({
         afterMount: actions.loadRetention,
+        beforeUnmount: () => {
+            cancelInsight('retention')
+        },
     }),
     actionToUrl: ({ actions, values }) => ({
         [actions.setFilters]: () => {
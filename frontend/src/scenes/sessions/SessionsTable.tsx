@@ -19,7 +19,7 @@ interface SessionsTableProps {
 
 export function SessionsTable({ personIds, isPersonPage = false }: SessionsTableProps): JSX.Element {
     const logic = sessionsTableLogic({ personIds })
-    const { sessions, sessionsLoading, nextOffset, isLoadingNext, selectedDate } = useValues(logic)
+    const { sessions, sessionsLoading, nextCursor, isLoadingNext, selectedDate } = useValues(logic)
     const { fetchNextSessions, dateChanged, previousDay, nextDay } = useActions(logic)
 
     const columns = [
@@ -107,7 +107,7 @@ export function SessionsTable({ personIds, isPersonPage = false }: SessionsTable
                 locale={{ emptyText: 'No Sessions on ' + moment(selectedDate).format('YYYY-MM-DD') }}
                 data-attr="sessions-table"
                 size="small"
-                rowKey={(item) => item.global_session_id}
+                rowKey={(item) => `${item.distinct_id}-${item.start_time}`}
                 pagination={{ pageSize: 99999, hideOnSinglePage: true }}
                 rowClassName="cursor-pointer"
                 dataSource={sessions}
@@ -128,7 +128,7 @@ export function SessionsTable({ personIds, isPersonPage = false }: SessionsTable
                     textAlign: 'center',
                 }}
             >
-                {(nextOffset || isLoadingNext) && (
+                {(nextCursor || isLoadingNext) && (
                     <Button type="primary" onClick={fetchNextSessions}>
                         {isLoadingNext ? <Spin> </Spin> : 'Load more sessions'}
                     </Button>
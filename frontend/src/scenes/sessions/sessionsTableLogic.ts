@@ -1,5 +1,5 @@
 import { kea } from 'kea'
-import api from 'lib/api'
+import { cancelInsight, getInsight } from 'lib/insightQueries'
 import moment from 'moment'
 import { toParams } from 'lib/utils'
 import { sessionsTableLogicType } from 'types/scenes/sessions/sessionsTableLogicType'
@@ -19,20 +19,19 @@ export const sessionsTableLogic = kea<sessionsTableLogicType<Moment, SessionType
                 const params = toParams({
                     date_from: selectedDateURLparam,
                     date_to: selectedDateURLparam,
-                    offset: 0,
                     distinct_id: props.personIds ? props.personIds[0] : '',
                 })
-                const response = await api.get(`api/insight/session/?${params}`)
+                const response = await getInsight('sessions', `api/insight/session/?${params}`)
                 breakpoint()
-                if (response.offset) {
-                    actions.setNextOffset(response.offset)
+                if (response.cursor) {
+                    actions.setNextCursor(response.cursor)
                 }
                 return response.result
             },
         },
     }),
     actions: () => ({
-        setNextOffset: (nextOffset: number | null) => ({ nextOffset }),
+        setNextCursor: (nextCursor: string | null) => ({ nextCursor }),
         fetchNextSessions: true,
         appendNewSessions: (sessions) => ({ sessions }),
         dateChanged: (date: Moment | null) => ({ date }),
@@ -45,10 +44,10 @@ export const sessionsTableLogic = kea<sessionsTableLogicType<Moment, SessionType
             loadSessionsFailure: () => [],
         },
         isLoadingNext: [false, { fetchNextSessions: () => true, appendNewSessions: () => false }],
-        nextOffset: [
-            null as null | number,
+        nextCursor: [
+            null as null | string,
             {
-                setNextOffset: (_, { nextOffset }) => nextOffset,
+                setNextCursor: (_, { nextCursor }) => nextCursor,
                 loadSessionsFailure: () => null,
             },
         ],
@@ -62,20 +61,20 @@ export const sessionsTableLogic = kea<sessionsTableLogicType<Moment, SessionType
             const params = toParams({
                 date_from: values.selectedDateURLparam,
                 date_to: values.selectedDateURLparam,
-                offset: values.nextOffset,
+                cursor: values.nextCursor,
             })
-            const response = await api.get(`api/insight/session/?${params}`)
+            const response = await getInsight('sessions', `api/insight/session/?${params}`)
             breakpoint()
-            if (response.offset) {
-                actions.setNextOffset(response.offset)
+            if (response.cursor) {
+                actions.setNextCursor(response.cursor)
             } else {
-                actions.setNextOffset(null)
+                actions.setNextCursor(null)
             }
             actions.appendNewSessions(response.result)
         },
         dateChanged: () => {
             actions.loadSessions(true)
-            actions.setNextOffset(null)
+            actions.setNextCursor(null)
         },
         previousDay: () => {
             actions.dateChanged(moment(values.selectedDate).add(-1, 'day'))
@@ -107,4 +106,9 @@ export const sessionsTableLogic = kea<sessionsTableLogicType<Moment, SessionType
             }
         },
     }),
+    events: () => ({
+        beforeUnmount: () => {
+            cancelInsight('sessions')
+        },
+    }),
 })
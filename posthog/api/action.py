@@ -40,7 +40,13 @@ from posthog.api.user import UserSerializer
 from posthog.auth import PersonalAPIKeyAuthentication, TemporaryTokenAuthentication
 from posthog.celery import update_cache_item_task
 from posthog.constants import TREND_FILTER_TYPE_ACTIONS, TREND_FILTER_TYPE_EVENTS, TRENDS_CUMULATIVE, TRENDS_STICKINESS
-from posthog.decorators import FUNNEL_ENDPOINT, TRENDS_ENDPOINT, cached_function
+from posthog.decorators import (
+    FUNNEL_ENDPOINT,
+    POSTGRES_BACKEND,
+    TRENDS_ENDPOINT,
+    cached_function,
+    generate_insight_cache_key,
+)
 from posthog.models import (
     Action,
     ActionStep,
@@ -56,7 +62,6 @@ from posthog.models import (
 )
 from posthog.queries import base, funnel, retention, stickiness, trends
 from posthog.tasks.calculate_action import calculate_action
-from posthog.utils import generate_cache_key
 
 from .person import PersonSerializer
 
@@ -230,7 +235,7 @@ class ActionViewSet(viewsets.ModelViewSet):
         dashboard_id = request.GET.get("from_dashboard", None)
 
         filter = Filter(request=request)
-        cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), team.pk))
+        cache_key = generate_insight_cache_key(FUNNEL_ENDPOINT, filter, team.pk, POSTGRES_BACKEND)
         result = {"loading": True}
 
         if refresh:
@@ -244,7 +249,7 @@ class ActionViewSet(viewsets.ModelViewSet):
                 else:
                     return Response(result)
 
-        payload = {"filter": filter.toJSON(), "team_id": team.pk}
+        payload = {"filter": filter.toJSON(), "team_id": team.pk, "backend": POSTGRES_BACKEND}
         task = update_cache_item_task.delay(cache_key, FUNNEL_ENDPOINT, payload)
         task_id = task.id
         cache.set(cache_key, {"task_id": task_id}, 180)  # task will be live for 3 minutes
@@ -304,9 +309,7 @@ class ActionViewSet(viewsets.ModelViewSet):
 
         filtered_events: QuerySet = QuerySet()
         if request.GET.get("session"):
-            filtered_events = (
-                Event.objects.filter(team=team).filter(base.filter_events(team.pk, filter)).add_person_id(team.pk)
-            )
+            filtered_events = Event.objects.filter(team=team).filter(base.filter_events(team.pk, filter))
         else:
             if len(filter.entities) >= 1:
                 entity = filter.entities[0]
@@ -11,11 +11,11 @@ from django.views.decorators.csrf import csrf_exempt
 from posthog.auth import PersonalAPIKeyAuthentication
 from posthog.ee import check_ee_enabled
 from posthog.models import Team
-from posthog.tasks.process_event import process_event
+from posthog.tasks.process_event import process_event, process_event_batch
 from posthog.utils import cors_response, get_ip_address, load_data_from_request
 
 if settings.EE_AVAILABLE:
-    from ee.clickhouse.process_event import process_event_ee
+    from ee.clickhouse.process_event import process_event_ee, process_event_ee_batch
 
 
 def _datetime_from_seconds_or_millis(timestamp: str) -> datetime:
@@ -138,6 +138,7 @@ def get_event(request):
     else:
         events = [data]
 
+    validated_events: List[Dict[str, Any]] = []
     for event in events:
         try:
             distinct_id = _get_distinct_id(event)
@@ -161,25 +162,39 @@ def get_event(request):
                     status=400,
                 ),
             )
+        validated_events.append({"distinct_id": distinct_id, "data": event})
 
+    ip = get_ip_address(request)
+    site_url = request.build_absolute_uri("/")[:-1]
+
+    if len(validated_events) == 1:
         process_event.delay(
-            distinct_id=distinct_id,
-            ip=get_ip_address(request),
-            site_url=request.build_absolute_uri("/")[:-1],
-            data=event,
+            distinct_id=validated_events[0]["distinct_id"],
+            ip=ip,
+            site_url=site_url,
+            data=validated_events[0]["data"],
             team_id=team.id,
             now=now,
             sent_at=sent_at,
         )
         if check_ee_enabled():
             process_event_ee.delay(
-                distinct_id=distinct_id,
-                ip=get_ip_address(request),
-                site_url=request.build_absolute_uri("/")[:-1],
-                data=event,
+                distinct_id=validated_events[0]["distinct_id"],
+                ip=ip,
+                site_url=site_url,
+                data=validated_events[0]["data"],
                 team_id=team.id,
                 now=now,
                 sent_at=sent_at,
             )
+    elif validated_events:
+        # Batches from server-side libraries are processed in a single task instead of one task per event
+        process_event_batch.delay(
+            events=validated_events, ip=ip, site_url=site_url, team_id=team.id, now=now, sent_at=sent_at,
+        )
+        if check_ee_enabled():
+            process_event_ee_batch.delay(
+                events=validated_events, ip=ip, site_url=site_url, team_id=team.id, now=now, sent_at=sent_at,
+            )
 
     return cors_response(request, JsonResponse({"status": 1}))
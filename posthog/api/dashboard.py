@@ -15,8 +15,9 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import AuthenticationFailed
 
 from posthog.auth import PersonalAPIKeyAuthentication, PublicTokenAuthentication
+from posthog.decorators import default_insight_backend, generate_insight_cache_key, get_cache_type
 from posthog.models import Dashboard, DashboardItem, Filter
-from posthog.utils import generate_cache_key, render_template
+from posthog.utils import render_template
 
 
 class DashboardSerializer(serializers.ModelSerializer):
@@ -140,7 +141,9 @@ class DashboardItemSerializer(serializers.ModelSerializer):
         if not dashboard_item.filters:
             return None
         filter = Filter(data=dashboard_item.filters)
-        cache_key = generate_cache_key(filter.toJSON() + "_" + str(dashboard_item.team_id))
+        cache_key = generate_insight_cache_key(
+            get_cache_type(filter), filter, dashboard_item.team_id, default_insight_backend()
+        )
         result = cache.get(cache_key)
         if not result or result.get("task_id", None):
             return None
@@ -8,7 +8,7 @@ from django.http import HttpRequest, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
 from posthog.auth import PersonalAPIKeyAuthentication
-from posthog.models import FeatureFlag, Team
+from posthog.models import FeatureFlagMatcher, Team, get_active_feature_flags
 from posthog.utils import base64_to_json, cors_response, load_data_from_request
 
 
@@ -75,13 +75,9 @@ def get_team_from_token(request: HttpRequest, data_from_request: Dict[str, Any])
 
 
 def feature_flags(request: HttpRequest, team: Team, data: Dict[str, Any]) -> List[str]:
-    flags_enabled = []
-    feature_flags = FeatureFlag.objects.filter(team=team, active=True, deleted=False)
-    for feature_flag in feature_flags:
-        # distinct_id will always be a string, but data can have non-string values ("Any")
-        if feature_flag.distinct_id_matches(data["distinct_id"]):
-            flags_enabled.append(feature_flag.key)
-    return flags_enabled
+    # distinct_id will always be a string, but data can have non-string values ("Any")
+    matcher = FeatureFlagMatcher(team.pk, data["distinct_id"])
+    return [feature_flag.key for feature_flag in get_active_feature_flags(team.pk) if matcher.matches(feature_flag)]
 
 
 def parse_domain(url: Any) -> Optional[str]:
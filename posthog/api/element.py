@@ -1,6 +1,6 @@
 import json
 
-from django.db.models import Count, Prefetch, QuerySet
+from django.db.models import Count, QuerySet
 from rest_framework import authentication, request, response, serializers, viewsets
 from rest_framework.decorators import action
 
@@ -52,21 +52,14 @@ class ElementViewSet(viewsets.ModelViewSet):
 
         events = events.values("elements_hash").annotate(count=Count(1)).order_by("-count")[0:100]
 
-        groups = ElementGroup.objects.filter(
-            team=team, hash__in=[item["elements_hash"] for item in events]
-        ).prefetch_related(Prefetch("element_set", queryset=Element.objects.order_by("order", "id")))
+        elements = ElementGroup.objects.elements_by_hash(team.pk, [item["elements_hash"] for item in events])
 
         return response.Response(
             [
                 {
                     "count": item["count"],
                     "hash": item["elements_hash"],
-                    "elements": [
-                        ElementSerializer(element).data
-                        for element in [group for group in groups if group.hash == item["elements_hash"]][
-                            0
-                        ].element_set.all()
-                    ],
+                    "elements": ElementSerializer(elements.get(item["elements_hash"], []), many=True).data,
                 }
                 for item in events
             ]
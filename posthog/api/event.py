@@ -1,6 +1,6 @@
 import json
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 import pandas as pd
 from dateutil.relativedelta import relativedelta
@@ -8,6 +8,7 @@ from django.db import connection
 from django.db.models import F, Prefetch, Q, QuerySet
 from django.db.models.expressions import Window
 from django.db.models.functions import Lag
+from django.http import StreamingHttpResponse
 from django.utils.timezone import now
 from rest_framework import exceptions, request, response, serializers, viewsets
 from rest_framework.decorators import action
@@ -35,6 +36,8 @@ from posthog.utils import (
     request_to_date_query,
 )
 
+from .export import csv_header, keyset_pages, streaming_csv_response
+
 
 class ElementSerializer(serializers.ModelSerializer):
     event = serializers.CharField()
@@ -85,12 +88,8 @@ class EventSerializer(serializers.HyperlinkedModelSerializer):
     def get_elements(self, event: Event):
         if not event.elements_hash:
             return []
-        if hasattr(event, "elements_group_cache"):
-            if event.elements_group_cache:  # type: ignore
-                return ElementSerializer(
-                    event.elements_group_cache.element_set.all().order_by("order"),  # type: ignore
-                    many=True,
-                ).data
+        if hasattr(event, "elements_cache"):
+            return ElementSerializer(event.elements_cache, many=True).data  # type: ignore
         elements = (
             ElementGroup.objects.get(hash=event.elements_hash, team_id=event.team_id)
             .element_set.all()
@@ -114,8 +113,6 @@ class EventViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
 
         team = self.request.user.team
-        queryset = queryset.add_person_id(team.pk)  # type: ignore
-
         if self.action == "list" or self.action == "sessions" or self.action == "actions":  # type: ignore
             queryset = self._filter_request(self.request, queryset, team)
 
@@ -160,47 +157,32 @@ class EventViewSet(viewsets.ModelViewSet):
 
     def _prefetch_events(self, events: List[Event]) -> List[Event]:
         team = self.request.user.team
-        distinct_ids = []
-        hash_ids = []
-        for event in events:
-            distinct_ids.append(event.distinct_id)
-            if event.elements_hash:
-                hash_ids.append(event.elements_hash)
-        people = Person.objects.filter(team=team, persondistinctid__distinct_id__in=distinct_ids).prefetch_related(
-            Prefetch("persondistinctid_set", to_attr="distinct_ids_cache")
+        people = Person.objects.by_distinct_ids(team.pk, [event.distinct_id for event in events])
+        elements = ElementGroup.objects.elements_by_hash(
+            team.pk, [event.elements_hash for event in events if event.elements_hash]
         )
-        if len(hash_ids) > 0:
-            groups = ElementGroup.objects.filter(team=team, hash__in=hash_ids).prefetch_related("element_set")
-        else:
-            groups = ElementGroup.objects.none()
         for event in events:
-            try:
-                event.person_properties = [person.properties for person in people if event.distinct_id in person.distinct_ids][0]  # type: ignore
-            except IndexError:
-                event.person_properties = None  # type: ignore
-            try:
-                event.elements_group_cache = [group for group in groups if group.hash == event.elements_hash][0]  # type: ignore
-            except IndexError:
-                event.elements_group_cache = None  # type: ignore
+            person = people.get(event.distinct_id)
+            event.person_properties = person.properties if person else None  # type: ignore
+            event.elements_cache = elements.get(event.elements_hash, [])  # type: ignore
         return events
 
     def list(self, request: request.Request, *args: Any, **kwargs: Any) -> response.Response:
         queryset = self.get_queryset()
+        if self.request.accepted_renderer.format == "csv":
+            return self._export_csv(queryset)  # type: ignore
+
         monday = now() + timedelta(days=-now().weekday())
         events = queryset.filter(timestamp__gte=monday.replace(hour=0, minute=0, second=0))[0:101]
 
-        is_csv_request = self.request.accepted_renderer.format == "csv"
-
-        if not is_csv_request and len(events) < 101:
+        if len(events) < 101:
             events = queryset[0:101]
-        elif is_csv_request:
-            events = queryset[0:100000]
 
         prefetched_events = self._prefetch_events([event for event in events])
         path = request.get_full_path()
 
         reverse = request.GET.get("orderBy", "-timestamp") != "-timestamp"
-        if not is_csv_request and len(events) > 100:
+        if len(events) > 100:
             next_url: Optional[str] = request.build_absolute_uri(
                 "{}{}{}={}".format(
                     path,
@@ -221,6 +203,21 @@ class EventViewSet(viewsets.ModelViewSet):
             }
         )
 
+    def _export_csv(self, queryset: QuerySet) -> StreamingHttpResponse:
+        ordering = ["timestamp", "id"] if queryset.query.order_by[:1] == ("timestamp",) else ["-timestamp", "-id"]
+        # Columns are known up front so that rows can be written as they're loaded, properties are the only
+        # columns that vary between events
+        header = csv_header(
+            {"properties": properties} for properties in queryset.values_list("properties", flat=True).iterator()
+        )
+        header = sorted(set(header) | {"id", "distinct_id", "event", "timestamp", "person"})
+
+        def rows() -> Iterator[Dict[str, Any]]:
+            for page in keyset_pages(queryset, ordering):
+                yield from EventSerializer(self._prefetch_events(page), many=True, context={"format": "csv"}).data
+
+        return streaming_csv_response(header, rows())
+
     @action(methods=["GET"], detail=False)
     def actions(self, request: request.Request) -> response.Response:
         action_id, action_id_raw = None, request.query_params.get("id")
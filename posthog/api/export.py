@@ -0,0 +1,60 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from django.db.models import Model, Q, QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework_csv.renderers import CSVStreamingRenderer  # type: ignore
+
+# Rows loaded and serialized at a time when exporting
+EXPORT_BATCH_SIZE = 1000
+
+
+def keyset_pages(queryset: QuerySet, ordering: List[str], batch_size: Optional[int] = None) -> Iterator[List[Any]]:
+    """
+    Pages through the queryset by the values of `ordering` of the last row of the previous page, unlike offsets
+    every page is an index lookup, and rows created while paging don't shift later pages.
+    `ordering` has to be unique, eg end with the primary key.
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    queryset = queryset.order_by(*ordering)
+    page = list(queryset[:batch_size])
+    while page:
+        yield page
+        if len(page) < batch_size:
+            return
+        page = list(queryset.filter(_after(page[-1], ordering))[:batch_size])
+
+
+def _after(row: Model, ordering: List[str]) -> Q:
+    # (a, b) > (x, y) as (a > x) OR (a = x AND b > y), each field in its own direction
+    condition = Q()
+    equal: Dict[str, Any] = {}
+    for field in ordering:
+        name = field.lstrip("-")
+        value = getattr(row, name)
+        lookup = "{}__lt".format(name) if field.startswith("-") else "{}__gt".format(name)
+        condition |= Q(**equal, **{lookup: value})
+        equal[name] = value
+    return condition
+
+
+def csv_header(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    The columns `PaginatedCSVRenderer` gives these rows, without keeping the rows in memory.
+    """
+    columns: Set[str] = set()
+    for row in CSVStreamingRenderer().flatten_data(rows):
+        columns.update(row.keys())
+    return sorted(columns)
+
+
+def streaming_csv_response(header: List[str], rows: Iterable[Dict[str, Any]]) -> StreamingHttpResponse:
+    """
+    Writes rows as CSV while they're generated, in the same format as `PaginatedCSVRenderer` if the header
+    was collected with `csv_header`.
+    """
+    if not header:
+        return StreamingHttpResponse([], content_type="text/csv")
+    return StreamingHttpResponse(
+        CSVStreamingRenderer().render((row for row in rows), renderer_context={"header": header}),
+        content_type="text/csv",
+    )
@@ -3,11 +3,14 @@ from typing import Any, Dict
 import posthoganalytics
 from django.db import IntegrityError
 from django.db.models import QuerySet
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import response, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.request import Request
 
 from posthog.api.user import UserSerializer
 from posthog.mixins import AnalyticsDestroyModelMixin
-from posthog.models import FeatureFlag
+from posthog.models import FeatureFlag, get_flag_definitions
 
 
 class FeatureFlagSerializer(serializers.HyperlinkedModelSerializer):
@@ -66,3 +69,16 @@ class FeatureFlagViewSet(AnalyticsDestroyModelMixin, viewsets.ModelViewSet):
         if self.action == "list":  # type: ignore
             queryset = queryset.filter(deleted=False)
         return queryset.filter(team=self.request.user.team).order_by("-created_at")
+
+    @action(methods=["GET"], detail=False)
+    def local_evaluation(self, request: Request) -> response.Response:
+        """
+        Definitions of the team's active flags for server libraries to evaluate locally. They poll this with the
+        ETag of their copy in `If-None-Match`, and get an empty 304 until any of the definitions change.
+        """
+        definitions, version = get_flag_definitions(request.user.team.pk)
+        etag = quote_etag(version)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return response.Response({"flags": definitions}, headers={"ETag": etag})
@@ -1,6 +1,6 @@
 from datetime import datetime
 from distutils.util import strtobool
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.core.cache import cache
 from django.db.models import QuerySet
@@ -10,13 +10,27 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from posthog.celery import update_cache_item_task
-from posthog.constants import DATE_FROM, FROM_DASHBOARD, INSIGHT, OFFSET, TRENDS_STICKINESS
-from posthog.decorators import FUNNEL_ENDPOINT, TRENDS_ENDPOINT, cached_function
+from posthog.constants import CURSOR, DATE_FROM, FROM_DASHBOARD, INSIGHT, OFFSET, TRENDS_STICKINESS
+from posthog.decorators import (
+    FUNNEL_CACHE_EXPIRY,
+    FUNNEL_ENDPOINT,
+    INSIGHT_REFRESH_TIMEOUT,
+    PATHS_ENDPOINT,
+    POSTGRES_BACKEND,
+    RETENTION_ENDPOINT,
+    SESSIONS_ENDPOINT,
+    TRENDS_ENDPOINT,
+    cached_function,
+    default_insight_backend,
+    generate_insight_cache_key,
+    get_cache_type,
+    is_cache_fresh,
+)
 from posthog.models import DashboardItem, Filter, Person
 from posthog.models.action import Action
 from posthog.queries import paths, retention, sessions, stickiness, trends
-from posthog.queries.sessions import SESSIONS_LIST_DEFAULT_LIMIT
-from posthog.utils import generate_cache_key, request_to_date_query
+from posthog.queries.sessions import SESSIONS_LIST_DEFAULT_LIMIT, parse_session_cursor, session_cursor
+from posthog.utils import request_to_date_query
 
 
 class InsightSerializer(serializers.ModelSerializer):
@@ -65,7 +79,9 @@ class InsightSerializer(serializers.ModelSerializer):
         if not dashboard_item.filters:
             return None
         filter = Filter(data=dashboard_item.filters)
-        cache_key = generate_cache_key(filter.toJSON() + "_" + str(dashboard_item.team_id))
+        cache_key = generate_insight_cache_key(
+            get_cache_type(filter), filter, dashboard_item.team_id, default_insight_backend()
+        )
         result = cache.get(cache_key)
         if not result or result.get("task_id", None):
             return None
@@ -146,6 +162,7 @@ class InsightViewSet(viewsets.ModelViewSet):
     # params:
     # - session: (string: avg, dist) specifies session type
     # - offset: (number) offset query param for paginated list of user sessions
+    # - cursor: (string) cursor query param for paginated list of user sessions, the `cursor` of the previous page
     # - **shared filter types
     # ******************************************
     @action(methods=["GET"], detail=False)
@@ -153,8 +170,19 @@ class InsightViewSet(viewsets.ModelViewSet):
         team = self.request.user.team
 
         filter = Filter(request=request)
+        if filter.session_type is not None:
+            return Response({"result": self.calculate_session_graph(request)})
+
         limit = SESSIONS_LIST_DEFAULT_LIMIT + 1
-        result: Dict[str, Any] = {"result": sessions.Sessions().run(filter=filter, team=team, limit=limit)}
+        cursor = self._session_cursor(request)
+        result: Dict[str, Any] = {
+            "result": sessions.Sessions().run(filter=filter, team=team, limit=limit, cursor=cursor)
+        }
+        next_cursor = (
+            session_cursor(result["result"][SESSIONS_LIST_DEFAULT_LIMIT - 1])
+            if len(result["result"]) > SESSIONS_LIST_DEFAULT_LIMIT
+            else None
+        )
 
         if "distinct_id" in request.GET and request.GET["distinct_id"]:
             result = self._filter_sessions_by_distinct_id(request.GET["distinct_id"], result)
@@ -164,29 +192,27 @@ class InsightViewSet(viewsets.ModelViewSet):
             if len(result["result"]) > SESSIONS_LIST_DEFAULT_LIMIT:
                 result["result"].pop()
                 date_from = result["result"][0]["start_time"].isoformat()
-                result.update({OFFSET: offset})
+                if cursor is None:
+                    result.update({OFFSET: offset})
                 result.update({DATE_FROM: date_from})
+            if next_cursor:
+                result.update({CURSOR: next_cursor})
 
         return Response(result)
 
-    def calculate_session(self, request: request.Request) -> Dict[str, Any]:
+    @cached_function(cache_type=SESSIONS_ENDPOINT)
+    def calculate_session_graph(self, request: request.Request) -> List[Dict[str, Any]]:
         team = self.request.user.team
-
         filter = Filter(request=request)
-        result: Dict[str, Any] = {"result": sessions.Sessions().run(filter, team)}
-
-        if "distinct_id" in request.GET and request.GET["distinct_id"]:
-            result = self._filter_sessions_by_distinct_id(request.GET["distinct_id"], result)
-
-        # add pagination
-        if filter.session_type is None:
-            offset = filter.offset + 50
-            if len(result["result"]) > 49:
-                date_from = result["result"][0]["start_time"].isoformat()
-                result.update({OFFSET: offset})
-                result.update({DATE_FROM: date_from})
+        return sessions.Sessions().run(filter, team)
 
-        return result
+    def _session_cursor(self, request: request.Request) -> Optional[Tuple[datetime, str]]:
+        if not request.GET.get(CURSOR):
+            return None
+        try:
+            return parse_session_cursor(request.GET[CURSOR])
+        except (ValueError, TypeError):
+            raise serializers.ValidationError({CURSOR: "Invalid cursor."})
 
     def _filter_sessions_by_distinct_id(self, distinct_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
         person_ids = Person.objects.get(persondistinctid__distinct_id=distinct_id).distinct_ids
@@ -216,8 +242,9 @@ class InsightViewSet(viewsets.ModelViewSet):
         refresh = request.GET.get("refresh", None)
 
         filter = Filter(request=request)
-        cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), team.pk))
+        cache_key = generate_insight_cache_key(FUNNEL_ENDPOINT, filter, team.pk, POSTGRES_BACKEND)
         result = {"loading": True}
+        payload = {"filter": filter.toJSON(), "team_id": team.pk, "backend": POSTGRES_BACKEND}
 
         if refresh:
             cache.delete(cache_key)
@@ -226,12 +253,15 @@ class InsightViewSet(viewsets.ModelViewSet):
             if cached_result:
                 task_id = cached_result.get("task_id", None)
                 if not task_id:
+                    # funnels are always calculated in the background, serve the cached result in the meantime
+                    if not is_cache_fresh(cached_result, FUNNEL_CACHE_EXPIRY) and cache.add(
+                        cache_key + "_refreshing", True, INSIGHT_REFRESH_TIMEOUT
+                    ):
+                        update_cache_item_task.delay(cache_key, FUNNEL_ENDPOINT, payload)
                     return cached_result["result"]
                 else:
                     return result
 
-        payload = {"filter": filter.toJSON(), "team_id": team.pk}
-
         task = update_cache_item_task.delay(cache_key, FUNNEL_ENDPOINT, payload)
         task_id = task.id
         cache.set(cache_key, {"task_id": task_id}, 180)  # task will be live for 3 minutes
@@ -250,6 +280,7 @@ class InsightViewSet(viewsets.ModelViewSet):
         result = self.calculate_retention(request)
         return Response({"data": result})
 
+    @cached_function(cache_type=RETENTION_ENDPOINT)
     def calculate_retention(self, request: request.Request) -> List[Dict[str, Any]]:
         team = request.user.team
         filter = Filter(request=request)
@@ -269,6 +300,7 @@ class InsightViewSet(viewsets.ModelViewSet):
         result = self.calculate_path(request)
         return Response(result)
 
+    @cached_function(cache_type=PATHS_ENDPOINT)
     def calculate_path(self, request: request.Request) -> List[Dict[str, Any]]:
         team = request.user.team
         filter = Filter(request=request)
@@ -1,19 +1,21 @@
 import json
 import warnings
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 from django.core.cache import cache
 from django.db.models import Count, Func, Prefetch, Q, QuerySet
+from django.http import StreamingHttpResponse
 from django_filters import rest_framework as filters
 from rest_framework import request, response, serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.settings import api_settings
 from rest_framework_csv import renderers as csvrenderers  # type: ignore
 
-from posthog.models import Event, Filter, Person, Team
+from posthog.models import Event, Filter, Person, PersonDistinctId, Team
 from posthog.utils import convert_property_value
 
 from .base import CursorPagination as BaseCursorPagination
+from .export import csv_header, keyset_pages, streaming_csv_response
 
 
 class PersonSerializer(serializers.HyperlinkedModelSerializer):
@@ -62,10 +64,36 @@ class PersonViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = PersonFilter
 
-    def paginate_queryset(self, queryset):
-        if self.request.accepted_renderer.format == "csv" or not self.paginator:
-            return None
-        return self.paginator.paginate_queryset(queryset, self.request, view=self)
+    def list(self, request: request.Request, *args: Any, **kwargs: Any) -> response.Response:
+        if request.accepted_renderer.format == "csv":
+            return self._export_csv(self.filter_queryset(self.get_queryset()))  # type: ignore
+        return super().list(request, *args, **kwargs)
+
+    def _export_csv(self, queryset: QuerySet) -> StreamingHttpResponse:
+        # Columns are known up front so that rows can be written as they're loaded, only properties and the number
+        # of distinct ids vary between people
+        header = csv_header(
+            {"properties": properties} for properties in queryset.values_list("properties", flat=True).iterator()
+        )
+        max_distinct_ids = (
+            PersonDistinctId.objects.filter(person_id__in=queryset.values("id"))
+            .values("person_id")
+            .annotate(count=Count("id"))
+            .order_by("-count")
+            .values_list("count", flat=True)
+            .first()
+        ) or 0
+        header = sorted(
+            set(header)
+            | {"id", "name", "created_at"}
+            | {"distinct_ids.{}".format(index) for index in range(max_distinct_ids)}
+        )
+
+        def rows() -> Iterator[Dict[str, Any]]:
+            for page in keyset_pages(queryset, ["-id"]):
+                yield from PersonSerializer(page, many=True).data
+
+        return streaming_csv_response(header, rows())
 
     def _filter_request(self, request: request.Request, queryset: QuerySet, team: Team) -> QuerySet:
         if request.GET.get("id"):
@@ -105,8 +105,9 @@ class TestCapture(BaseTest):
         )
 
     @patch("posthog.models.team.TEAM_CACHE", {})
+    @patch("posthog.tasks.process_event.process_event_batch.delay")
     @patch("posthog.tasks.process_event.process_event.delay")
-    def test_multiple_events(self, patch_process_event):
+    def test_multiple_events(self, patch_process_event, patch_process_event_batch):
         self.client.post(
             "/track/",
             data={
@@ -119,7 +120,31 @@ class TestCapture(BaseTest):
                 "api_key": self.team.api_token,
             },
         )
-        self.assertEqual(patch_process_event.call_count, 2)
+        self.assertEqual(patch_process_event.call_count, 0)
+        self.assertEqual(patch_process_event_batch.call_count, 1)
+        arguments = patch_process_event_batch.call_args[1]
+        self.assertEqual(arguments["team_id"], self.team.pk)
+        self.assertListEqual(
+            [(event["distinct_id"], event["data"]["event"]) for event in arguments["events"]],
+            [("eeee", "beep"), ("aaaa", "boop")],
+        )
+
+    @patch("posthog.models.team.TEAM_CACHE", {})
+    @patch("posthog.tasks.process_event.process_event_batch.delay")
+    def test_batch_invalid_event_rejects_whole_batch(self, patch_process_event_batch):
+        response = self.client.post(
+            "/batch/",
+            data={
+                "api_key": self.team.api_token,
+                "batch": [
+                    {"type": "capture", "event": "user signed up", "distinct_id": "2"},
+                    {"type": "capture", "distinct_id": "2"},
+                ],
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(patch_process_event_batch.call_count, 0)
 
     @patch("posthog.models.team.TEAM_CACHE", {})
     @patch("posthog.tasks.process_event.process_event.delay")
@@ -111,11 +111,13 @@ class TestDecide(BaseTest):
             key="filer-by-property-2",
             created_by=self.user,
         )
-        with self.assertNumQueries(4):
+        # the team, the team's flags and the person, however many flags filter on person properties
+        with self.assertNumQueries(3):
             response = self._post_decide()
         self.assertEqual(response["featureFlags"][0], "beta-feature")
 
-        with self.assertNumQueries(4):
+        # team and flags are cached after the first request
+        with self.assertNumQueries(1):
             response = self._post_decide({"token": self.team.api_token, "distinct_id": "another_id"})
         self.assertEqual(len(response["featureFlags"]), 0)
 
@@ -70,7 +70,7 @@ class TestElement(BaseTest):
             elements=[Element(tag_name="img")],
         )
 
-        with self.assertNumQueries(6):
+        with self.assertNumQueries(5):
             response = self.client.get("/api/element/stats/").json()
         self.assertEqual(response[0]["count"], 2)
         self.assertEqual(response[0]["hash"], event1.elements_hash)
@@ -1,4 +1,7 @@
+import csv
+import io
 import json
+from unittest.mock import patch
 
 from freezegun import freeze_time
 
@@ -31,7 +34,7 @@ def test_event_api_factory(event_factory, person_factory, action_factory):
                 event="$pageview", team=self.team, distinct_id="some-other-one", properties={"$ip": "8.8.8.8"}
             )
 
-            with self.assertNumQueries(10):
+            with self.assertNumQueries(7):
                 response = self.client.get("/api/event/?distinct_id=2").json()
             self.assertEqual(response["results"][0]["person"], "tim@posthog.com")
             self.assertEqual(response["results"][0]["elements"][0]["tag_name"], "button")
@@ -46,7 +49,7 @@ def test_event_api_factory(event_factory, person_factory, action_factory):
             event1 = event_factory(
                 event="another event", team=self.team, distinct_id="2", properties={"$ip": "8.8.8.8"},
             )
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(6):
                 response = self.client.get("/api/event/?event=event_name").json()
             self.assertEqual(response["results"][0]["event"], "event_name")
 
@@ -61,7 +64,7 @@ def test_event_api_factory(event_factory, person_factory, action_factory):
                 event="event_name", team=self.team, distinct_id="2", properties={"$browser": "Safari"},
             )
 
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(6):
                 response = self.client.get(
                     "/api/event/?properties=%s" % (json.dumps([{"key": "$browser", "value": "Safari"}]))
                 ).json()
@@ -124,7 +127,8 @@ def test_event_api_factory(event_factory, person_factory, action_factory):
             )
             return sign_up
 
-        def test_live_action_events(self):
+        @patch("posthog.tasks.calculate_element_selector.calculate_element_selector.delay")
+        def test_live_action_events(self, patch_calculate_element_selector):
             action_sign_up = Action.objects.create(team=self.team, name="signed up")
             ActionStep.objects.create(event="$autocapture", action=action_sign_up, tag_name="button", text="Sign up!")
             # 2 steps that match same element might trip stuff up
@@ -287,4 +291,26 @@ def _create_action(**kwargs):
 
 
 class TestEvent(test_event_api_factory(Event.objects.create, Person.objects.create, _create_action)):  # type: ignore
-    pass
+    @patch("posthog.api.export.EXPORT_BATCH_SIZE", 2)
+    def test_export_csv(self):
+        Person.objects.create(team=self.team, distinct_ids=["1"], properties={"email": "tim@posthog.com"})
+        with freeze_time("2020-01-10"):
+            for index in range(5):
+                Event.objects.create(team=self.team, event="$pageview", distinct_id="1", properties={"index": index})
+        Event.objects.create(team=self.team, event="$pageview", distinct_id="2", properties={"$browser": "Chrome"})
+
+        response = self.client.get("/api/event.csv")
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(response.getvalue().decode("utf-8"))))
+
+        self.assertEqual(
+            list(rows[0].keys()),
+            ["distinct_id", "event", "id", "person", "properties.$browser", "properties.index", "timestamp"],
+        )
+        self.assertEqual([row["properties.index"] for row in rows], ["", "4", "3", "2", "1", "0"])
+        self.assertEqual(rows[0]["properties.$browser"], "Chrome")
+        self.assertEqual(rows[1]["person"], "tim@posthog.com")
+
+        response = self.client.get('/api/event.csv?orderBy=["timestamp"]')
+        rows = list(csv.DictReader(io.StringIO(response.getvalue().decode("utf-8"))))
+        self.assertEqual([row["properties.index"] for row in rows], ["0", "1", "2", "3", "4", ""])
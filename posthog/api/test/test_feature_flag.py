@@ -2,7 +2,7 @@ from unittest.mock import patch
 
 from rest_framework import status
 
-from posthog.models import FeatureFlag, User
+from posthog.models import FeatureFlag, PersonalAPIKey, User
 
 from .base import APIBaseTest, TransactionBaseTest
 
@@ -150,3 +150,58 @@ class TestAPIFeatureFlag(APIBaseTest):
         self.assertTrue(FeatureFlag.objects.filter(pk=self.feature_flag.pk).exists())
 
         mock_capture.assert_not_called()
+
+    @patch("posthoganalytics.capture")
+    def test_local_evaluation(self, mock_capture):
+        FeatureFlag.objects.create(
+            team=self.team,
+            created_by=self.user,
+            key="beta-feature",
+            rollout_percentage=50,
+            filters={"properties": {"email__icontains": "posthog.com"}},
+        )
+        FeatureFlag.objects.create(team=self.team, created_by=self.user, key="inactive", active=False)
+        key = PersonalAPIKey.objects.create(label="Server", team=self.team, user=self.user)
+
+        response = self.client.get("/api/feature_flag/local_evaluation", HTTP_AUTHORIZATION=f"Bearer {key.value}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "flags": [
+                    {"key": "red_button", "rollout_percentage": None, "filters": {"properties": []}},
+                    {
+                        "key": "beta-feature",
+                        "rollout_percentage": 50,
+                        "filters": {
+                            "properties": [
+                                {"key": "email", "value": "posthog.com", "operator": "icontains", "type": "event"}
+                            ]
+                        },
+                    },
+                ]
+            },
+        )
+        etag = response["ETag"]
+
+        with self.assertNumQueries(2):  # authenticating the key and updating when it was last used
+            response = self.client.get(
+                "/api/feature_flag/local_evaluation", HTTP_AUTHORIZATION=f"Bearer {key.value}", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        self.feature_flag.rollout_percentage = 20
+        with patch("posthog.models.feature_flag.transaction.on_commit", lambda callback: callback()):
+            self.feature_flag.save()
+        response = self.client.get(
+            "/api/feature_flag/local_evaluation", HTTP_AUTHORIZATION=f"Bearer {key.value}", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["flags"][0]["rollout_percentage"], 20)
+
+    def test_local_evaluation_requires_authentication(self):
+        self.client.logout()
+        response = self.client.get("/api/feature_flag/local_evaluation")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
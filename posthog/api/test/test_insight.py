@@ -1,5 +1,6 @@
 import json
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
 from django.test.utils import override_settings
@@ -11,6 +12,7 @@ from posthog.models.dashboard_item import DashboardItem
 from posthog.models.event import Event
 from posthog.models.filter import Filter
 from posthog.models.person import Person
+from posthog.tasks.update_cache import update_cache_item
 from posthog.utils import relative_date_parse
 
 from .base import TransactionBaseTest
@@ -132,6 +134,16 @@ def insight_test_factory(event_factory, person_factory):
             self.assertEqual(len(response["result"]), 50)
             self.assertEqual(response["offset"], 50)
 
+            cursor_response = self.client.get(
+                "/api/insight/session/",
+                data={"date_from": "2012-01-14", "date_to": "2012-01-17", "cursor": response["cursor"]},
+            ).json()
+            self.assertEqual(len(cursor_response["result"]), 2)
+            self.assertEqual(cursor_response.get("cursor", None), None)
+
+            response = self.client.get("/api/insight/session/", data={"cursor": "not a cursor"})
+            self.assertEqual(response.status_code, 400)
+
             response = self.client.get(
                 "/api/insight/session/?date_from=2012-01-14&date_to=2012-01-17&offset=50",
             ).json()
@@ -150,6 +162,30 @@ def insight_test_factory(event_factory, person_factory):
             response = self.client.get("/api/insight/path",).json()
             self.assertEqual(len(response), 1)
 
+        @patch("posthog.celery.update_cache_item_task.delay")
+        def test_insight_results_served_from_cache_while_refreshing(self, update_cache_item_delay):
+            person_factory(team=self.team, distinct_ids=["person_1"])
+            for index, url in enumerate(["/", "/about", "/pricing"]):
+                with freeze_time("2012-01-15T04:00:0{}.000Z".format(index)):
+                    event_factory(
+                        properties={"$current_url": url}, distinct_id="person_1", event="$pageview", team=self.team
+                    )
+                if index == 1:
+                    with freeze_time("2012-01-15T04:01:00.000Z"):
+                        self.assertEqual(len(self.client.get("/api/insight/path").json()), 1)
+
+            with freeze_time("2012-01-15T04:01:10.000Z"):
+                self.assertEqual(len(self.client.get("/api/insight/path").json()), 1)
+            update_cache_item_delay.assert_not_called()
+
+            # stale results are returned while they're recalculated
+            with freeze_time("2012-01-15T04:02:00.000Z"):
+                self.assertEqual(len(self.client.get("/api/insight/path").json()), 1)
+                self.assertEqual(len(self.client.get("/api/insight/path").json()), 1)
+                self.assertEqual(update_cache_item_delay.call_count, 1)
+                update_cache_item(*update_cache_item_delay.call_args[0])
+                self.assertEqual(len(self.client.get("/api/insight/path").json()), 2)
+
         # TODO: remove this check
         if not check_ee_enabled():
 
@@ -163,6 +199,25 @@ def insight_test_factory(event_factory, person_factory):
                 ).json()
                 self.assertEqual(response["loading"], True)
 
+            @patch("posthog.celery.update_cache_item_task.delay")
+            def test_insight_funnels_recalculated_less_often(self, update_cache_item_delay):
+                event_factory(team=self.team, event="user signed up", distinct_id="1")
+                url = "/api/insight/funnel/?events={}".format(
+                    json.dumps([{"id": "user signed up", "type": "events", "order": 0},])
+                )
+                with freeze_time("2012-01-15T04:00:00.000Z"):
+                    self.client.get(url)
+                    update_cache_item(*update_cache_item_delay.call_args[0])
+                update_cache_item_delay.reset_mock()
+
+                with freeze_time("2012-01-15T04:05:00.000Z"):
+                    self.assertNotIn("loading", self.client.get(url).json())
+                update_cache_item_delay.assert_not_called()
+
+                with freeze_time("2012-01-15T04:11:00.000Z"):
+                    self.assertNotIn("loading", self.client.get(url).json())
+                update_cache_item_delay.assert_called_once()
+
             # TODO: remove this check
             def test_insight_retention_basic(self):
                 person1 = person_factory(
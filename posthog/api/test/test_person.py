@@ -1,4 +1,7 @@
+import csv
+import io
 import json
+from unittest.mock import patch
 
 from django.utils import timezone
 from rest_framework import status
@@ -256,3 +259,29 @@ class TestPerson(APIBaseTest):
         self.assertEqual(
             str(warnings.warning), "/api/person/by_email/ endpoint is deprecated; use /api/person/ instead.",
         )
+
+    @patch("posthog.api.export.EXPORT_BATCH_SIZE", 2)
+    def test_export_csv(self) -> None:
+        for index in range(4):
+            Person.objects.create(team=self.team, distinct_ids=["person_{}".format(index)], properties={"index": index})
+        Person.objects.create(team=self.team, distinct_ids=["anonymous", "identified"], properties={})
+
+        response = self.client.get("/api/person.csv")
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(response.getvalue().decode("utf-8"))))  # type: ignore
+
+        self.assertEqual(
+            list(rows[0].keys()), ["created_at", "distinct_ids.0", "distinct_ids.1", "id", "name", "properties.index"],
+        )
+        self.assertEqual([row["properties.index"] for row in rows], ["", "3", "2", "1", "0"])
+        self.assertEqual(rows[0]["distinct_ids.1"], "identified")
+
+        response = self.client.get("/api/person.csv?properties=%s" % json.dumps([{"key": "index", "value": 2}]))
+        rows = list(csv.DictReader(io.StringIO(response.getvalue().decode("utf-8"))))  # type: ignore
+        self.assertEqual([row["properties.index"] for row in rows], ["2"])
+
+        response = self.client.get("/api/person.csv?search=identified")
+        rows = list(csv.DictReader(io.StringIO(response.getvalue().decode("utf-8"))))  # type: ignore
+        self.assertEqual(
+            [(row["distinct_ids.0"], row["distinct_ids.1"]) for row in rows], [("anonymous", "identified")]
+        )
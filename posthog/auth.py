@@ -7,7 +7,6 @@ from dateutil import parser
 from django.apps import apps
 from django.contrib.auth.models import AnonymousUser
 from django.http import HttpRequest, JsonResponse
-from django.utils import timezone
 from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.request import Request
@@ -72,8 +71,7 @@ class PersonalAPIKeyAuthentication(authentication.BaseAuthentication):
             )
         except PersonalAPIKey.DoesNotExist:
             raise AuthenticationFailed(detail=f"Personal API key found in request {source} is invalid.")
-        personal_api_key_object.last_used_at = timezone.now()
-        personal_api_key_object.save()
+        personal_api_key_object.update_last_used_at()
         assert personal_api_key_object.user is not None
         return personal_api_key_object.user, None
 
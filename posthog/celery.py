@@ -1,11 +1,13 @@
 import os
 import time
+from typing import List
 
 import posthoganalytics
 import redis
 import statsd  # type: ignore
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
 from django.conf import settings
 from django.db import connection
 
@@ -33,6 +35,9 @@ redis_instance = redis.from_url(settings.REDIS_URL, db=0)
 # How frequently do we want to calculate action -> event relationships if async is enabled
 ACTION_EVENT_MAPPING_INTERVAL_MINUTES = 10
 
+# How frequently new events are added to the ClickHouse sessions table
+SESSIONS_UPDATE_INTERVAL_MINUTES = 5
+
 statsd.Connection.set_defaults(host=settings.STATSD_HOST, port=settings.STATSD_PORT)
 
 
@@ -58,6 +63,21 @@ def setup_periodic_tasks(sender, **kwargs):
             expires=(60 * ACTION_EVENT_MAPPING_INTERVAL_MINUTES),
         )
 
+    if settings.PRIMARY_DB == settings.CLICKHOUSE:
+        sender.add_periodic_task(
+            (60 * SESSIONS_UPDATE_INTERVAL_MINUTES),
+            update_sessions_ch.s(),
+            name="update clickhouse sessions",
+            expires=(60 * SESSIONS_UPDATE_INTERVAL_MINUTES),
+        )
+
+
+@worker_process_shutdown.connect
+def flush_event_definitions_on_shutdown(**kwargs):
+    from posthog.tasks.event_definitions import flush_event_definitions
+
+    flush_event_definitions()
+
 
 @app.task
 def redis_heartbeat():
@@ -105,6 +125,13 @@ def calculate_cohort():
     calculate_cohorts()
 
 
+@app.task
+def update_sessions_ch():
+    from ee.clickhouse.models.session import update_sessions
+
+    update_sessions()
+
+
 @app.task
 def check_cached_items():
     from posthog.tasks.update_cache import update_cached_items
@@ -119,6 +146,13 @@ def update_cache_item_task(key: str, cache_type: str, payload: dict) -> None:
     update_cache_item(key, cache_type, payload)
 
 
+@app.task
+def repoint_events_task(team_id: int, from_person_ids: List[int], to_person_id: int) -> None:
+    from posthog.tasks.repoint_events import repoint_events
+
+    repoint_events(team_id, from_person_ids, to_person_id)
+
+
 @app.task(bind=True)
 def debug_task(self):
     print("Request: {0!r}".format(self.request))
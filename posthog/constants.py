@@ -38,4 +38,5 @@ PATH_TYPE = "path_type"
 START_POINT = "start_point"
 TARGET_ENTITY = "target_entity"
 OFFSET = "offset"
+CURSOR = "cursor"
 PERIOD = "period"
@@ -1,18 +1,64 @@
-import json
-from datetime import datetime
+from typing import Any, Dict
 
 from django.core.cache import cache
+from django.utils import timezone
 
-from posthog.models import DashboardItem, Filter
-from posthog.utils import generate_cache_key
+from posthog.ee import check_ee_enabled
+from posthog.models import Filter
 
 from .utils import generate_cache_key
 
 TRENDS_ENDPOINT = "Trends"
 FUNNEL_ENDPOINT = "Funnel"
+SESSIONS_ENDPOINT = "Sessions"
+PATHS_ENDPOINT = "Paths"
+RETENTION_ENDPOINT = "Retention"
 
+# The database insights are calculated with. Users can be on another backend than their instance's default, see
+# `endpoint_enabled`, so results are cached per backend and refreshed with the backend they were calculated with
+POSTGRES_BACKEND = "postgres"
+CLICKHOUSE_BACKEND = "clickhouse"
 
-def cached_function(cache_type: str, expiry=30):
+# Cached results are served without being recalculated for this long by default
+INSIGHT_CACHE_EXPIRY = 30
+# Funnels are the most expensive insight to calculate, so their results are recalculated less often
+FUNNEL_CACHE_EXPIRY = 10 * 60
+# Cached results are kept this long, once they're older than the `expiry` they're served while being recalculated
+INSIGHT_CACHE_TTL = 25 * 60
+# How long a background recalculation can take before another one is started for the same result
+INSIGHT_REFRESH_TIMEOUT = 3 * 60
+
+CACHE_TYPE_BY_INSIGHT = {
+    "TRENDS": TRENDS_ENDPOINT,
+    "FUNNELS": FUNNEL_ENDPOINT,
+    "SESSIONS": SESSIONS_ENDPOINT,
+    "PATHS": PATHS_ENDPOINT,
+    "RETENTION": RETENTION_ENDPOINT,
+}
+
+
+def get_cache_type(filter: Filter) -> str:
+    return CACHE_TYPE_BY_INSIGHT.get(filter.insight or "", TRENDS_ENDPOINT)
+
+
+def default_insight_backend() -> str:
+    # What dashboards are calculated with, they're shown to everyone in the team
+    return CLICKHOUSE_BACKEND if check_ee_enabled() else POSTGRES_BACKEND
+
+
+def generate_insight_cache_key(cache_type: str, filter: Filter, team_id: int, backend: str) -> str:
+    # `Filter.to_dict` includes every field that's used by any insight, so equal filters give the same key
+    return generate_cache_key("{}_{}_{}_{}".format(cache_type, backend, filter.toJSON(), team_id))
+
+
+def is_cache_fresh(cached_result: Dict[str, Any], expiry: int = INSIGHT_CACHE_EXPIRY) -> bool:
+    last_refresh = cached_result.get("last_refresh")
+    if not last_refresh:
+        return False
+    return (timezone.now() - last_refresh).total_seconds() < expiry
+
+
+def cached_function(cache_type: str, expiry=INSIGHT_CACHE_EXPIRY, backend: str = POSTGRES_BACKEND):
     def inner_decorator(f):
         def wrapper(*args, **kw):
             from posthog.celery import update_cache_item_task
@@ -23,23 +69,29 @@ def cached_function(cache_type: str, expiry=30):
             request = args[1]
             team = request.user.team
             payload = None
-            dashboard_item_id = None
             refresh = request.GET.get("refresh", None)
 
-            if cache_type == TRENDS_ENDPOINT:
-                filter = Filter(request=request)
-                cache_key = generate_cache_key(filter.toJSON() + "_" + str(team.pk))
-                payload = {"filter": filter.toJSON(), "team_id": team.pk}
-            elif cache_type == FUNNEL_ENDPOINT:
+            if cache_type == FUNNEL_ENDPOINT and len(args) > 2:
+                # a saved funnel, funnels calculated from a filter are cached like every other insight
                 pk = args[2]
                 cache_key = generate_cache_key("funnel_{}_{}".format(pk, team.pk))
                 payload = {"funnel_id": pk, "team_id": team.pk}
+            else:
+                filter = Filter(request=request)
+                cache_key = generate_insight_cache_key(cache_type, filter, team.pk, backend)
+                payload = {"filter": filter.toJSON(), "team_id": team.pk, "backend": backend}
 
             if not refresh:
                 # return result if cached
                 cached_result = cache.get(cache_key)
-                if cached_result:
-                    return cached_result["result"]
+                if cached_result and cached_result.get("result"):
+                    if is_cache_fresh(cached_result, expiry):
+                        return cached_result["result"]
+                    # stale, serve it while it's recalculated in the background
+                    if "filter" in payload:
+                        if cache.add(cache_key + "_refreshing", True, INSIGHT_REFRESH_TIMEOUT):
+                            update_cache_item_task.delay(cache_key, cache_type, payload)
+                        return cached_result["result"]
 
             # call wrapped function
             result = f(*args, **kw)
@@ -47,7 +99,9 @@ def cached_function(cache_type: str, expiry=30):
             # cache new data using
             if result and payload:
                 cache.set(
-                    cache_key, {"result": result, "details": payload, "type": cache_type,}, expiry,
+                    cache_key,
+                    {"result": result, "details": payload, "type": cache_type, "last_refresh": timezone.now()},
+                    INSIGHT_CACHE_TTL,
                 )
 
             return result
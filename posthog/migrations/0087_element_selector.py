@@ -0,0 +1,28 @@
+# Generated by Django 3.0.7 on 2020-10-08 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posthog", "0086_team_session_recording_opt_in"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ElementSelector",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("selector", models.CharField(max_length=400)),
+                ("calculated_at", models.DateTimeField(blank=True, null=True)),
+                ("groups", models.ManyToManyField(blank=True, related_name="selectors", to="posthog.ElementGroup")),
+                ("team", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="posthog.Team")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="elementselector",
+            constraint=models.UniqueConstraint(fields=("team", "selector"), name="unique selector for team"),
+        ),
+    ]
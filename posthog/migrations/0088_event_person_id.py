@@ -0,0 +1,45 @@
+# Generated by Django 3.0.7 on 2020-10-12 09:21
+
+from django.contrib.postgres.operations import AddIndexConcurrently  # type: ignore
+from django.db import connection, migrations, models
+
+BACKFILL_BATCH_SIZE = 100000
+
+
+def backfill_person_id(apps, schema_editor):
+    Event = apps.get_model("posthog", "Event")
+    last_event = Event.objects.order_by("-id").only("id").first()
+    if last_event is None:
+        return
+    # Committed per range of ids, so the backfill doesn't lock all events at once
+    for start in range(0, last_event.id + 1, BACKFILL_BATCH_SIZE):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE posthog_event SET person_id = pdi.person_id
+                FROM posthog_persondistinctid pdi
+                WHERE posthog_event.id >= %s AND posthog_event.id < %s AND posthog_event.person_id IS NULL
+                AND pdi.team_id = posthog_event.team_id AND pdi.distinct_id = posthog_event.distinct_id
+                """,
+                (start, start + BACKFILL_BATCH_SIZE),
+            )
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+    atomic = False
+    dependencies = [
+        ("posthog", "0087_element_selector"),
+    ]
+
+    operations = [
+        migrations.AddField(model_name="event", name="person_id", field=models.IntegerField(blank=True, null=True),),
+        migrations.RunPython(backfill_person_id, reverse_code=backwards, hints={"target_db": "default"}),
+        AddIndexConcurrently(
+            model_name="event",
+            index=models.Index(fields=["team_id", "person_id"], name="posthog_eve_team_id_f27652_idx"),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from .action import Action
+from .action_matcher import TeamActionMatcher
 from .action_step import ActionStep
 from .annotation import Annotation
 from .cohort import Cohort, CohortPeople
@@ -6,13 +7,15 @@ from .dashboard import Dashboard
 from .dashboard_item import DashboardItem
 from .element import Element
 from .element_group import ElementGroup
+from .element_selector import ElementSelector
 from .entity import Entity
 from .event import Event
-from .feature_flag import FeatureFlag
+from .feature_flag import FeatureFlag, FeatureFlagMatcher, get_active_feature_flags, get_flag_definitions
 from .filter import Filter
 from .funnel import Funnel
 from .organization import Organization, OrganizationInvite, OrganizationMembership
 from .person import Person, PersonDistinctId
+from .person_identity import get_person_id, get_person_ids
 from .personal_api_key import PersonalAPIKey
 from .property import Property
 from .team import Team
@@ -0,0 +1,155 @@
+import re
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from django.db.models import Count, Max, Prefetch, signals
+from django.dispatch import receiver
+
+from .action import Action
+from .action_step import ActionStep
+from .element import Element
+from .event import Event, Selector
+from .filter import Filter
+from .property import MatchNotSupported
+
+# team_id -> (version of the team's actions, compiled matcher)
+TEAM_ACTION_MATCHER_CACHE: Dict[int, Tuple[tuple, "TeamActionMatcher"]] = {}
+
+
+def _compile_regex(pattern: str) -> Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error:
+        raise MatchNotSupported()
+
+
+def _like_to_regex(pattern: str) -> Pattern:
+    # LIKE '%pattern%' as used by EventManager.filter_by_url, wildcards in the pattern itself are kept
+    if "\\" in pattern:
+        raise MatchNotSupported()
+    return re.compile(
+        ".*".join(".".join(re.escape(part) for part in chunk.split("_")) for chunk in pattern.split("%")), re.DOTALL
+    )
+
+
+class ActionStepMatcher:
+    """
+    An ActionStep compiled to Python, giving the same result as the step's filters in `query_db_by_action`.
+    Raises MatchNotSupported on creation for steps that can only be matched in the database, eg person properties.
+    """
+
+    def __init__(self, step: ActionStep) -> None:
+        self.event = step.event
+        self.url = step.url
+        self.url_regex: Optional[Pattern] = None
+        if step.url and step.url_matching == ActionStep.REGEX:
+            self.url_regex = _compile_regex(step.url)
+        elif step.url and step.url_matching != ActionStep.EXACT:
+            self.url_regex = _like_to_regex(step.url)
+
+        self.element_filters = {key: getattr(step, key) for key in ["tag_name", "text", "href"] if getattr(step, key)}
+        self.selector = Selector(step.selector) if step.selector else None
+        if self.selector:
+            self.selector.check_can_match()
+
+        self.properties = Filter(data={"properties": step.properties}).properties
+        if any(prop.type != "event" for prop in self.properties):
+            raise MatchNotSupported()
+
+    def matches(self, event: Event, get_elements: Callable[[], List[Element]]) -> bool:
+        if self.event and self.event != event.event:
+            return False
+
+        if self.url:
+            current_url = event.properties.get("$current_url")
+            if current_url is None:
+                return False
+            if not isinstance(current_url, str):
+                raise MatchNotSupported()
+            if self.url_regex is None and current_url != self.url:
+                return False
+            if self.url_regex is not None and not self.url_regex.search(current_url):
+                return False
+
+        if self.element_filters or self.selector:
+            elements = get_elements()
+            if self.element_filters and not any(
+                all(getattr(element, key) == value for key, value in self.element_filters.items())
+                for element in elements
+            ):
+                return False
+            if self.selector and not (elements and self.selector.matches(elements)):
+                return False
+
+        return all(prop.matches(event.properties) for prop in self.properties)
+
+
+class ActionMatcher:
+    def __init__(self, action: Action) -> None:
+        self.action = action
+        steps = list(action.steps.all())
+        # Same narrowing as Event.actions used to do, an action is only considered if a step has the event's name
+        self.event_names = {step.event for step in steps}
+        self.steps: Optional[List[ActionStepMatcher]]
+        try:
+            self.steps = [ActionStepMatcher(step) for step in steps]
+        except MatchNotSupported:
+            self.steps = None
+
+    def matches(self, event: Event, get_elements: Callable[[], List[Element]]) -> bool:
+        if self.steps is not None:
+            try:
+                return any(step.matches(event, get_elements) for step in self.steps)
+            except MatchNotSupported:
+                pass
+        return Event.objects.filter(pk=event.pk).query_db_by_action(self.action).exists()
+
+
+class TeamActionMatcher:
+    """
+    All actions of a team compiled to Python, so that new events can be matched without querying the database.
+    Actions with steps that can't be evaluated in Python are matched with `query_db_by_action` instead,
+    which requires the event to be saved already.
+    """
+
+    def __init__(self, team_id: int) -> None:
+        actions = (
+            Action.objects.filter(team_id=team_id, deleted=False)
+            .prefetch_related(Prefetch("steps", queryset=ActionStep.objects.order_by("id")))
+            .order_by("id")
+        )
+        self.matchers = [ActionMatcher(action) for action in actions]
+
+    def actions_for(self, event: Event, elements: Optional[List[Element]] = None) -> List[Action]:
+        loaded_elements = elements
+
+        def get_elements() -> List[Element]:
+            nonlocal loaded_elements
+            if loaded_elements is None and event.elements_hash:
+                elements = Element.objects.filter(group__team_id=event.team_id, group__hash=event.elements_hash)
+                loaded_elements = list(elements.order_by("order"))
+            return loaded_elements or []
+
+        return [
+            matcher.action
+            for matcher in self.matchers
+            if event.event in matcher.event_names and matcher.matches(event, get_elements)
+        ]
+
+
+def get_team_action_matcher(team_id: int) -> TeamActionMatcher:
+    version = tuple(
+        Action.objects.filter(team_id=team_id).aggregate(Max("updated_at"), Count("steps"), Max("steps__id")).values()
+    )
+    cached = TEAM_ACTION_MATCHER_CACHE.get(team_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    matcher = TeamActionMatcher(team_id)
+    TEAM_ACTION_MATCHER_CACHE[team_id] = (version, matcher)
+    return matcher
+
+
+@receiver(signals.post_save, sender=ActionStep)
+@receiver(signals.post_delete, sender=ActionStep)
+def action_step_changed(sender, instance: ActionStep, **kwargs):
+    # Steps can be edited in place without changing the version, at least make sure this process sees the change
+    TEAM_ACTION_MATCHER_CACHE.clear()
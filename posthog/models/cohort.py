@@ -1,10 +1,11 @@
 import json
+from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 
 from dateutil.relativedelta import relativedelta
 from django.contrib.postgres.fields import JSONField
 from django.db import connection, models, transaction
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q, QuerySet
 from django.utils import timezone
 from sentry_sdk import capture_exception
 
@@ -13,6 +14,26 @@ from .event import Event
 from .filter import Filter
 from .person import Person
 
+# Events created shortly before the last calculation are looked at again when updating a cohort, as they can be
+# written after it, eg by the event buffer
+COHORT_CALCULATION_OVERLAP = timedelta(minutes=5)
+
+# Writes the difference between the people in the query and the cohort's current members, the query is only run once
+RECALCULATE_COHORT_PEOPLE_SQL = """
+WITH people AS ({people_query}),
+removed AS (
+    DELETE FROM "posthog_cohortpeople"
+    WHERE "cohort_id" = {cohort_id}
+    AND NOT EXISTS (SELECT 1 FROM people WHERE people."id" = "posthog_cohortpeople"."person_id")
+)
+INSERT INTO "posthog_cohortpeople" ("person_id", "cohort_id")
+SELECT people."id", {cohort_id} FROM people
+WHERE NOT EXISTS (
+    SELECT 1 FROM "posthog_cohortpeople"
+    WHERE "posthog_cohortpeople"."cohort_id" = {cohort_id} AND "posthog_cohortpeople"."person_id" = people."id"
+)
+"""
+
 
 class Group(object):
     def __init__(
@@ -73,36 +94,90 @@ class Cohort(models.Model):
                 filters |= Q(filter.properties_to_Q(team_id=self.team_id, is_person_query=True))
         return filters
 
-    def calculate_people(self):
+    def calculate_people(self, incremental: bool = False) -> None:
+        """
+        Brings the cohort's members up to date, only inserting people who joined and removing people who left.
+        With `incremental`, cohorts of action groups that were calculated before only look at events created
+        since then and at members whose events left the group's `days` since then.
+        """
         try:
+            incremental = incremental and self._can_update_people()
+            calculated_at = timezone.now()
             self.is_calculating = True
-            self.save()
-            event_query, params = (
-                Person.objects.filter(self.people_filter(), team=self.team)
-                .distinct("pk")
-                .only("pk")
-                .query.sql_with_params()
-            )
-
-            query = """
-            DELETE FROM "posthog_cohortpeople" WHERE "cohort_id" = {};
-            INSERT INTO "posthog_cohortpeople" ("person_id", "cohort_id")
-            {}
-            ON CONFLICT DO NOTHING
-            """.format(
-                self.pk, event_query.replace('FROM "posthog_person"', ', {} FROM "posthog_person"'.format(self.pk), 1,),
-            )
+            self.save(update_fields=["is_calculating"])
 
-            cursor = connection.cursor()
             with transaction.atomic():
-                cursor.execute(query, params)
+                if incremental:
+                    self._update_people(calculated_at)
+                else:
+                    self._recalculate_people()
 
                 self.is_calculating = False
-                self.last_calculation = timezone.now()
-                self.save()
+                self.last_calculation = calculated_at
+                # Only these fields, so groups edited during the calculation aren't overwritten
+                self.save(update_fields=["is_calculating", "last_calculation"])
         except:
             capture_exception()
 
+    def _can_update_people(self) -> bool:
+        # A cohort that's still marked as calculating was edited, or its last calculation failed
+        return (
+            not self.is_calculating
+            and self.last_calculation is not None
+            and bool(self.groups)
+            and all(group.get("action_id") for group in self.groups)
+        )
+
+    def _recalculate_people(self) -> None:
+        people_query, params = (
+            Person.objects.filter(self.people_filter(), team=self.team)
+            .distinct("pk")
+            .only("pk")
+            .query.sql_with_params()
+        )
+        cursor = connection.cursor()
+        cursor.execute(RECALCULATE_COHORT_PEOPLE_SQL.format(people_query=people_query, cohort_id=self.pk), params)
+
+    def _update_people(self, calculated_at: datetime) -> None:
+        since = self.last_calculation - COHORT_CALCULATION_OVERLAP
+        added = Q()
+        expired = Q()
+        still_matching = Q()
+        for group in self.groups:
+            action = Action.objects.get(pk=group["action_id"], team_id=self.team_id)
+            # Matched against the action's steps rather than `Action.events`, which may not have the newest yet
+            new_events = Event.objects.query_db_by_action(action, order_by=None, start=since).filter(
+                created_at__gte=since
+            )
+            events = Event.objects.filter_by_action(action, order_by=None).filter(team_id=self.team_id)
+            if group.get("days"):
+                window_start = calculated_at - relativedelta(days=group["days"])
+                new_events = new_events.filter(timestamp__gt=window_start)
+                events = events.filter(timestamp__gt=window_start)
+                expired_events = Event.objects.filter_by_action(action, order_by=None).filter(
+                    team_id=self.team_id,
+                    timestamp__gt=since - relativedelta(days=group["days"]),
+                    timestamp__lte=window_start,
+                )
+                expired |= Q(person_id__in=expired_events.values("person_id"))
+            added |= Q(pk__in=new_events.values("person_id"))
+            still_matching |= Q(Exists(events.filter(person_id=OuterRef("person_id"))))
+
+        if expired:
+            CohortPeople.objects.filter(expired, cohort_id=self.pk).exclude(still_matching).delete()
+        self._insert_people(Person.objects.filter(added, team_id=self.team_id).exclude(cohort__id=self.pk))
+
+    def _insert_people(self, people: QuerySet) -> None:
+        people_query, params = people.only("pk").query.sql_with_params()
+        query = """
+        INSERT INTO "posthog_cohortpeople" ("person_id", "cohort_id")
+        {}
+        """.format(
+            people_query.replace('FROM "posthog_person"', ', {} FROM "posthog_person"'.format(self.pk), 1)
+        )
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+
     def __str__(self):
         return self.name
 
@@ -3,9 +3,11 @@ import json
 from typing import Any, Dict, List
 
 from django.db import models, transaction
+from django.db.models import F
 from django.forms.models import model_to_dict
 
 from .element import Element
+from .element_selector import ElementSelector
 from .team import Team
 
 
@@ -36,8 +38,24 @@ class ElementGroupManager(models.Manager):
                 element.group = group
                 setattr(element, "pk", None)
             Element.objects.bulk_create(elements)
+            ElementSelector.objects.add_group(group, elements)
             return group
 
+    def elements_by_hash(self, team_id: int, hashes: List[str]) -> Dict[str, List[Element]]:
+        """
+        The ordered elements of each of these element groups, in a single query.
+        """
+        elements: Dict[str, List[Element]] = {}
+        if not hashes:
+            return elements
+        for element in (
+            Element.objects.filter(group__team_id=team_id, group__hash__in=set(hashes))
+            .annotate(group_hash=F("group__hash"))
+            .order_by("order", "id")
+        ):
+            elements.setdefault(element.group_hash, []).append(element)
+        return elements
+
 
 class ElementGroup(models.Model):
     class Meta:
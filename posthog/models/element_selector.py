@@ -0,0 +1,118 @@
+from itertools import groupby
+from typing import Any, List, Optional
+
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .element import Element
+from .property import MatchNotSupported
+
+
+def _used_by_actions(team_id: Any, selector: Any) -> models.QuerySet:
+    from .action_step import ActionStep
+
+    return ActionStep.objects.filter(action__team_id=team_id, action__deleted=False, selector=selector)
+
+
+class ElementSelectorManager(models.Manager):
+    def get_calculated(self, team_id: int, selector: str) -> Optional["ElementSelector"]:
+        """
+        Returns the index for this selector, creating it and calculating it in the background the first time a
+        selector of an action is used. Returns None if the index can't be used (yet), in which case the selector has
+        to be queried directly. Selectors that only appear in ad hoc filters aren't indexed, as every index is matched
+        against each new element group during ingestion.
+        """
+        from posthog.tasks.calculate_element_selector import schedule_calculation
+
+        from .event import Selector
+
+        if len(selector) > ElementSelector._meta.get_field("selector").max_length:
+            return None
+        try:
+            Selector(selector).check_can_match()
+        except MatchNotSupported:
+            return None
+        element_selector = self.filter(team_id=team_id, selector=selector).first()
+        if element_selector is None:
+            if not _used_by_actions(team_id, selector).exists():
+                return None
+            element_selector, _ = self.get_or_create(team_id=team_id, selector=selector)
+        if element_selector.calculated_at:
+            return element_selector
+        # Also schedules selectors again whose calculation failed
+        element_selector_id = element_selector.pk
+        transaction.on_commit(lambda: schedule_calculation(element_selector_id))
+        return None
+
+    def add_group(self, group: models.Model, elements: List[Element]) -> None:
+        # Selectors that are still being calculated are included, in case the calculation doesn't see this group
+        relations = []
+        element_selectors = self.filter(team_id=group.team_id).annotate(  # type: ignore
+            used=Exists(_used_by_actions(OuterRef("team_id"), OuterRef("selector")))
+        )
+        unused = []
+        for element_selector in element_selectors:
+            if not element_selector.used:
+                # No longer used by an action, dropped rather than kept up to date, and recalculated if used again
+                unused.append(element_selector.pk)
+                continue
+            try:
+                if element_selector.matches(elements):
+                    relations.append(
+                        ElementSelector.groups.through(elementselector_id=element_selector.pk, elementgroup_id=group.pk)
+                    )
+            except MatchNotSupported:
+                pass
+        ElementSelector.groups.through.objects.bulk_create(relations, ignore_conflicts=True)
+        if unused:
+            self.filter(pk__in=unused).delete()
+
+
+class ElementSelector(models.Model):
+    """
+    Index of which element groups match a CSS selector, so that filtering events by a selector is a lookup on
+    elements_hash. Only selectors of actions are indexed. Existing groups are matched when the selector is first used, new
+    groups when they're created.
+    """
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["team", "selector"], name="unique selector for team")]
+
+    team: models.ForeignKey = models.ForeignKey("Team", on_delete=models.CASCADE)
+    selector: models.CharField = models.CharField(max_length=400)
+    groups: models.ManyToManyField = models.ManyToManyField("ElementGroup", related_name="selectors", blank=True)
+    # Set once all existing element groups have been matched
+    calculated_at: models.DateTimeField = models.DateTimeField(null=True, blank=True)
+
+    objects = ElementSelectorManager()
+
+    def matches(self, elements: List[Element]) -> bool:
+        from .event import Selector
+
+        return Selector(self.selector).matches(elements)
+
+    def calculate_groups(self) -> None:
+        from .event import Selector
+
+        selector = Selector(self.selector)
+        try:
+            selector.check_can_match()
+        except MatchNotSupported:
+            return
+        elements = Element.objects.filter(group__team_id=self.team_id).order_by("group_id", "order").iterator()
+        group_ids = [
+            group_id
+            for group_id, group_elements in groupby(elements, key=lambda element: element.group_id)
+            if selector.matches(list(group_elements))
+        ]
+        ElementSelector.groups.through.objects.bulk_create(
+            [
+                ElementSelector.groups.through(elementselector_id=self.pk, elementgroup_id=group_id)
+                for group_id in group_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        self.calculated_at = timezone.now()
+        self.save()
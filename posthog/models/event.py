@@ -1,10 +1,9 @@
 import copy
-import datetime
+import json
 import random
 import re
 import string
-from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import celery
 from django.conf import settings
@@ -15,7 +14,6 @@ from django.db.models import (
     Exists,
     F,
     OuterRef,
-    Prefetch,
     Q,
     QuerySet,
     Subquery,
@@ -23,6 +21,7 @@ from django.db.models import (
     signals,
 )
 from django.db.models.functions import TruncDay
+from django.dispatch import receiver
 from django.forms.models import model_to_dict
 from django.utils import timezone
 from psycopg2 import sql  # type: ignore
@@ -35,20 +34,17 @@ from .action import Action
 from .action_step import ActionStep
 from .element import Element
 from .element_group import ElementGroup
+from .element_selector import ElementSelector
 from .filter import Filter
 from .person import Person, PersonDistinctId
+from .person_identity import get_person_id
+from .property import MatchNotSupported
 from .team import Team
 from .utils import namedtuplefetchall
 
 attribute_regex = r"([a-zA-Z]*)\[(.*)=[\'|\"](.*)[\'|\"]\]"
 
 
-LAST_UPDATED_TEAM_ACTION: Dict[int, datetime.datetime] = {}
-TEAM_EVENT_ACTION_QUERY_CACHE: Dict[int, Dict[str, tuple]] = defaultdict(dict)
-# TEAM_EVENT_ACTION_QUERY_CACHE looks like team_id -> event ex('$pageview') -> query
-TEAM_ACTION_QUERY_CACHE: Dict[int, str] = {}
-
-
 class SelectorPart(object):
     direct_descendant = False
     unique_order = 0
@@ -95,6 +91,34 @@ class SelectorPart(object):
             params.append(value)
         return {"where": where, "params": params}
 
+    def _nth_child(self) -> int:
+        try:
+            return int(self.data["nth_child"])  # type: ignore
+        except ValueError:
+            raise MatchNotSupported()
+
+    def matches(self, element: Element) -> bool:
+        """
+        Evaluates this part against an element in Python, with the same result as `extra_query`.
+        """
+        for key, value in self.data.items():
+            if "attr__" in key:
+                attribute = (element.attributes or {}).get("attr__{}".format(key.split("attr__")[1]))
+                if attribute is not None and not isinstance(attribute, str):
+                    # ->> returns other JSON values as their JSON text
+                    attribute = json.dumps(attribute)
+                if attribute != value:
+                    return False
+            elif key == "attr_class__contains":
+                if element.attr_class is None or not set(value).issubset(element.attr_class):
+                    return False
+            elif key == "nth_child":
+                if element.nth_child != self._nth_child():
+                    return False
+            elif getattr(element, key) != value:
+                return False
+        return True
+
     def clickhouse_query(self, query) -> str:
         where = []
         for key, value in self.data.items():
@@ -126,6 +150,32 @@ class Selector(object):
             part.unique_order = len([p for p in self.parts if p.data == part.data])
             self.parts.append(copy.deepcopy(part))
 
+    def check_can_match(self) -> None:
+        """
+        Raises MatchNotSupported if `matches` can't give the same result as the query for this selector.
+        """
+        for part in self.parts:
+            if "nth_child" in part.data:
+                part._nth_child()
+
+    def matches(self, elements: List[Element]) -> bool:
+        """
+        Evaluates the selector against an element chain in Python, the same way `EventManager._element_subquery` does.
+        """
+        previous_order = -1
+        for index, part in enumerate(self.parts):
+            orders = [order for order, element in enumerate(elements) if part.matches(element)]
+            if len(orders) <= part.unique_order:
+                return False
+            order = orders[part.unique_order]
+            if index > 0:
+                if part.direct_descendant and order != previous_order + 1:
+                    return False
+                if not part.direct_descendant and order <= previous_order:
+                    return False
+            previous_order = order
+        return True
+
 
 class EventManager(models.QuerySet):
     def _element_subquery(self, selector: Selector) -> Tuple[Dict[str, Subquery], Dict[str, Union[F, bool]]]:
@@ -152,13 +202,16 @@ class EventManager(models.QuerySet):
 
     def filter_by_element(self, filters: Dict, team_id: int):
         groups = ElementGroup.objects.filter(team_id=team_id)
+        filter: Dict[str, Any] = {}
 
         if filters.get("selector"):
-            selector = Selector(filters["selector"])
-            subqueries, filter = self._element_subquery(selector)
-            groups = groups.annotate(**subqueries)  # type: ignore
-        else:
-            filter = {}
+            element_selector = ElementSelector.objects.get_calculated(team_id, filters["selector"])
+            if element_selector:
+                filter["selectors"] = element_selector
+            else:
+                selector = Selector(filters["selector"])
+                subqueries, filter = self._element_subquery(selector)
+                groups = groups.annotate(**subqueries)  # type: ignore
 
         for key in ["tag_name", "text", "href"]:
             if filters.get(key):
@@ -195,15 +248,6 @@ class EventManager(models.QuerySet):
             return {"created_at__gte": start}
         return {"created_at__gte": start, "created_at__lte": end}
 
-    def add_person_id(self, team_id: int):
-        return self.annotate(
-            person_id=Subquery(
-                PersonDistinctId.objects.filter(team_id=team_id, distinct_id=OuterRef("distinct_id"))
-                .order_by()
-                .values("person_id")[:1]
-            )
-        )
-
     def query_db_by_action(self, action, order_by="-timestamp", start=None, end=None) -> models.QuerySet:
         events = self
         any_step = Q()
@@ -212,17 +256,13 @@ class EventManager(models.QuerySet):
             return self.none()
 
         for step in steps:
-            subquery = (
-                Event.objects.add_person_id(team_id=action.team_id)
-                .filter(
-                    Filter(data={"properties": step.properties}).properties_to_Q(team_id=action.team_id),
-                    pk=OuterRef("id"),
-                    **self.filter_by_event(step),
-                    **self.filter_by_element(model_to_dict(step), team_id=action.team_id),
-                    **self.filter_by_period(start, end),
-                )
-                .only("id")
-            )
+            subquery = Event.objects.filter(
+                Filter(data={"properties": step.properties}).properties_to_Q(team_id=action.team_id),
+                pk=OuterRef("id"),
+                **self.filter_by_event(step),
+                **self.filter_by_element(model_to_dict(step), team_id=action.team_id),
+                **self.filter_by_period(start, end),
+            ).only("id")
             subquery = self.filter_by_url(step, subquery)
             any_step |= Q(Exists(subquery))
         events = self.filter(team_id=action.team_id).filter(any_step)
@@ -233,13 +273,13 @@ class EventManager(models.QuerySet):
         return events
 
     def filter_by_action(self, action, order_by="-id") -> models.QuerySet:
-        events = self.filter(action=action).add_person_id(team_id=action.team_id)
+        events = self.filter(action=action)
         if order_by:
             events = events.order_by(order_by)
         return events
 
     def filter_by_event_with_people(self, event, team_id, order_by="-id") -> models.QuerySet:
-        events = self.filter(team_id=team_id).filter(event=event).add_person_id(team_id=team_id)
+        events = self.filter(team_id=team_id).filter(event=event)
         if order_by:
             events = events.order_by(order_by)
         return events
@@ -255,7 +295,7 @@ class EventManager(models.QuerySet):
         if entity.type == TREND_FILTER_TYPE_EVENTS:
             events = Event.objects.filter_by_event_with_people(event=entity.id, team_id=team.id)
         elif entity.type == TREND_FILTER_TYPE_ACTIONS:
-            events = Event.objects.filter(action__pk=entity.id).add_person_id(team.id)
+            events = Event.objects.filter(action__pk=entity.id)
 
         filtered_events = events.filter(filters.date_filter_Q).filter(filters.properties_to_Q(team_id=team.pk))
 
@@ -326,7 +366,8 @@ class EventManager(models.QuerySet):
 
     def create(self, site_url: Optional[str] = None, *args: Any, **kwargs: Any):
         with transaction.atomic():
-            if kwargs.get("elements"):
+            elements = kwargs.get("elements")
+            if elements:
                 if kwargs.get("team"):
                     kwargs["elements_hash"] = ElementGroup.objects.create(
                         team=kwargs["team"], elements=kwargs.pop("elements")
@@ -335,130 +376,87 @@ class EventManager(models.QuerySet):
                     kwargs["elements_hash"] = ElementGroup.objects.create(
                         team_id=kwargs["team_id"], elements=kwargs.pop("elements")
                     ).hash
+            if "person_id" not in kwargs and kwargs.get("distinct_id") is not None:
+                kwargs["person_id"] = get_person_id(
+                    kwargs["team"].pk if kwargs.get("team") else kwargs["team_id"], str(kwargs["distinct_id"])
+                )
             event = super().create(*args, **kwargs)
 
-            # Matching actions to events can get very expensive to do as events are streaming in
-            # In a few cases we have had it OOM Postgres with the query it is running
+            # Matching actions to events can get expensive to do as events are streaming in
             # Short term solution is to have this be configurable to be run in batch
             if not settings.ASYNC_EVENT_ACTION_MAPPING:
-                should_post_webhook = False
-                relations = []
-                for action in event.actions:
-                    relations.append(action.events.through(action_id=action.pk, event_id=event.pk))
-                    action.on_perform(event)
-                    if action.post_to_slack:
-                        should_post_webhook = True
-                Action.events.through.objects.bulk_create(relations, ignore_conflicts=True)
-                team = kwargs.get("team", event.team)
-                if should_post_webhook and team and team.slack_incoming_webhook:
-                    celery.current_app.send_task("posthog.tasks.webhooks.post_event_to_webhook", (event.pk, site_url))
+                self.match_actions([(event, elements, site_url)])
 
             return event
 
+    def match_actions(self, events: Sequence[Tuple["Event", Optional[List[Element]], Optional[str]]]) -> None:
+        """
+        Matches saved events to the team's actions in Python and stores all matches with a single insert.
+        Takes (event, elements, site_url) tuples. If elements are None they're loaded from the event's element group
+        when an action needs them.
+        """
+        from .action_matcher import TeamActionMatcher, get_team_action_matcher
+
+        matchers: Dict[int, TeamActionMatcher] = {}
+        relations = []
+        webhook_events = []
+        for event, elements, site_url in events:
+            if event.team_id not in matchers:
+                matchers[event.team_id] = get_team_action_matcher(event.team_id)
+            should_post_webhook = False
+            for action in matchers[event.team_id].actions_for(event, elements):
+                relations.append(Action.events.through(action_id=action.pk, event_id=event.pk))
+                action.on_perform(event)
+                if action.post_to_slack:
+                    should_post_webhook = True
+            if should_post_webhook and event.team.slack_incoming_webhook:
+                webhook_events.append((event.pk, site_url))
+        Action.events.through.objects.bulk_create(relations, ignore_conflicts=True)
+        for event_id, site_url in webhook_events:
+            celery.current_app.send_task("posthog.tasks.webhooks.post_event_to_webhook", (event_id, site_url))
+
 
 class Event(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["elements_hash"]),
             models.Index(fields=["timestamp", "team_id", "event"]),
+            models.Index(fields=["team_id", "person_id"]),
         ]
 
-    def _can_use_cached_query(self, last_updated_action_ts):
-        if not self.team_id in LAST_UPDATED_TEAM_ACTION:
-            return False
-
-        if not self.team_id in TEAM_EVENT_ACTION_QUERY_CACHE:
-            return False
-
-        if not self.event in TEAM_EVENT_ACTION_QUERY_CACHE[self.team_id]:
-            return False
-
-        if not self.team_id in TEAM_ACTION_QUERY_CACHE:
-            return False
-
-        # Cache is expired because actions were updated
-        if last_updated_action_ts > LAST_UPDATED_TEAM_ACTION[self.team_id]:
-            return False
-        return True
-
     @property
     def person(self):
         return Person.objects.get(team_id=self.team_id, persondistinctid__distinct_id=self.distinct_id)
 
-    # This (ab)uses query_db_by_action to find which actions match this event
+    # Actions this event matches, using the team's actions compiled to Python
     # We can't use filter_by_action here, as we use this function when we create an event so
     # the event won't be in the Action-Event relationship yet.
-    # We use query caching to reduce the time spent on generating redundant queries
     @property
     def actions(self) -> List:
-        last_updated_action_ts = Action.objects.filter(team_id=self.team_id).aggregate(models.Max("updated_at"))[
-            "updated_at__max"
-        ]
+        from .action_matcher import get_team_action_matcher
 
-        actions = (
-            Action.objects.filter(
-                team_id=self.team_id, steps__event=self.event, deleted=False,  # filter by event name to narrow down
-            )
-            .distinct("id")
-            .prefetch_related(Prefetch("steps", queryset=ActionStep.objects.order_by("id")))
-        )
-        if not self._can_use_cached_query(last_updated_action_ts):
-            TEAM_ACTION_QUERY_CACHE[self.team_id], _ = actions.query.sql_with_params()
-            if len(actions) == 0:
-                return []
-            events: models.QuerySet[Any] = Event.objects.filter(pk=self.pk)
-            for action in actions:
-                events = events.annotate(
-                    **{
-                        "action_{}".format(action.pk): Event.objects.filter(pk=self.pk)
-                        .query_db_by_action(action)
-                        .values("id")[:1]
-                    }
-                )
-            # This block is a little cryptic so bear with me
-            # We grab the query and the params from the ORM here
-            q, p = events.query.sql_with_params()
-
-            # We then take the parameters and replace the event id's with a placeholder
-            # We use this later to sub back in future event id's
-            # The rest of the parameters are shared between action types
-            qp = tuple(["%s" if i == self.pk else i for i in p])
-
-            # Create a cache item and add it to the cache keyed on team_id and event id
-            qcache = {self.event: (q, qp)}
-            TEAM_EVENT_ACTION_QUERY_CACHE[self.team_id].update(qcache)
-
-            # Update the last updated team action timestamp for future reference
-            LAST_UPDATED_TEAM_ACTION[self.team_id] = last_updated_action_ts
-        else:
-            # If we have reached this block we are about to use the sql query cache
-            # Grab the actions using the cached action query
-            actions.raw(TEAM_ACTION_QUERY_CACHE[self.team_id])
-
-            # Grab the cached query and query params, we will need to replace some params
-            q, p = TEAM_EVENT_ACTION_QUERY_CACHE[self.team_id][self.event]
-
-            # Replace the query param placeholders with the event id (opposite of what we did above)
-            qp = tuple([self.pk if i == "%s" else i for i in p])
-
-            with connection.cursor() as cursor:
-                # Format and execute the cached query using the mostly cached params
-                qstring = cursor.mogrify(q, qp)
-                cursor.execute(qstring)
-                events = namedtuplefetchall(cursor)
-
-        event = [event for event in events][0]
-        filtered_actions = [action for action in actions if getattr(event, "action_{}".format(action.pk), None)]
-        return filtered_actions
+        return get_team_action_matcher(self.team_id).actions_for(self)
 
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     objects: EventManager = EventManager.as_manager()  # type: ignore
     team: models.ForeignKey = models.ForeignKey(Team, on_delete=models.CASCADE)
     event: models.CharField = models.CharField(max_length=200, null=True, blank=True)
     distinct_id: models.CharField = models.CharField(max_length=200)
+    # The person of `distinct_id` when the event was ingested, repointed when people are merged.
+    # Not a foreign key, merged people are deleted before their events are repointed
+    person_id: models.IntegerField = models.IntegerField(null=True, blank=True)
     properties: JSONField = JSONField(default=dict)
     timestamp: models.DateTimeField = models.DateTimeField(default=timezone.now, blank=True)
     elements_hash: models.CharField = models.CharField(max_length=200, null=True, blank=True)
 
     # DEPRECATED: elements are stored against element groups now
     elements: JSONField = JSONField(default=list, null=True, blank=True)
+
+
+@receiver(signals.post_save, sender=PersonDistinctId)
+def attach_events_to_person(sender, instance: PersonDistinctId, created: bool, **kwargs):
+    # Events are written with the person of their distinct_id, except ones written before it had a person
+    if created:
+        Event.objects.filter(team_id=instance.team_id, distinct_id=instance.distinct_id, person_id__isnull=True).update(
+            person_id=instance.person_id
+        )
@@ -1,17 +1,24 @@
 import hashlib
-from typing import Dict
+import json
+from typing import Any, Dict, List, Optional, Tuple
 
 import posthoganalytics
 from django.contrib.postgres.fields import JSONField
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.dispatch import receiver
 from django.utils import timezone
 
 from .filter import Filter
 from .person import Person
+from .property import MatchNotSupported
 
 __LONG_SCALE__ = float(0xFFFFFFFFFFFFFFF)
 
+# Active flags of a team are cached until one of the team's flags is saved or deleted, the TTL only covers
+# changes made without signals, eg queryset updates
+FEATURE_FLAGS_CACHE_TTL = 10 * 60
+
 
 class FeatureFlag(models.Model):
     class Meta:
@@ -30,21 +37,7 @@ class FeatureFlag(models.Model):
     active: models.BooleanField = models.BooleanField(default=True)
 
     def distinct_id_matches(self, distinct_id: str) -> bool:
-        if len(self.filters.get("properties", [])) > 0:
-            if (
-                not Person.objects.filter(team_id=self.team_id, persondistinctid__distinct_id=distinct_id)
-                .filter(Filter(data=self.filters).properties_to_Q(team_id=self.team_id, is_person_query=True))
-                .exists()
-            ):
-                return False
-            elif not self.rollout_percentage:
-                return True
-
-        if self.rollout_percentage:
-            hash = self._hash(self.key, distinct_id)
-            if hash <= (self.rollout_percentage / 100):
-                return True
-        return False
+        return FeatureFlagMatcher(self.team_id, distinct_id).matches(self)
 
     # This function takes a distinct_id and a feature flag key and returns a float between 0 and 1.
     # Given the same distinct_id and key, it'll always return the same float. These floats are
@@ -65,6 +58,106 @@ class FeatureFlag(models.Model):
             "created_at": self.created_at,
         }
 
+    def get_definition(self) -> Dict[str, Any]:
+        """
+        What server libraries need to evaluate this flag without calling /decide, with properties in the same
+        normalized format whether the filters were saved as a list or an old style dict.
+        """
+        return {
+            "key": self.key,
+            "rollout_percentage": self.rollout_percentage,
+            "filters": {"properties": [property.to_dict() for property in Filter(data=self.filters).properties]},
+        }
+
+
+class FeatureFlagMatcher:
+    """
+    Evaluates feature flags for one distinct_id. Property filters are matched in Python against the person's
+    properties, which are loaded once, when the first flag with property filters needs them.
+    """
+
+    def __init__(self, team_id: int, distinct_id: str) -> None:
+        self.team_id = team_id
+        self.distinct_id = distinct_id
+        self._person_properties: Optional[Dict[str, Any]] = None
+        self._person_loaded = False
+
+    @property
+    def person_properties(self) -> Optional[Dict[str, Any]]:
+        if not self._person_loaded:
+            self._person_properties = (
+                Person.objects.filter(team_id=self.team_id, persondistinctid__distinct_id=self.distinct_id)
+                .values_list("properties", flat=True)
+                .first()
+            )
+            self._person_loaded = True
+        return self._person_properties
+
+    def matches(self, feature_flag: FeatureFlag) -> bool:
+        filter = Filter(data=feature_flag.filters)
+        if len(filter.properties) > 0:
+            if not self._properties_match(filter):
+                return False
+            elif not feature_flag.rollout_percentage:
+                return True
+
+        if feature_flag.rollout_percentage:
+            hash = feature_flag._hash(feature_flag.key, self.distinct_id)
+            if hash <= (feature_flag.rollout_percentage / 100):
+                return True
+        return False
+
+    def _properties_match(self, filter: Filter) -> bool:
+        person_properties = self.person_properties
+        if person_properties is None:
+            return False
+        try:
+            return all(property.matches(person_properties) for property in filter.properties)
+        except MatchNotSupported:
+            # eg cohorts, which only the database knows about
+            return (
+                Person.objects.filter(team_id=self.team_id, persondistinctid__distinct_id=self.distinct_id)
+                .filter(filter.properties_to_Q(team_id=self.team_id, is_person_query=True))
+                .exists()
+            )
+
+
+def _feature_flags_cache_key(team_id: int) -> str:
+    return "active_feature_flags_{}".format(team_id)
+
+
+def get_active_feature_flags(team_id: int) -> List[FeatureFlag]:
+    feature_flags = cache.get(_feature_flags_cache_key(team_id))
+    if feature_flags is None:
+        feature_flags = list(FeatureFlag.objects.filter(team_id=team_id, active=True, deleted=False).order_by("id"))
+        cache.set(_feature_flags_cache_key(team_id), feature_flags, FEATURE_FLAGS_CACHE_TTL)
+    return feature_flags
+
+
+def _flag_definitions_cache_key(team_id: int) -> str:
+    return "feature_flag_definitions_{}".format(team_id)
+
+
+def get_flag_definitions(team_id: int) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Definitions of the team's active flags and their version, which changes whenever any of the definitions does.
+    """
+    cached = cache.get(_flag_definitions_cache_key(team_id))
+    if cached is None:
+        definitions = [feature_flag.get_definition() for feature_flag in get_active_feature_flags(team_id)]
+        version = hashlib.sha1(json.dumps(definitions, sort_keys=True).encode("utf-8")).hexdigest()
+        cached = (definitions, version)
+        cache.set(_flag_definitions_cache_key(team_id), cached, FEATURE_FLAGS_CACHE_TTL)
+    return cached
+
+
+@receiver(models.signals.post_save, sender=FeatureFlag)
+@receiver(models.signals.post_delete, sender=FeatureFlag)
+def feature_flag_changed(sender, instance: FeatureFlag, **kwargs):
+    # Once committed, as requests in the meantime would cache the flags from before the change again
+    keys = [_feature_flags_cache_key(instance.team_id), _flag_definitions_cache_key(instance.team_id)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
 
 @receiver(models.signals.post_save, sender=FeatureFlag)
 def feature_flag_created(sender, instance, created, raw, using, **kwargs):
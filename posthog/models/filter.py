@@ -75,7 +75,7 @@ class Filter(PropertyMixin):
                 ACTIONS: json.loads(request.GET.get(ACTIONS, "[]")),
                 EVENTS: json.loads(request.GET.get(EVENTS, "[]")),
             }
-        elif not data:
+        elif data is None:
             raise ValueError("You need to define either a data dict or a request")
         self._date_from = data.get(DATE_FROM)
         self._date_to = data.get(DATE_TO)
@@ -119,7 +119,8 @@ class Filter(PropertyMixin):
 
     def _parse_target_entity(self, target_entity_data) -> Optional[Entity]:
         if target_entity_data:
-            data = json.loads(target_entity_data)
+            # JSON from request params, a dict from `to_dict`
+            data = json.loads(target_entity_data) if isinstance(target_entity_data, str) else target_entity_data
             return Entity({"id": data["id"], "type": data["type"]})
         return None
 
@@ -138,6 +139,13 @@ class Filter(PropertyMixin):
             BREAKDOWN_TYPE: self.breakdown_type,
             COMPARE: self.compare,
             INSIGHT: self.insight,
+            SESSION: self.session_type,
+            PATH_TYPE: self.path_type,
+            START_POINT: self.start_point,
+            TARGET_ENTITY: self.target_entity.to_dict() if self.target_entity else None,
+            PERIOD: self.period,
+            BREAKDOWN_VALUE: self.breakdown_value,
+            OFFSET: self._offset,
         }
         return {
             key: value
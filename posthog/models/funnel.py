@@ -1,11 +1,10 @@
-import re
 from collections import defaultdict
 from datetime import timedelta
 from typing import Any, Dict, List, Optional
 
 from django.contrib.postgres.fields import JSONField
 from django.db import connection, models
-from django.db.models import IntegerField, Min, Value
+from django.db.models import Min
 from django.utils import timezone
 from psycopg2 import sql  # type: ignore
 
@@ -30,13 +29,13 @@ class Funnel(models.Model):
         for index, step in enumerate(filter.entities):
             filter_key = "event" if step.type == TREND_FILTER_TYPE_EVENTS else "action__pk"
             event = (
-                Event.objects.values("distinct_id")
-                .annotate(step_ts=Min("timestamp"), person_id=Value("99999999", IntegerField()),)
+                Event.objects.values("person_id")
+                .annotate(step_ts=Min("timestamp"))
                 .filter(
                     filter.date_filter_Q,
                     **{filter_key: step.id},
                     team_id=team_id,
-                    **({"distinct_id": "1234321"} if index > 0 else {}),
+                    **({"person_id": 1234321} if index > 0 else {}),
                     **(
                         {
                             "timestamp__gte": timezone.now().replace(
@@ -57,19 +56,8 @@ class Funnel(models.Model):
             # This is probably the most hacky part of the entire query generation
             event_string = (
                 event_string.decode("utf-8")
-                .replace("'1234321'", "{prev_step_person_id}")
+                .replace('"posthog_event"."person_id" = 1234321', '"posthog_event"."person_id" = {prev_step_person_id}')
                 .replace("'2000-01-01T00:00:00+00:00'::timestamptz", "{prev_step_ts}")
-                .replace('"posthog_event"."distinct_id"', '"pdi"."person_id"')
-                .replace("99999999", '"pdi"."person_id"')
-                .replace(', "pdi"."person_id" AS "person_id"', "")
-            )
-            event_string = re.sub(
-                # accommodate for identifier e.g. W0 so that it still ends up right after `FROM posthog_event`
-                # not after `ON pdi.distinct_id = posthog_event.distinct_id`
-                r'FROM "posthog_event"( [A-Z][0-9])?',
-                r"FROM posthog_event\1 JOIN posthog_persondistinctid pdi "
-                r"ON pdi.distinct_id = posthog_event.distinct_id",
-                event_string,
             )
             query = sql.SQL(event_string)
             annotations["step_{}".format(index)] = query
@@ -1,9 +1,11 @@
 import uuid
-from typing import Any, List
+from typing import Any, Dict, List
 
 from django.apps import apps
 from django.contrib.postgres.fields import JSONField
-from django.db import models, transaction
+from django.db import connection, models, transaction
+
+from posthog.ee import check_ee_enabled
 
 
 class PersonManager(models.Manager):
@@ -16,6 +18,19 @@ class PersonManager(models.Manager):
             person.add_distinct_ids(distinct_ids)
             return person
 
+    def by_distinct_ids(self, team_id: int, distinct_ids: List[str]) -> Dict[str, "Person"]:
+        """
+        The person of each of these distinct ids that has one, in a single query.
+        """
+        if not distinct_ids:
+            return {}
+        return {
+            person_distinct_id.distinct_id: person_distinct_id.person
+            for person_distinct_id in PersonDistinctId.objects.filter(
+                team_id=team_id, distinct_id__in=set(distinct_ids)
+            ).select_related("person")
+        }
+
     @staticmethod
     def distinct_ids_exist(team_id: int, distinct_ids: List[str]) -> bool:
         return PersonDistinctId.objects.filter(team_id=team_id, distinct_id__in=distinct_ids).exists()
@@ -36,32 +51,83 @@ class Person(models.Model):
             self.add_distinct_id(distinct_id)
 
     def merge_people(self, people_to_merge: List["Person"]):
+        """
+        Moves the distinct ids and cohort memberships of these people to this person and deletes them, with a
+        statement per table rather than per row. All people involved are locked until the merge is committed.
+        Raises `Person.DoesNotExist` if this person was merged into someone else or deleted in the meantime.
+        """
         CohortPeople = apps.get_model(app_label="posthog", model_name="CohortPeople")
+        from .person_identity import set_person_ids
 
-        first_seen = self.created_at
-
-        # merge the properties
-        for other_person in people_to_merge:
-            self.properties = {**other_person.properties, **self.properties}
-            if other_person.created_at < first_seen:
-                # Keep the oldest created_at (i.e. the first time we've seen this person)
-                first_seen = other_person.created_at
-        self.created_at = first_seen
-        self.save()
-
-        # merge the distinct_ids
-        for other_person in people_to_merge:
-            other_person_distinct_ids = PersonDistinctId.objects.filter(person=other_person, team_id=self.team_id)
-            for person_distinct_id in other_person_distinct_ids:
-                person_distinct_id.person = self
-                person_distinct_id.save()
-
-            other_person_cohort_ids = CohortPeople.objects.filter(person=other_person)
-            for person_cohort_id in other_person_cohort_ids:
-                person_cohort_id.person = self
-                person_cohort_id.save()
-
-            other_person.delete()
+        merged_person_ids = [other_person.pk for other_person in people_to_merge if other_person.pk != self.pk]
+        if not merged_person_ids:
+            return
+
+        with transaction.atomic():
+            # Locked in a consistent order, so that concurrent merges of the same people wait instead of deadlocking
+            people = {
+                person.pk: person
+                for person in Person.objects.select_for_update()
+                .filter(team_id=self.team_id, pk__in=[self.pk, *merged_person_ids])
+                .order_by("pk")
+            }
+            if self.pk not in people:
+                raise Person.DoesNotExist(
+                    "Person {} was merged or deleted before it could be merged into".format(self.pk)
+                )
+            # Someone else may have merged some of these people already
+            merged_people = [people[person_id] for person_id in merged_person_ids if person_id in people]
+            merged_person_ids = [other_person.pk for other_person in merged_people]
+
+            # merge the properties, keeping the oldest created_at (i.e. the first time we've seen this person)
+            self.properties, self.created_at = people[self.pk].properties, people[self.pk].created_at
+            properties, first_seen = self.properties, self.created_at
+            for other_person in merged_people:
+                properties = {**other_person.properties, **properties}
+                first_seen = min(first_seen, other_person.created_at)
+            if properties != self.properties or first_seen != self.created_at:
+                self.properties, self.created_at = properties, first_seen
+                self.save(update_fields=["properties", "created_at"])
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE posthog_persondistinctid SET person_id = %s
+                    WHERE team_id = %s AND person_id = ANY(%s)
+                    RETURNING id, distinct_id
+                    """,
+                    (self.pk, self.team_id, merged_person_ids),
+                )
+                moved_distinct_ids = cursor.fetchall()
+
+            # Memberships of cohorts this person is already in would be duplicates
+            CohortPeople.objects.filter(
+                person_id__in=merged_person_ids,
+                cohort_id__in=CohortPeople.objects.filter(person_id=self.pk).values("cohort_id"),
+            ).delete()
+            CohortPeople.objects.filter(person_id__in=merged_person_ids).update(person_id=self.pk)
+
+            Person.objects.filter(pk__in=merged_person_ids).delete()
+
+        set_person_ids(self.team_id, {distinct_id: self.pk for _, distinct_id in moved_distinct_ids})
+        if check_ee_enabled():
+            from ee.clickhouse.models.person import create_person_distinct_id
+
+            for person_distinct_id_id, distinct_id in moved_distinct_ids:
+                create_person_distinct_id(person_distinct_id_id, self.team_id, distinct_id, str(self.uuid))
+
+        # Events keep pointing to the merged people until they're repointed in the background
+        transaction.on_commit(lambda: self._repoint_events(merged_person_ids))
+
+    def _repoint_events(self, merged_person_ids: List[int]) -> None:
+        from posthog.celery import repoint_events_task
+        from posthog.tasks.repoint_events import REPOINT_EVENTS_AGAIN_AFTER_SECONDS
+
+        repoint_events_task.delay(self.team_id, merged_person_ids, self.pk)
+        # For events written with the merged people's ids by processes that hadn't heard about the merge yet
+        repoint_events_task.apply_async(
+            (self.team_id, merged_person_ids, self.pk), countdown=REPOINT_EVENTS_AGAIN_AFTER_SECONDS
+        )
 
     objects = PersonManager()
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True, blank=True)
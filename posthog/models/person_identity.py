@@ -0,0 +1,119 @@
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from posthog.cache import get_cache_key, redis_instance
+
+from .person import PersonDistinctId
+
+# (team_id, distinct_id) -> (person_id, when it was cached), in front of the copy in Redis
+PERSON_ID_CACHE: Dict[Tuple[int, str], Tuple[int, float]] = {}
+PERSON_ID_CACHE_MAX_SIZE = 100000
+# Other processes merge and delete people without invalidating this process' copy, so it's only trusted briefly
+PERSON_ID_LOCAL_TTL_SECONDS = 60
+# Copies in Redis are updated whenever a distinct_id changes person, they only expire to bound memory use
+PERSON_ID_REDIS_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def _redis_key(team_id: int, distinct_id: str) -> str:
+    return get_cache_key(team_id, "person_id/{}".format(distinct_id))
+
+
+def _set_local(team_id: int, distinct_id: str, person_id: int) -> None:
+    key = (team_id, distinct_id)
+    PERSON_ID_CACHE.pop(key, None)
+    PERSON_ID_CACHE[key] = (person_id, time.monotonic())
+    if len(PERSON_ID_CACHE) > PERSON_ID_CACHE_MAX_SIZE:
+        # Dicts keep insertion order, so the first key is the least recently used
+        PERSON_ID_CACHE.pop(next(iter(PERSON_ID_CACHE)))
+
+
+def get_person_ids(team_id: int, distinct_ids: Iterable[str]) -> Dict[str, int]:
+    """
+    The person id of each of these distinct ids that has a person. Looked up in this process' cache, then in Redis,
+    and only distinct ids missing from both are queried from Postgres. Distinct ids without a person aren't cached.
+    """
+    person_ids: Dict[str, int] = {}
+    missing: List[str] = []
+    for distinct_id in set(distinct_ids):
+        cached = PERSON_ID_CACHE.get((team_id, distinct_id))
+        if cached and time.monotonic() - cached[1] < PERSON_ID_LOCAL_TTL_SECONDS:
+            person_ids[distinct_id] = cached[0]
+        else:
+            missing.append(distinct_id)
+
+    if missing and redis_instance:
+        for distinct_id, person_id in zip(
+            missing, redis_instance.mget([_redis_key(team_id, distinct_id) for distinct_id in missing])
+        ):
+            if person_id is not None:
+                person_ids[distinct_id] = int(person_id)
+                _set_local(team_id, distinct_id, int(person_id))
+        missing = [distinct_id for distinct_id in missing if distinct_id not in person_ids]
+
+    if missing:
+        from_db = dict(
+            PersonDistinctId.objects.filter(team_id=team_id, distinct_id__in=missing).values_list(
+                "distinct_id", "person_id"
+            )
+        )
+        set_person_ids(team_id, from_db)
+        person_ids.update(from_db)
+    return person_ids
+
+
+def get_person_id(team_id: int, distinct_id: str) -> Optional[int]:
+    return get_person_ids(team_id, [distinct_id]).get(distinct_id)
+
+
+def set_person_ids(team_id: int, person_ids: Dict[str, int]) -> None:
+    """
+    Points these distinct ids to their (new) person, in one Redis transaction so that readers see all or none of them.
+    Within a transaction they're forgotten straight away and only cached once it's committed, so that a rollback
+    leaves them to be looked up again rather than pointing to people that were never committed.
+    """
+    if not person_ids:
+        return
+    if connection.in_atomic_block:
+        _forget(team_id, list(person_ids))
+    transaction.on_commit(lambda: _set(team_id, person_ids))
+
+
+def forget_distinct_ids(team_id: int, distinct_ids: List[str]) -> None:
+    if not distinct_ids:
+        return
+    _forget(team_id, distinct_ids)
+    if connection.in_atomic_block:
+        # Other processes may cache the committed person again until this transaction is committed
+        transaction.on_commit(lambda: _forget(team_id, distinct_ids))
+
+
+def _set(team_id: int, person_ids: Dict[str, int]) -> None:
+    if redis_instance:
+        pipeline = redis_instance.pipeline()
+        for distinct_id, person_id in person_ids.items():
+            pipeline.set(_redis_key(team_id, distinct_id), person_id, ex=PERSON_ID_REDIS_TTL_SECONDS)
+        pipeline.execute()
+    for distinct_id, person_id in person_ids.items():
+        _set_local(team_id, distinct_id, person_id)
+
+
+def _forget(team_id: int, distinct_ids: List[str]) -> None:
+    if redis_instance:
+        redis_instance.delete(*[_redis_key(team_id, distinct_id) for distinct_id in distinct_ids])
+    for distinct_id in distinct_ids:
+        PERSON_ID_CACHE.pop((team_id, distinct_id), None)
+
+
+@receiver(signals.post_save, sender=PersonDistinctId)
+def person_distinct_id_saved(sender, instance: PersonDistinctId, **kwargs):
+    # Covers aliasing to an existing person and merges, which move distinct ids to the remaining person
+    set_person_ids(instance.team_id, {instance.distinct_id: instance.person_id})
+
+
+@receiver(signals.post_delete, sender=PersonDistinctId)
+def person_distinct_id_deleted(sender, instance: PersonDistinctId, **kwargs):
+    forget_distinct_ids(instance.team_id, [instance.distinct_id])
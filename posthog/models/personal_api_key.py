@@ -1,8 +1,13 @@
+from datetime import timedelta
+
 from django.db import models
 from django.utils import timezone
 
 from .utils import generate_random_token
 
+# Coalesce last_used_at writes so that keys used on every request don't cause a write per request
+LAST_USED_AT_UPDATE_INTERVAL = timedelta(minutes=1)
+
 
 class PersonalAPIKey(models.Model):
     id: models.CharField = models.CharField(primary_key=True, max_length=50, default=generate_random_token)
@@ -18,3 +23,10 @@ class PersonalAPIKey(models.Model):
     team = models.ForeignKey(
         "posthog.Team", on_delete=models.SET_NULL, related_name="personal_api_keys", null=True, blank=True
     )
+
+    def update_last_used_at(self) -> None:
+        now = timezone.now()
+        if self.last_used_at is not None and now - self.last_used_at < LAST_USED_AT_UPDATE_INTERVAL:
+            return
+        self.last_used_at = now
+        PersonalAPIKey.objects.filter(pk=self.pk).update(last_used_at=now)
@@ -1,10 +1,50 @@
 import json
+import re
 from typing import Any, Dict, List, Optional, Union
 
 from django.db.models import Exists, OuterRef, Q
 
 from .person import Person
 
+# Order of JSON types when comparing values of different types, as jsonb does
+JSONB_TYPE_ORDER = {type(None): 0, str: 1, int: 2, float: 2, bool: 3}
+
+
+class MatchNotSupported(Exception):
+    """
+    Raised when a filter can't be evaluated in Python with the same result as in Postgres.
+    Callers should fall back to running the filter as a query.
+    """
+
+    pass
+
+
+def _json_text(value: Any) -> Optional[str]:
+    # Equivalent of Postgres' ->> operator
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (bool, int, float)):
+        return json.dumps(value)
+    raise MatchNotSupported()
+
+
+def _json_equal(left: Any, right: Any) -> bool:
+    if isinstance(left, (dict, list)) or isinstance(right, (dict, list)):
+        raise MatchNotSupported()
+    return JSONB_TYPE_ORDER[type(left)] == JSONB_TYPE_ORDER[type(right)] and left == right
+
+
+def _json_compare(left: Any, right: Any) -> int:
+    if isinstance(left, (dict, list)) or isinstance(right, (dict, list)):
+        raise MatchNotSupported()
+    left_order, right_order = JSONB_TYPE_ORDER[type(left)], JSONB_TYPE_ORDER[type(right)]
+    if left_order != right_order:
+        return left_order - right_order
+    if isinstance(left, str):
+        # Strings are compared using the database collation
+        raise MatchNotSupported()
+    return (left > right) - (left < right)
+
 
 class Property:
     key: str
@@ -64,6 +104,52 @@ class Property:
             )
         return Q(**{"properties__{}{}".format(self.key, f"__{self.operator}" if self.operator else ""): value})
 
+    def matches(self, properties: Dict[str, Any]) -> bool:
+        """
+        Evaluates this property filter against a properties dict, with the same result as `property_to_Q`.
+        Raises MatchNotSupported for filters that can only be evaluated in the database.
+        """
+        if self.type not in ("event", "person") or "__" in self.key or self.key.lstrip("-").isdigit():
+            # Django treats "__" as a path separator and integer keys as array indexes
+            raise MatchNotSupported()
+
+        has_key = self.key in properties
+        property_value = properties.get(self.key)
+        if self.operator == "is_set":
+            return has_key
+        if self.operator == "is_not_set":
+            return not has_key
+
+        value: Any = self._parse_value(self.value)
+        if value is None and self.operator not in (None, "exact", "is_not"):
+            raise MatchNotSupported()
+        if self.operator == "is_not":
+            return not has_key or not _json_equal(property_value, value)
+        if self.operator in ("not_icontains", "not_regex"):
+            if not has_key or property_value is None:
+                return True
+            return not Property(self.key, self.value, self.operator[4:], self.type).matches(properties)
+
+        if not has_key:
+            return False
+        if self.operator in (None, "exact"):
+            return _json_equal(property_value, value)
+        if self.operator == "gt":
+            return _json_compare(property_value, value) > 0
+        if self.operator == "lt":
+            return _json_compare(property_value, value) < 0
+        if self.operator in ("icontains", "regex"):
+            text = _json_text(property_value)
+            if text is None:
+                return False
+            if self.operator == "icontains":
+                return str(value).upper() in text.upper()
+            try:
+                return re.search(str(value), text) is not None
+            except re.error:
+                raise MatchNotSupported()
+        raise MatchNotSupported()
+
     def format_ch_property_json_extract(self) -> str:
         value = self._parse_value(self.value)
         if self.operator == "is_not":
@@ -1,7 +1,9 @@
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.contrib.postgres.fields import ArrayField, JSONField
 from django.db import models
+from django.dispatch import receiver
 from django.utils import timezone
 
 from posthog.constants import TREND_FILTER_TYPE_EVENTS, TRENDS_LINEAR
@@ -13,7 +15,42 @@ from .dashboard_item import DashboardItem
 from .personal_api_key import PersonalAPIKey
 from .utils import UUIDT, generate_random_token, sane_repr
 
-TEAM_CACHE: Dict[str, "Team"] = {}
+# In-process LRU cache of token -> (team, expiry timestamp) for the capture and decide endpoints.
+# Entries are invalidated on Team save/delete in this process, other processes rely on the TTL.
+TEAM_CACHE: Dict[str, Tuple["Team", float]] = {}
+TEAM_CACHE_MAX_SIZE = 10000
+TEAM_CACHE_TTL_SECONDS = 60
+
+PERSONAL_API_KEY_CACHE_PREFIX = "personal_api_key:"
+
+
+def _get_cached_team(cache_key: str) -> Optional["Team"]:
+    try:
+        team, expires_at = TEAM_CACHE.pop(cache_key)
+    except KeyError:
+        return None
+    if expires_at < time.monotonic():
+        return None
+    # Re-insert to mark the entry as most recently used, dicts keep insertion order
+    TEAM_CACHE[cache_key] = (team, expires_at)
+    return team
+
+
+def _set_cached_team(cache_key: str, team: "Team") -> None:
+    TEAM_CACHE.pop(cache_key, None)
+    while len(TEAM_CACHE) >= TEAM_CACHE_MAX_SIZE:
+        try:
+            del TEAM_CACHE[next(iter(TEAM_CACHE))]
+        except (KeyError, StopIteration, RuntimeError):
+            # Another thread modified the cache in the meantime
+            break
+    TEAM_CACHE[cache_key] = (team, time.monotonic() + TEAM_CACHE_TTL_SECONDS)
+
+
+def invalidate_team_cache(team_id: int) -> None:
+    for cache_key, (team, _) in list(TEAM_CACHE.items()):
+        if team.pk == team_id:
+            TEAM_CACHE.pop(cache_key, None)
 
 
 class TeamManager(models.Manager):
@@ -62,6 +99,11 @@ class TeamManager(models.Manager):
         return team
 
     def get_team_from_token(self, token: str, is_personal_api_key: bool = False) -> Optional["Team"]:
+        cache_key = PERSONAL_API_KEY_CACHE_PREFIX + token if is_personal_api_key else token
+        team = _get_cached_team(cache_key)
+        if team is not None:
+            return team
+
         if not is_personal_api_key:
             try:
                 team = Team.objects.get(api_token=token)
@@ -80,8 +122,8 @@ class TeamManager(models.Manager):
             else:
                 assert personal_api_key.team is not None
                 team = personal_api_key.team
-                personal_api_key.last_used_at = timezone.now()
-                personal_api_key.save()
+                personal_api_key.update_last_used_at()
+        _set_cached_team(cache_key, team)
         return team
 
 
@@ -124,3 +166,25 @@ class Team(models.Model):
         return str(self.pk)
 
     __repr__ = sane_repr("uuid", "name", "api_token")
+
+
+def _invalidate_cached_team(team: Team) -> None:
+    # Don't load a deferred api_token just for this, it wasn't changed if it wasn't loaded
+    if "api_token" not in team.get_deferred_fields():
+        TEAM_CACHE.pop(team.api_token, None)
+    invalidate_team_cache(team.pk)
+
+
+@receiver(models.signals.post_save, sender=Team)
+def team_saved(sender, instance: Team, **kwargs):
+    _invalidate_cached_team(instance)
+
+
+@receiver(models.signals.post_delete, sender=Team)
+def team_deleted(sender, instance: Team, **kwargs):
+    _invalidate_cached_team(instance)
+
+
+@receiver(models.signals.post_delete, sender=PersonalAPIKey)
+def personal_api_key_deleted(sender, instance: PersonalAPIKey, **kwargs):
+    TEAM_CACHE.pop(PERSONAL_API_KEY_CACHE_PREFIX + instance.value, None)
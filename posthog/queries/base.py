@@ -1,13 +1,60 @@
+import contextvars
 import copy
-from typing import Any, Callable, Dict, List, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import close_old_connections
 from django.db.models import Q, QuerySet
 
 from posthog.constants import TREND_FILTER_TYPE_ACTIONS, TREND_FILTER_TYPE_EVENTS
 from posthog.models import Entity, Event, Filter, Team
 from posthog.utils import get_compare_period_dates
 
+T = TypeVar("T")
+
+_query_executor: Optional[ThreadPoolExecutor] = None
+_query_executor_lock = threading.Lock()
+_query_thread = threading.local()
+
+
+def _get_query_executor() -> ThreadPoolExecutor:
+    global _query_executor
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = ThreadPoolExecutor(
+                max_workers=settings.INSIGHT_QUERY_THREADS, thread_name_prefix="insight_query"
+            )
+        return _query_executor
+
+
+def _run_query(call: Callable[[], T]) -> T:
+    _query_thread.active = True
+    close_old_connections()
+    try:
+        return call()
+    finally:
+        # As at the end of a request, so the thread keeps its connection only as long as CONN_MAX_AGE allows
+        close_old_connections()
+
+
+def run_in_parallel(calls: List[Callable[[], T]]) -> List[T]:
+    """
+    The results of these calls in their order, running them on the insight query threads. Each call gets a copy
+    of the caller's context, eg its ClickHouse query tags. The calls must not share state they change, so give
+    each one its own copy of the filter.
+    """
+    # Calls made from the pool run in place, as waiting for the pool from the pool could wait forever
+    if settings.INSIGHT_QUERY_THREADS <= 1 or len(calls) <= 1 or getattr(_query_thread, "active", False):
+        return [call() for call in calls]
+    executor = _get_query_executor()
+    futures: List["Future[T]"] = [executor.submit(contextvars.copy_context().run, _run_query, call) for call in calls]
+    return [future.result() for future in futures]
+
+
 """
 process_entity_for_events takes in an Entity and team_id, and returns an Event QuerySet that's correctly filtered
 """
@@ -15,7 +62,7 @@ process_entity_for_events takes in an Entity and team_id, and returns an Event Q
 
 def process_entity_for_events(entity: Entity, team_id: int, order_by="-id") -> QuerySet:
     if entity.type == TREND_FILTER_TYPE_ACTIONS:
-        events = Event.objects.filter(action__pk=entity.id).add_person_id(team_id)
+        events = Event.objects.filter(action__pk=entity.id)
         if order_by:
             events = events.order_by(order_by)
         return events
@@ -55,21 +102,30 @@ def convert_to_comparison(trend_entity: List[Dict[str, Any]], filter: Filter, la
 
 
 def handle_compare(entity: Entity, filter: Filter, func: Callable, team_id: int) -> List:
-    entities_list = []
-    trend_entity = func(entity=entity, filter=filter, team_id=team_id)
-    if filter.compare:
-        trend_entity = convert_to_comparison(trend_entity, filter, "{} - {}".format(entity.name, "current"))
-        entities_list.extend(trend_entity)
+    return handle_compare_entities([entity], filter, func, team_id)
 
-        compared_filter = determine_compared_filter(filter)
-        compared_trend_entity = func(entity=entity, filter=compared_filter, team_id=team_id)
 
-        compared_trend_entity = convert_to_comparison(
-            compared_trend_entity, compared_filter, "{} - {}".format(entity.name, "previous"),
-        )
-        entities_list.extend(compared_trend_entity)
-    else:
-        entities_list.extend(trend_entity)
+def handle_compare_entities(entities: List[Entity], filter: Filter, func: Callable, team_id: int) -> List:
+    """
+    `handle_compare` for each of these entities, with every entity and period queried in parallel.
+    """
+    compared_filter = determine_compared_filter(filter) if filter.compare else None
+    calls: List[Callable[[], List]] = []
+    for entity in entities:
+        for period_filter in [filter, compared_filter] if compared_filter else [filter]:
+            calls.append(partial(func, entity=entity, filter=copy.deepcopy(period_filter), team_id=team_id))
+    results = iter(run_in_parallel(calls))
+
+    entities_list = []
+    for entity in entities:
+        trend_entity = next(results)
+        if compared_filter:
+            entities_list.extend(convert_to_comparison(trend_entity, filter, "{} - {}".format(entity.name, "current")))
+            entities_list.extend(
+                convert_to_comparison(next(results), compared_filter, "{} - {}".format(entity.name, "previous"))
+            )
+        else:
+            entities_list.extend(trend_entity)
     return entities_list
 
 
@@ -1,10 +1,10 @@
-import re
 from collections import defaultdict
-from datetime import timedelta
+from datetime import datetime, timedelta
+from itertools import groupby
 from typing import Any, Dict, List, Optional
 
 from django.db import connection
-from django.db.models import IntegerField, Min, Value
+from django.db.models import IntegerField, Min, QuerySet, Value
 from django.utils import timezone
 from psycopg2 import sql  # type: ignore
 
@@ -28,13 +28,13 @@ class Funnel(BaseQuery):
         for index, step in enumerate(self._filter.entities):
             filter_key = "event" if step.type == TREND_FILTER_TYPE_EVENTS else "action__pk"
             event = (
-                Event.objects.values("distinct_id")
-                .annotate(step_ts=Min("timestamp"), person_id=Value("99999999", IntegerField()),)
+                Event.objects.values("person_id")
+                .annotate(step_ts=Min("timestamp"))
                 .filter(
                     self._filter.date_filter_Q,
                     **{filter_key: step.id},
                     team_id=self._team.pk,
-                    **({"distinct_id": "1234321"} if index > 0 else {}),
+                    **({"person_id": 1234321} if index > 0 else {}),
                     **(
                         {
                             "timestamp__gte": timezone.now().replace(
@@ -55,19 +55,8 @@ class Funnel(BaseQuery):
             # This is probably the most hacky part of the entire query generation
             event_string = (
                 event_string.decode("utf-8")
-                .replace("'1234321'", "{prev_step_person_id}")
+                .replace('"posthog_event"."person_id" = 1234321', '"posthog_event"."person_id" = {prev_step_person_id}')
                 .replace("'2000-01-01T00:00:00+00:00'::timestamptz", "{prev_step_ts}")
-                .replace('"posthog_event"."distinct_id"', '"pdi"."person_id"')
-                .replace("99999999", '"pdi"."person_id"')
-                .replace(', "pdi"."person_id" AS "person_id"', "")
-            )
-            event_string = re.sub(
-                # accommodate for identifier e.g. W0 so that it still ends up right after `FROM posthog_event`
-                # not after `ON pdi.distinct_id = posthog_event.distinct_id`
-                r'FROM "posthog_event"( [A-Z][0-9])?',
-                r"FROM posthog_event\1 JOIN posthog_persondistinctid pdi "
-                r"ON pdi.distinct_id = posthog_event.distinct_id",
-                event_string,
             )
             query = sql.SQL(event_string)
             annotations["step_{}".format(index)] = query
@@ -205,3 +194,76 @@ class Funnel(BaseQuery):
             cursor.execute(qstring)
             results = namedtuplefetchall(cursor)
         return self.data_to_return(results)
+
+
+class StreamingFunnel(Funnel):
+    """
+    Calculates the same funnel as `Funnel` in a single pass over the events of all steps, streamed from a server-side
+    cursor ordered by person and time, so that memory doesn't grow with the number of people entering the funnel.
+    """
+
+    # People listed per step, as with `Funnel`
+    PEOPLE_LIMIT = 100
+
+    def _step_events(self, index: int, step: Entity) -> QuerySet:
+        filter_key = "event" if step.type == TREND_FILTER_TYPE_EVENTS else "action__pk"
+        return (
+            Event.objects.filter(
+                self._filter.date_filter_Q,
+                **{filter_key: step.id},
+                team_id=self._team.pk,
+                # Events can point at people that were merged into another one until they're repointed
+                person_id__in=Person.objects.filter(team_id=self._team.pk).values("pk"),
+            )
+            .filter(self._filter.properties_to_Q(team_id=self._team.pk))
+            .filter(step.properties_to_Q(team_id=self._team.pk))
+            .annotate(step_index=Value(index, output_field=IntegerField()))
+            .values_list("person_id", "timestamp", "step_index")
+        )
+
+    def _events(self) -> QuerySet:
+        step_events = [self._step_events(index, step) for index, step in enumerate(self._filter.entities)]
+        # Events matching several steps come once per step, earlier steps first
+        return step_events[0].union(*step_events[1:], all=True).order_by("person_id", "timestamp", "step_index")
+
+    def run(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        entities = self._filter.entities
+        if not entities:
+            return []
+
+        counts = [0] * len(entities)
+        # Time taken from the previous step, summed over everyone who got to the step
+        total_times = [timedelta(0)] * len(entities)
+        # The first people to complete each number of steps, people come in order of id
+        people_by_steps: List[List[int]] = [[] for _ in range(len(entities) + 1)]
+
+        for person_id, events in groupby(self._events().iterator(), key=lambda event: event[0]):
+            # Each step is reached by the person's first event for it after the previous step was reached
+            reached: List[datetime] = []
+            for _, timestamp, step_index in events:
+                if step_index == len(reached):
+                    reached.append(timestamp)
+
+            for index, timestamp in enumerate(reached):
+                counts[index] += 1
+                if index > 0:
+                    total_times[index] += timestamp - reached[index - 1]
+            if len(people_by_steps[len(reached)]) < self.PEOPLE_LIMIT:
+                people_by_steps[len(reached)].append(person_id)
+
+        steps = []
+        for index, entity in enumerate(entities):
+            # People who got furthest first
+            people = [
+                person_id for completed in range(len(entities), index, -1) for person_id in people_by_steps[completed]
+            ][: self.PEOPLE_LIMIT]
+            step = self._serialize_step(entity, people)
+            step["count"] = counts[index]
+            steps.append(step)
+
+        for index in range(1, len(entities)):
+            steps[index - 1]["average_time"] = (
+                total_times[index].total_seconds() / counts[index] if counts[index] > 0 else 0
+            )
+
+        return steps
@@ -83,8 +83,7 @@ class Paths(BaseQuery):
         )
 
         sessions = (
-            Event.objects.add_person_id(team.pk)
-            .filter(team=team, **(event_filter), **date_query)
+            Event.objects.filter(team=team, **(event_filter), **date_query)
             .filter(
                 ~Q(event__in=["$autocapture", "$pageview", "$identify", "$pageleave", "$screen"])
                 if event is None
@@ -1,4 +1,7 @@
-from typing import Any, Dict, List, Tuple
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 from dateutil.relativedelta import relativedelta
@@ -19,12 +22,7 @@ SESSIONS_LIST_DEFAULT_LIMIT = 50
 
 class Sessions(BaseQuery):
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
-        events = (
-            Event.objects.filter(team=team)
-            .filter(filter.properties_to_Q(team_id=team.pk))
-            .add_person_id(team.pk)
-            .order_by("-timestamp")
-        )
+        events = Event.objects.filter(team=team).filter(filter.properties_to_Q(team_id=team.pk)).order_by("-timestamp")
 
         limit = int(kwargs.get("limit", SESSIONS_LIST_DEFAULT_LIMIT))
         offset = filter.offset
@@ -48,12 +46,18 @@ class Sessions(BaseQuery):
             # if session_type is None, it's a list of sessions which shouldn't have any date filtering
             if filter.session_type is not None:
                 events = events.filter(filter.date_filter_Q)
-            calculated = self.calculate_sessions(events, filter, team, limit, offset)
+            calculated = self.calculate_sessions(events, filter, team, limit, offset, cursor=kwargs.get("cursor"))
 
         return calculated
 
     def calculate_sessions(
-        self, events: QuerySet, filter: Filter, team: Team, limit: int, offset: int
+        self,
+        events: QuerySet,
+        filter: Filter,
+        team: Team,
+        limit: int,
+        offset: int,
+        cursor: Optional[Tuple[datetime, str]] = None,
     ) -> List[Dict[str, Any]]:
 
         # format date filter for session view
@@ -76,23 +80,34 @@ class Sessions(BaseQuery):
                     .isoformat()
                 )
 
-        sessions = (
-            events.filter(_date_gte)
-            .annotate(
-                previous_timestamp=Window(
-                    expression=Lag("timestamp", default=None),
-                    partition_by=F("distinct_id"),
-                    order_by=F("timestamp").asc(),
-                )
+        if filter.session_type is None and cursor is not None:
+            return self._session_list_after(events.filter(_date_gte), team, filter, limit, cursor)
+
+        all_sessions, sessions_sql_params = self._all_sessions_sql(events.filter(_date_gte))
+
+        result: List = []
+        if filter.session_type == SESSION_AVG:
+            result = self._session_avg(all_sessions, sessions_sql_params, filter)
+        elif filter.session_type == SESSION_DIST:
+            result = self._session_dist(all_sessions, sessions_sql_params)
+        else:
+            result = self._session_list(all_sessions, sessions_sql_params, team, filter, limit, offset)
+
+        return result
+
+    def _with_previous_timestamp(self, events: QuerySet) -> QuerySet:
+        return events.annotate(
+            previous_timestamp=Window(
+                expression=Lag("timestamp", default=None), partition_by=F("distinct_id"), order_by=F("timestamp").asc(),
             )
-            .annotate(
-                previous_event=Window(
-                    expression=Lag("event", default=None), partition_by=F("distinct_id"), order_by=F("timestamp").asc(),
-                )
+        ).annotate(
+            previous_event=Window(
+                expression=Lag("event", default=None), partition_by=F("distinct_id"), order_by=F("timestamp").asc(),
             )
         )
 
-        sessions_sql, sessions_sql_params = sessions.query.sql_with_params()
+    def _all_sessions_sql(self, events: QuerySet) -> Tuple[str, Tuple[Any, ...]]:
+        sessions_sql, sessions_sql_params = self._with_previous_timestamp(events).query.sql_with_params()
         all_sessions = "\
             SELECT *,\
                 SUM(new_session) OVER (ORDER BY distinct_id, timestamp) AS global_session_id,\
@@ -104,19 +119,55 @@ class Sessions(BaseQuery):
                 ) AS outer_sessions".format(
             sessions_sql
         )
+        return all_sessions, sessions_sql_params
 
-        result: List = []
-        if filter.session_type == SESSION_AVG:
-            result = self._session_avg(all_sessions, sessions_sql_params, filter)
-        elif filter.session_type == SESSION_DIST:
-            result = self._session_dist(all_sessions, sessions_sql_params)
-        else:
-            result = self._session_list(all_sessions, sessions_sql_params, team, filter, limit, offset)
+    def _session_list_after(
+        self, events: QuerySet, team: Team, filter: Filter, limit: int, cursor: Tuple[datetime, str]
+    ) -> List[Dict[str, Any]]:
+        """
+        The page of sessions after the cursor (start_time, distinct_id), without calculating the sessions before it.
+        """
+        # Whether an event starts a session only depends on the events before it
+        starts_sql, starts_params = self._with_previous_timestamp(
+            events.filter(timestamp__lte=cursor[0])
+        ).query.sql_with_params()
+        session_starts = """
+            SELECT
+                distinct_id,
+                timestamp
+            FROM ({base_query}) AS inner_sessions
+            WHERE
+                (EXTRACT('EPOCH' FROM (timestamp - previous_timestamp)) >= (60 * 30) OR previous_timestamp IS NULL)
+                AND (timestamp, distinct_id) < (%s, %s)
+            ORDER BY
+                timestamp DESC,
+                distinct_id DESC
+            LIMIT %s
+        """.format(
+            base_query=starts_sql
+        )
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(session_starts, starts_params + (cursor[0], cursor[1], limit))
+            starts = db_cursor.fetchall()
+        if not starts:
+            return []
 
-        return result
+        # The events of these sessions are the events of their distinct ids from the earliest of them onwards
+        page_events = events.filter(
+            distinct_id__in={distinct_id for distinct_id, _ in starts}, timestamp__gte=min(start for _, start in starts)
+        )
+        base_query, params = self._all_sessions_sql(page_events)
+        return self._session_list(base_query, params, team, filter, limit, 0, starts=starts)
 
     def _session_list(
-        self, base_query: str, params: Tuple[Any, ...], team: Team, filter: Filter, limit: int, offset: int
+        self,
+        base_query: str,
+        params: Tuple[Any, ...],
+        team: Team,
+        filter: Filter,
+        limit: int,
+        offset: int,
+        starts: Optional[List[Tuple[str, datetime]]] = None,
     ) -> List[Dict[str, Any]]:
 
         session_list = """
@@ -147,17 +198,20 @@ class Sessions(BaseQuery):
                     posthog_persondistinctid ON posthog_persondistinctid.distinct_id = sessions.distinct_id AND posthog_persondistinctid.team_id = %s
                 LEFT OUTER JOIN 
                     posthog_person ON posthog_person.id = posthog_persondistinctid.person_id
+                {starts_condition}
                 ORDER BY 
-                    start_time DESC
+                    start_time DESC,
+                    sessions.distinct_id DESC
             ) as ordered_sessions 
             OFFSET %s 
             LIMIT %s
         """.format(
-            base_query=base_query
+            base_query=base_query,
+            starts_condition="WHERE (sessions.distinct_id, sessions.start_time) IN %s" if starts else "",
         )
 
         with connection.cursor() as cursor:
-            params = params + (team.pk, offset, limit,)
+            params = params + (team.pk,) + ((tuple(starts),) if starts else ()) + (offset, limit,)
             cursor.execute(session_list, params)
             sessions = dict_from_cursor_fetchall(cursor)
 
@@ -167,23 +221,14 @@ class Sessions(BaseQuery):
                     if event.get("elements_hash"):
                         hash_ids.append(event["elements_hash"])
 
-            groups = self._prefetch_elements(hash_ids, team)
+            elements = {
+                elements_hash: ElementSerializer(group_elements, many=True).data
+                for elements_hash, group_elements in ElementGroup.objects.elements_by_hash(team.pk, hash_ids).items()
+            }
 
             for session in sessions:
                 for event in session["events"]:
-                    try:
-                        event.update(
-                            {
-                                "elements": ElementSerializer(
-                                    [group for group in groups if group.hash == event["elements_hash"]][0]
-                                    .element_set.all()
-                                    .order_by("order"),
-                                    many=True,
-                                ).data
-                            }
-                        )
-                    except IndexError:
-                        event.update({"elements": []})
+                    event.update({"elements": elements.get(event["elements_hash"], [])})
         return sessions
 
     def _session_avg(self, base_query: str, params: Tuple[Any, ...], filter: Filter) -> List[Dict[str, Any]]:
@@ -279,11 +324,17 @@ class Sessions(BaseQuery):
         result = [{"label": dist_labels[index], "count": calculated[0][index]} for index in range(len(dist_labels))]
         return result
 
-    def _prefetch_elements(self, hash_ids: List[str], team: Team) -> QuerySet:
-        groups = ElementGroup.objects.none()
-        if len(hash_ids) > 0:
-            groups = ElementGroup.objects.filter(team=team, hash__in=hash_ids).prefetch_related("element_set")
-        return groups
+
+def session_cursor(session: Dict[str, Any]) -> str:
+    """
+    Where the list of sessions continues after this session, for the `cursor` of `Sessions.run`.
+    """
+    return urlsafe_b64encode(json.dumps([session["start_time"].isoformat(), session["distinct_id"]]).encode()).decode()
+
+
+def parse_session_cursor(cursor: str) -> Tuple[datetime, str]:
+    start_time, distinct_id = json.loads(urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(start_time), str(distinct_id)
 
 
 def convert_to_comparison(trend_entity: List[Dict[str, Any]], label: str, filter: Filter) -> List[Dict[str, Any]]:
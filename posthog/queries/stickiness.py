@@ -8,7 +8,7 @@ from django.utils.timezone import now
 from posthog.constants import TREND_FILTER_TYPE_ACTIONS
 from posthog.models import Action, Entity, Event, Filter, Team
 
-from .base import BaseQuery, filter_events, handle_compare, process_entity_for_events
+from .base import BaseQuery, filter_events, handle_compare_entities, process_entity_for_events
 
 
 def execute_custom_sql(query, params):
@@ -76,8 +76,6 @@ class Stickiness(BaseQuery):
         }
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
-        response = []
-
         if not filter.date_from:
             filter._date_from = (
                 Event.objects.filter(team_id=team.pk)
@@ -92,6 +90,4 @@ class Stickiness(BaseQuery):
             if entity.type == TREND_FILTER_TYPE_ACTIONS:
                 entity.name = Action.objects.only("name").get(team=team, pk=entity.id).name
 
-            entity_resp = handle_compare(entity=entity, filter=filter, func=self._serialize_entity, team_id=team.pk)
-            response.extend(entity_resp)
-        return response
+        return handle_compare_entities(filter.entities, filter=filter, func=self._serialize_entity, team_id=team.pk)
@@ -0,0 +1,66 @@
+import threading
+import time
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Dict, List
+
+from django.test import SimpleTestCase, override_settings
+
+from posthog.models import Entity, Filter
+from posthog.queries.base import handle_compare_entities, run_in_parallel
+
+tag: ContextVar[str] = ContextVar("tag", default="")
+
+
+def _slow_call(value: int) -> Dict[str, Any]:
+    time.sleep(0.1)
+    return {"value": value, "tag": tag.get(), "thread": threading.current_thread().name}
+
+
+@override_settings(INSIGHT_QUERY_THREADS=4)
+class TestRunInParallel(SimpleTestCase):
+    def test_run_in_parallel(self) -> None:
+        tag.set("team_2")
+        start = time.monotonic()
+
+        results = run_in_parallel([partial(_slow_call, value) for value in range(4)])
+
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual([result["value"] for result in results], [0, 1, 2, 3])
+        self.assertEqual({result["tag"] for result in results}, {"team_2"})
+        self.assertTrue(all(result["thread"].startswith("insight_query") for result in results))
+
+    def test_calls_from_the_pool_run_in_place(self) -> None:
+        def nested_calls() -> List[Dict[str, Any]]:
+            return run_in_parallel([partial(_slow_call, 0), partial(_slow_call, 1)])
+
+        results = run_in_parallel([nested_calls for _ in range(8)])
+
+        self.assertEqual([[call["value"] for call in calls] for calls in results], [[0, 1]] * 8)
+
+    def test_handle_compare_entities(self) -> None:
+        filter = Filter(
+            data={
+                "date_from": "2020-01-08",
+                "date_to": "2020-01-14",
+                "compare": True,
+                "events": [{"id": "$pageview", "order": 0}, {"id": "sign up", "order": 1}],
+            }
+        )
+
+        def serialize(entity: Entity, filter: Filter, team_id: int) -> List[Dict[str, Any]]:
+            filter.breakdown = "mutated"
+            return [{"label": entity.id, "days": [filter._date_from], "labels": [""]}]
+
+        results = handle_compare_entities(filter.entities, filter, serialize, team_id=1)
+
+        self.assertEqual(
+            [(result["label"], result["dates"]) for result in results],
+            [
+                ("$pageview - current", ["2020-01-08"]),
+                ("$pageview - previous", ["2020-01-02"]),
+                ("sign up - current", ["2020-01-08"]),
+                ("sign up - previous", ["2020-01-02"]),
+            ],
+        )
+        self.assertIsNone(filter.breakdown)
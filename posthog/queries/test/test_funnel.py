@@ -1,9 +1,11 @@
 from unittest.mock import patch
 
+from freezegun import freeze_time
+
 from posthog.api.test.base import BaseTest
 from posthog.models import Action, ActionStep, Element, Event, Person
 from posthog.models.filter import Filter
-from posthog.queries.funnel import Funnel
+from posthog.queries.funnel import Funnel, StreamingFunnel
 from posthog.tasks.update_cache import update_cache_item
 
 
@@ -159,6 +161,25 @@ def funnel_test_factory(Funnel, event_factory, person_factory):
             self.assertEqual(result[1]["count"], 0)
             self.assertEqual(result[2]["count"], 0)
 
+        @freeze_time("2020-01-02")
+        def test_funnel_average_time(self):
+            funnel = self._basic_funnel()
+
+            person_factory(distinct_ids=["fast"], team_id=self.team.pk)
+            self._signup_event(distinct_id="fast", timestamp="2020-01-01T12:00:00Z")
+            self._pay_event(distinct_id="fast", timestamp="2020-01-01T12:01:00Z")
+            self._movie_event(distinct_id="fast", timestamp="2020-01-01T12:02:00Z")
+
+            person_factory(distinct_ids=["slow"], team_id=self.team.pk)
+            self._signup_event(distinct_id="slow", timestamp="2020-01-01T12:00:00Z")
+            self._pay_event(distinct_id="slow", timestamp="2020-01-01T11:00:00Z")
+            self._pay_event(distinct_id="slow", timestamp="2020-01-01T12:03:00Z")
+
+            result = funnel.run()
+            self.assertEqual([step["count"] for step in result], [2, 2, 1])
+            self.assertEqual(result[0]["average_time"], 120)
+            self.assertEqual(result[1]["average_time"], 60)
+
         def test_funnel_prop_filters(self):
             funnel = self._basic_funnel(properties={"$browser": "Safari"})
 
@@ -244,3 +265,7 @@ def funnel_test_factory(Funnel, event_factory, person_factory):
 
 class DjangoFunnelTest(funnel_test_factory(Funnel, Event.objects.create, Person.objects.create)):  # type: ignore
     pass
+
+
+class DjangoStreamingFunnelTest(funnel_test_factory(StreamingFunnel, Event.objects.create, Person.objects.create)):  # type: ignore
+    pass
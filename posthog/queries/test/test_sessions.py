@@ -1,8 +1,10 @@
+from typing import List
+
 from freezegun import freeze_time
 
 from posthog.api.test.base import BaseTest
-from posthog.models import Event, Filter, Person, Team
-from posthog.queries.sessions import Sessions
+from posthog.models import Element, Event, Filter, Person, Team
+from posthog.queries.sessions import Sessions, parse_session_cursor, session_cursor
 
 
 def sessions_test_factory(sessions, event_factory):
@@ -38,6 +40,36 @@ def sessions_test_factory(sessions, event_factory):
                 )
             self.assertEqual(len(response), 1)
 
+        def test_sessions_list_cursor(self):
+            for hour in range(5):
+                with freeze_time("2012-01-15T0{}:00:00.000Z".format(hour)):
+                    event_factory(team=self.team, event="1st action", distinct_id=str(hour))
+                    # Starts at the same time, the distinct id decides the order
+                    event_factory(team=self.team, event="1st action", distinct_id=str(hour + 10))
+                with freeze_time("2012-01-15T0{}:05:00.000Z".format(hour)):
+                    event_factory(team=self.team, event="2nd action", distinct_id=str(hour))
+
+            with freeze_time("2012-01-15T23:00:00.000Z"):
+                all_sessions = sessions().run(Filter(data={"events": [], "session": None}), self.team)
+                paged_sessions: List = []
+                cursor = None
+                while True:
+                    page = sessions().run(
+                        Filter(data={"events": [], "session": None}), self.team, limit=3, cursor=cursor
+                    )
+                    if not page:
+                        break
+                    paged_sessions.extend(page)
+                    cursor = parse_session_cursor(session_cursor(page[-1]))
+
+            self.assertEqual(len(all_sessions), 10)
+            self.assertEqual(
+                [(session["distinct_id"], session["event_count"]) for session in paged_sessions],
+                [(session["distinct_id"], session["event_count"]) for session in all_sessions],
+            )
+            self.assertEqual(paged_sessions[0]["distinct_id"], "4")
+            self.assertEqual(paged_sessions[1]["distinct_id"], "14")
+
         def test_sessions_avg_length(self):
             with freeze_time("2012-01-14T03:21:34.000Z"):
                 event_factory(team=self.team, event="1st action", distinct_id="1")
@@ -235,4 +267,20 @@ def sessions_test_factory(sessions, event_factory):
 
 
 class DjangoSessionsTest(sessions_test_factory(Sessions, Event.objects.create)):  # type: ignore
-    pass
+    def test_sessions_list_elements(self):
+        with freeze_time("2012-01-15T03:21:34.000Z"):
+            Event.objects.create(
+                team=self.team,
+                event="$autocapture",
+                distinct_id="1",
+                elements=[Element(tag_name="button", text="Sign up"), Element(tag_name="div")],
+            )
+        with freeze_time("2012-01-15T03:22:34.000Z"):
+            Event.objects.create(team=self.team, event="$pageview", distinct_id="1")
+
+        with freeze_time("2012-01-15T04:01:34.000Z"), self.assertNumQueries(2):
+            response = Sessions().run(Filter(data={"events": [], "session": None}), self.team)
+
+        events = response[0]["events"]
+        self.assertEqual([element["tag_name"] for element in events[0]["elements"]], ["button", "div"])
+        self.assertEqual(events[1]["elements"], [])
@@ -1,10 +1,12 @@
 import json
+from unittest import TestCase
 
+import pandas as pd
 from freezegun import freeze_time
 
 from posthog.api.test.base import BaseTest
 from posthog.models import Action, ActionStep, Cohort, Event, Filter, Person, Team
-from posthog.queries.trends import Trends
+from posthog.queries.trends import Trends, bucket_counts
 
 
 # parameterize tests to reuse in EE
@@ -677,3 +679,69 @@ def _create_cohort(**kwargs):
 
 class TestDjangoTrends(trend_test_factory(Trends, Event.objects.create, Person.objects.create, _create_action, _create_cohort)):  # type: ignore
     pass
+
+
+class TestBucketCounts(TestCase):
+    def _dataframe(self, rows):
+        return pd.DataFrame(
+            [
+                {"date": pd.Timestamp(date, tz="UTC"), "count": count, "breakdown": breakdown}
+                for date, count, breakdown in rows
+            ],
+            columns=["date", "count", "breakdown"],
+        )
+
+    def test_bucket_counts(self):
+        time_index = pd.date_range("2020-01-01", "2020-01-03", freq="D", tz="UTC")
+        dataframe = self._dataframe(
+            [("2020-01-01", 1, "a"), ("2020-01-03", 4, "b"), ("2020-01-03", 2, "a"), ("2020-01-03", 4, "a")]
+        )
+
+        values, counts = bucket_counts(dataframe, time_index)
+
+        self.assertEqual(values, ["a", "b"])
+        # Rows for the same date and breakdown value are averaged
+        self.assertEqual(counts.tolist(), [[1, 0, 3], [0, 0, 4]])
+
+    def test_dates_outside_index(self):
+        time_index = pd.date_range("2020-01-02", "2020-01-03", freq="D", tz="UTC")
+        dataframe = self._dataframe([("2020-01-01", 1, "a"), ("2020-01-02", 2, "a"), ("2020-01-04", 3, "a")])
+
+        values, counts = bucket_counts(dataframe, time_index)
+
+        self.assertEqual(values, ["a"])
+        self.assertEqual(counts.tolist(), [[2, 0]])
+
+    def test_only_exact_dates_at_week_interval(self):
+        # Weeks start on Sunday
+        time_index = pd.date_range("2020-01-05", "2020-01-19", freq="W", tz="UTC")
+        dataframe = self._dataframe([("2020-01-05", 1, "a"), ("2020-01-08", 2, "a"), ("2020-01-19", 3, "a")])
+
+        values, counts = bucket_counts(dataframe, time_index)
+
+        self.assertEqual(counts.tolist(), [[1, 0, 3]])
+
+    def test_only_exact_dates_at_month_interval(self):
+        time_index = pd.date_range("2020-01-01", "2020-03-31", freq="M", tz="UTC")
+        dataframe = self._dataframe([("2020-01-31", 1, "a"), ("2020-02-01", 2, "a"), ("2020-03-31", 3, "a")])
+
+        values, counts = bucket_counts(dataframe, time_index)
+
+        self.assertEqual(counts.tolist(), [[1, 0, 3]])
+
+    def test_empty_breakdown_values_are_not_counted(self):
+        time_index = pd.date_range("2020-01-01", "2020-01-02", freq="D", tz="UTC")
+        dataframe = self._dataframe([("2020-01-01", 1, ""), ("2020-01-02", 2, "a")])
+
+        values, counts = bucket_counts(dataframe, time_index)
+
+        self.assertEqual(values, ["", "a"])
+        self.assertEqual(counts.tolist(), [[0, 0], [0, 2]])
+
+    def test_empty_dataframe(self):
+        time_index = pd.date_range("2020-01-01", "2020-01-02", freq="D", tz="UTC")
+
+        values, counts = bucket_counts(self._dataframe([]), time_index)
+
+        self.assertEqual(values, [])
+        self.assertEqual(counts.shape, (0, 2))
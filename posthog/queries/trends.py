@@ -1,6 +1,6 @@
 import copy
 import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -38,7 +38,7 @@ from posthog.models import (
 )
 from posthog.utils import append_data
 
-from .base import BaseQuery, filter_events, handle_compare, process_entity_for_events
+from .base import BaseQuery, filter_events, handle_compare_entities, process_entity_for_events
 
 FREQ_MAP = {"minute": "60S", "hour": "H", "day": "D", "week": "W", "month": "M"}
 
@@ -70,6 +70,29 @@ def build_dataframe(aggregates: QuerySet, interval: str, breakdown: Optional[str
     return dataframe
 
 
+def bucket_counts(dataframe: pd.DataFrame, time_index: pd.DatetimeIndex) -> Tuple[List[str], np.ndarray]:
+    """
+    Averages `count` per breakdown value over the dates of `time_index`, in one pass over the dataframe.
+    Returns the breakdown values in order of appearance and a (breakdown value x date) array.
+    """
+    codes, values = pd.factorize(dataframe["breakdown"])
+    dates = pd.DatetimeIndex(dataframe["date"]).asi8
+    counts = dataframe["count"].to_numpy(dtype=float)
+    index = time_index.asi8
+
+    buckets = np.searchsorted(index, dates)
+    # Only dates that fall exactly on the index are counted, rows with an empty breakdown value never were
+    matched = buckets < len(index)
+    matched[matched] = index[buckets[matched]] == dates[matched]
+    matched &= ~np.isnan(counts) & (np.asarray(values)[codes] != "")
+
+    totals = np.zeros((len(values), len(index)))
+    occurrences = np.zeros((len(values), len(index)))
+    np.add.at(totals, (codes[matched], buckets[matched]), counts[matched])
+    np.add.at(occurrences, (codes[matched], buckets[matched]), 1)
+    return list(values), np.divide(totals, occurrences, out=np.zeros_like(totals), where=occurrences > 0)
+
+
 def group_events_to_date(
     date_from: Optional[datetime.datetime],
     date_to: Optional[datetime.datetime],
@@ -100,19 +123,11 @@ def group_events_to_date(
             top_breakdown = counts["breakdown"].to_list()
             dataframe = dataframe[dataframe.breakdown.isin(top_breakdown)]
         dataframe = dataframe.astype({"breakdown": str})
-        for value in dataframe["breakdown"].unique():
-            filtered = (
-                dataframe.loc[dataframe["breakdown"] == value]
-                if value
-                else dataframe.loc[dataframe["breakdown"].isnull()]
-            )
-            df_dates = pd.DataFrame(filtered.groupby("date").mean(), index=time_index)
-            df_dates = df_dates.fillna(0)
-            response[value] = {key: value[0] if len(value) > 0 else 0 for key, value in df_dates.iterrows()}
+        values, counts = bucket_counts(dataframe, time_index)
+        for value, row in zip(values, counts):
+            response[value] = dict(zip(time_index, row.tolist()))
     else:
-        dataframe = pd.DataFrame([], index=time_index)
-        dataframe = dataframe.fillna(0)
-        response["total"] = {key: value[0] if len(value) > 0 else 0 for key, value in dataframe.iterrows()}
+        response["total"] = {key: 0 for key in time_index}
 
     return response
 
@@ -271,7 +286,7 @@ class Trends(BaseQuery):
         if len(filter.actions) > 0:
             actions = Action.objects.filter(pk__in=[entity.id for entity in filter.actions], team_id=team_id)
         actions = actions.prefetch_related(Prefetch("steps", queryset=ActionStep.objects.order_by("id")))
-        entities_list = []
+        entities = []
 
         if not filter.date_from:
             filter._date_from = (
@@ -290,11 +305,9 @@ class Trends(BaseQuery):
                     entity.name = db_action.name
                 except IndexError:
                     continue
-            entities_list.extend(
-                handle_compare(entity=entity, filter=filter, func=self._serialize_entity, team_id=team_id)
-            )
+            entities.append(entity)
 
-        return entities_list
+        return handle_compare_entities(entities, filter=filter, func=self._serialize_entity, team_id=team_id)
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
         return self.calculate_trends(filter, team.pk)
@@ -105,6 +105,14 @@ ASYNC_EVENT_ACTION_MAPPING = False
 if get_bool_from_env("ASYNC_EVENT_ACTION_MAPPING", False):
     ASYNC_EVENT_ACTION_MAPPING = True
 
+# Independent queries of an insight, eg its series and compared periods, run on a pool of this many threads per
+# process, each with its own database connection. With 1 or less they run one after another, as in tests, where
+# other connections can't see the test's transaction
+INSIGHT_QUERY_THREADS = int(os.environ.get("INSIGHT_QUERY_THREADS", 1 if TEST else 4))
+
+# Calculate funnels with `StreamingFunnel`, which streams the funnel's events instead of loading everyone in the funnel
+STREAMING_FUNNELS = get_bool_from_env("STREAMING_FUNNELS", False)
+
 
 # Clickhouse Settings
 CLICKHOUSE_TEST_DB = "posthog_test"
@@ -119,6 +127,18 @@ CLICKHOUSE_VERIFY = get_bool_from_env("CLICKHOUSE_VERIFY", True)
 CLICKHOUSE_REPLICATION = get_bool_from_env("CLICKHOUSE_REPLICATION", False)
 CLICKHOUSE_ENABLE_STORAGE_POLICY = get_bool_from_env("CLICKHOUSE_ENABLE_STORAGE_POLICY", False)
 CLICKHOUSE_ASYNC = get_bool_from_env("CLICKHOUSE_ASYNC", False)
+# Send each element chain as one row with array columns instead of one row per element
+CLICKHOUSE_ELEMENTS_CHAIN = get_bool_from_env("CLICKHOUSE_ELEMENTS_CHAIN", False)
+CLICKHOUSE_CONNECTIONS_MIN = int(os.environ.get("CLICKHOUSE_CONNECTIONS_MIN", 20))
+CLICKHOUSE_CONNECTIONS_MAX = int(os.environ.get("CLICKHOUSE_CONNECTIONS_MAX", 100))
+# Queries a team can run at once per process, so that one team's slow queries can't take every connection.
+# The limit is per process: it has no effect on sync gunicorn workers, which only run one request at a time, and
+# with threaded workers it only caps a team's queries within each worker.
+CLICKHOUSE_CONNECTIONS_PER_TEAM = int(os.environ.get("CLICKHOUSE_CONNECTIONS_PER_TEAM", 10))
+# Limits of the queries run for a team, 0 leaves them to the server's settings
+CLICKHOUSE_MAX_EXECUTION_TIME = int(os.environ.get("CLICKHOUSE_MAX_EXECUTION_TIME", 180))
+CLICKHOUSE_MAX_MEMORY_USAGE = int(os.environ.get("CLICKHOUSE_MAX_MEMORY_USAGE", 0))
+CLICKHOUSE_MAX_THREADS = int(os.environ.get("CLICKHOUSE_MAX_THREADS", 0))
 
 _clickhouse_http_protocol = "http://"
 _clickhouse_http_port = "8123"
@@ -138,6 +158,10 @@ for host in _kafka_hosts:
     url = urlparse(host)
     KAFKA_HOSTS_LIST.append(url.netloc)
 KAFKA_HOSTS = ",".join(KAFKA_HOSTS_LIST)
+# Producer batching. lz4 needs the lz4 package and zstd needs zstandard, use "gzip" or "" if they aren't installed
+KAFKA_LINGER_MS = int(os.environ.get("KAFKA_LINGER_MS", 20))
+KAFKA_BATCH_SIZE = int(os.environ.get("KAFKA_BATCH_SIZE", 256 * 1024))
+KAFKA_COMPRESSION_TYPE = os.environ.get("KAFKA_COMPRESSION_TYPE", "lz4") or None
 
 POSTGRES = "postgres"
 CLICKHOUSE = "clickhouse"
@@ -1,8 +1,9 @@
 import logging
 import time
 
-from celery import shared_task
+from celery import Task, group, shared_task
 from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
 from django.db.models import Q
 from django.utils import timezone
 
@@ -12,26 +13,63 @@ from posthog.models import Cohort
 
 logger = logging.getLogger(__name__)
 
+# A cohort is calculated by one worker at a time, the lock only expires in case that worker died
+COHORT_CALCULATION_LOCK_TIMEOUT = 60 * 60
+# How long to wait before trying to calculate a cohort again while another worker is calculating it
+COHORT_CALCULATION_RETRY_DELAY = 30
+# Scheduled updates calculate a cohort from scratch this often, to pick up edited actions and people who were
+# given older events
+COHORT_FULL_CALCULATION_INTERVAL = 24 * 60 * 60
+
+
+def _lock_key(cohort_id: int) -> str:
+    return "cohort_calculation_lock_{}".format(cohort_id)
+
+
+def _full_calculation_key(cohort_id: int) -> str:
+    return "cohort_full_calculation_{}".format(cohort_id)
+
+
+@shared_task(bind=True, max_retries=None)
+def calculate_cohort(self: Task, cohort_id: int) -> None:
+    if not cache.add(_lock_key(cohort_id), True, COHORT_CALCULATION_LOCK_TIMEOUT):
+        # The cohort was edited while it's being calculated, the running calculation may have used the old groups
+        raise self.retry(countdown=COHORT_CALCULATION_RETRY_DELAY)
+    try:
+        start_time = time.time()
+        cohort = Cohort.objects.get(pk=cohort_id)
+        cohort.calculate_people()
+        cache.set(_full_calculation_key(cohort_id), True, COHORT_FULL_CALCULATION_INTERVAL)
+        calculate_cohorts_ch(cohort)
+        logger.info("Calculating cohort {} took {:.2f} seconds".format(cohort.pk, (time.time() - start_time)))
+    finally:
+        cache.delete(_lock_key(cohort_id))
+
 
 @shared_task
-def calculate_cohort(cohort_id: int) -> None:
-    start_time = time.time()
-    cohort = Cohort.objects.get(pk=cohort_id)
-    cohort.calculate_people()
-    calculate_cohorts_ch(cohort)
-    logger.info("Calculating cohort {} took {:.2f} seconds".format(cohort.pk, (time.time() - start_time)))
+def update_cohort(cohort_id: int) -> None:
+    if not cache.add(_lock_key(cohort_id), True, COHORT_CALCULATION_LOCK_TIMEOUT):
+        logger.info("Cohort {} is still being calculated, skipping it".format(cohort_id))
+        return
+    try:
+        start_time = time.time()
+        cohort = Cohort.objects.get(pk=cohort_id)
+        cohort.calculate_people(
+            incremental=not cache.add(_full_calculation_key(cohort_id), True, COHORT_FULL_CALCULATION_INTERVAL)
+        )
+        logger.info("Updating cohort {} took {:.2f} seconds".format(cohort.pk, (time.time() - start_time)))
+    finally:
+        cache.delete(_lock_key(cohort_id))
 
 
 def calculate_cohorts() -> None:
-    start_time = time.time()
-    for cohort in Cohort.objects.filter(
+    cohort_ids = Cohort.objects.filter(
         Q(is_calculating=False) | Q(last_calculation__lte=timezone.now() - relativedelta(minutes=15))
-    ).order_by("id"):
-        cohort_start = time.time()
-        cohort.calculate_people()
-        logger.info(" - Calculating cohort {} took {:.2f} seconds".format(cohort.pk, (time.time() - cohort_start)))
+    ).values_list("pk", flat=True)
 
-    logger.info("Calculating all cohorts took {:.2f} seconds".format(time.time() - start_time))
+    tasks = [update_cohort.s(cohort_id) for cohort_id in cohort_ids.order_by("id")]
+    logger.info("Found {} cohorts to update".format(len(tasks)))
+    group(tasks).apply_async()
 
 
 def calculate_cohorts_ch(cohort: Cohort) -> None:
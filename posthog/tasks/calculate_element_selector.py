@@ -0,0 +1,39 @@
+import logging
+import time
+
+from celery import Task, shared_task
+from django.core.cache import cache
+
+from posthog.models import ElementSelector
+
+logger = logging.getLogger(__name__)
+
+# Held while a selector is being calculated, including retries. Selectors whose calculation failed altogether are
+# scheduled again by the first request after the lock expired
+ELEMENT_SELECTOR_CALCULATION_LOCK_TIMEOUT = 60 * 60
+ELEMENT_SELECTOR_CALCULATION_MAX_RETRIES = 3
+ELEMENT_SELECTOR_CALCULATION_RETRY_DELAY = 60
+
+
+def _lock_key(element_selector_id: int) -> str:
+    return "element_selector_calculation_lock_{}".format(element_selector_id)
+
+
+def schedule_calculation(element_selector_id: int) -> None:
+    if cache.add(_lock_key(element_selector_id), True, ELEMENT_SELECTOR_CALCULATION_LOCK_TIMEOUT):
+        calculate_element_selector.delay(element_selector_id)
+
+
+@shared_task(bind=True, max_retries=ELEMENT_SELECTOR_CALCULATION_MAX_RETRIES)
+def calculate_element_selector(self: Task, element_selector_id: int) -> None:
+    start_time = time.time()
+    try:
+        ElementSelector.objects.get(pk=element_selector_id).calculate_groups()
+    except ElementSelector.DoesNotExist:
+        pass
+    except Exception as e:
+        raise self.retry(exc=e, countdown=ELEMENT_SELECTOR_CALCULATION_RETRY_DELAY * 2 ** self.request.retries)
+    cache.delete(_lock_key(element_selector_id))
+    logger.info(
+        "Calculating element selector {} took {:.2f} seconds".format(element_selector_id, (time.time() - start_time))
+    )
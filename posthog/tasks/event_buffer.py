@@ -0,0 +1,216 @@
+import datetime
+import io
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from sentry_sdk import capture_exception
+
+from posthog.ee import check_ee_enabled
+from posthog.models import Element, ElementGroup, Event, Person, PersonDistinctId, Team, get_person_id, get_person_ids
+from posthog.models.element_group import hash_elements
+
+# Flush once this many events are buffered, or once the oldest buffered event is this old
+EVENT_BUFFER_MAX_SIZE = 500
+EVENT_BUFFER_MAX_AGE_MS = 1000
+
+COPY_COLUMNS = [
+    "created_at",
+    "team_id",
+    "event",
+    "distinct_id",
+    "person_id",
+    "properties",
+    "timestamp",
+    "elements_hash",
+    "elements",
+]
+
+BufferedEvent = Tuple[Event, Optional[List[Element]], str]
+
+
+def _copy_value(value: Optional[Union[str, int, datetime.datetime]]) -> str:
+    # Escape a value for COPY's text format
+    if value is None:
+        return r"\N"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class EventBuffer:
+    """
+    Accumulates events from ingestion and writes them to Postgres in one transaction per flush.
+    Element groups and missing persons for all buffered events are resolved in bulk as part of the flush.
+
+    When actions are matched synchronously we need the ids of new events, so events are written with a multi-row
+    INSERT ... RETURNING. With ASYNC_EVENT_ACTION_MAPPING enabled events are written with COPY ... FROM STDIN instead.
+
+    `add` flushes automatically when the buffer is full or too old, callers must call `flush` once they're done.
+    """
+
+    def __init__(self, max_size: int = EVENT_BUFFER_MAX_SIZE, max_age_ms: int = EVENT_BUFFER_MAX_AGE_MS) -> None:
+        self.max_size = max_size
+        self.max_age_ms = max_age_ms
+        self.events: List[BufferedEvent] = []
+        self.first_event_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def add(
+        self,
+        team: Team,
+        event: str,
+        distinct_id: str,
+        properties: Dict,
+        timestamp: Optional[Union[datetime.datetime, str]],
+        site_url: str,
+        elements: Optional[List[Element]] = None,
+    ) -> None:
+        self.events.append(
+            (
+                Event(
+                    team=team,
+                    event=event,
+                    distinct_id=distinct_id,
+                    properties=properties,
+                    **({"timestamp": timestamp} if timestamp else {}),
+                ),
+                elements,
+                site_url,
+            )
+        )
+        if self.first_event_at is None:
+            self.first_event_at = time.monotonic()
+        if len(self.events) >= self.max_size or (time.monotonic() - self.first_event_at) * 1000 >= self.max_age_ms:
+            self.flush()
+
+    def flush(self) -> None:
+        events, self.events, self.first_event_at = self.events, [], None
+        if not events:
+            return
+        try:
+            with transaction.atomic():
+                self._resolve_element_groups(events)
+                self._resolve_people(events)
+                self._write_events(events)
+        except Exception as e:
+            # Fall back to writing events one by one, so that a single bad event doesn't drop the whole buffer
+            capture_exception(e)
+            self._write_events_individually(events)
+
+    def _resolve_element_groups(self, events: List[BufferedEvent]) -> None:
+        hashes_by_team: Dict[int, Dict[str, List[Element]]] = defaultdict(dict)
+        for event, elements, _ in events:
+            if not elements:
+                continue
+            for index, element in enumerate(elements):
+                element.order = index
+            event.elements_hash = hash_elements(elements)
+            hashes_by_team[event.team_id][event.elements_hash] = elements
+
+        for team_id, elements_by_hash in hashes_by_team.items():
+            existing_hashes = set(
+                ElementGroup.objects.filter(team_id=team_id, hash__in=list(elements_by_hash.keys())).values_list(
+                    "hash", flat=True
+                )
+            )
+            # New element groups are rare compared to events, create them through the race-safe manager method
+            for elements_hash, elements in elements_by_hash.items():
+                if elements_hash not in existing_hashes:
+                    ElementGroup.objects.create(team_id=team_id, elements=elements)
+
+    def _write_events(self, events: List[BufferedEvent]) -> None:
+        if settings.ASYNC_EVENT_ACTION_MAPPING:
+            self._copy_events(events)
+            return
+
+        Event.objects.bulk_create([event for event, _, _ in events])
+        Event.objects.match_actions(events)
+
+    def _copy_events(self, events: List[BufferedEvent]) -> None:
+        now = timezone.now()
+        rows = io.StringIO()
+        for event, _, _ in events:
+            values = [
+                now,
+                event.team_id,
+                event.event,
+                event.distinct_id,
+                event.person_id,
+                json.dumps(event.properties),
+                event.timestamp,
+                event.elements_hash,
+                json.dumps(event.elements),
+            ]
+            rows.write("\t".join(_copy_value(value) for value in values) + "\n")
+        rows.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY posthog_event ({}) FROM STDIN".format(", ".join(COPY_COLUMNS)), rows,
+            )
+
+    def _resolve_people(self, events: List[BufferedEvent]) -> None:
+        distinct_ids_by_team: Dict[int, Set[str]] = defaultdict(set)
+        for event, _, _ in events:
+            distinct_ids_by_team[event.team_id].add(str(event.distinct_id))
+
+        for team_id, distinct_ids in distinct_ids_by_team.items():
+            person_ids = get_person_ids(team_id, distinct_ids)
+            missing_distinct_ids = sorted(distinct_ids - set(person_ids))
+            if missing_distinct_ids:
+                self._create_missing_people(team_id, missing_distinct_ids)
+                person_ids.update(get_person_ids(team_id, missing_distinct_ids))
+            for event, _, _ in events:
+                if event.team_id == team_id:
+                    event.person_id = person_ids.get(str(event.distinct_id))
+
+    def _create_missing_people(self, team_id: int, missing_distinct_ids: List[str]) -> None:
+        if check_ee_enabled():
+            # Person signals emit to ClickHouse, which bulk_create would skip
+            for distinct_id in missing_distinct_ids:
+                _create_person(team_id, distinct_id)
+            return
+
+        people = Person.objects.bulk_create([Person(team_id=team_id) for _ in missing_distinct_ids])
+        PersonDistinctId.objects.bulk_create(
+            [
+                PersonDistinctId(team_id=team_id, person=person, distinct_id=distinct_id)
+                for person, distinct_id in zip(people, missing_distinct_ids)
+            ],
+            ignore_conflicts=True,
+        )
+        # Another worker may have created some of these distinct_ids in the meantime, drop the unused people
+        Person.objects.filter(pk__in=[person.pk for person in people], persondistinctid__isnull=True).delete()
+
+    def _write_events_individually(self, events: List[BufferedEvent]) -> None:
+        for event, elements, site_url in events:
+            try:
+                # Created first so that the event is written with its person_id
+                if get_person_id(event.team_id, str(event.distinct_id)) is None:
+                    _create_person(event.team_id, str(event.distinct_id))
+                Event.objects.create(
+                    event=event.event,
+                    distinct_id=event.distinct_id,
+                    properties=event.properties,
+                    team=event.team,
+                    site_url=site_url,
+                    timestamp=event.timestamp,
+                    **({"elements": elements} if elements else {}),
+                )
+            except Exception as e:
+                capture_exception(e)
+
+
+def _create_person(team_id: int, distinct_id: str) -> None:
+    # Catch race condition where in between getting and creating, another request already created this person
+    try:
+        with transaction.atomic():
+            Person.objects.create(team_id=team_id, distinct_ids=[distinct_id])
+    except IntegrityError:
+        pass
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from numbers import Number
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection
+from sentry_sdk import capture_exception
+
+from posthog.models import Team
+
+DEFINITION_FIELDS = ("event_names", "event_properties", "event_properties_numerical")
+
+# New names and properties are written to their team at most this often per worker, and at the latest this long
+# after they were first seen
+EVENT_DEFINITIONS_FLUSH_INTERVAL_SECONDS = 10
+
+# team_id -> field -> values that are stored or waiting to be
+KNOWN_DEFINITIONS: Dict[int, Tuple[Dict[str, Set[str]], float]] = {}
+KNOWN_DEFINITIONS_MAX_TEAMS = 1000
+# Lists changed outside of ingestion, eg reset on the team, are only seen once they're loaded again
+KNOWN_DEFINITIONS_TTL_SECONDS = 10 * 60
+# team_id -> field -> values waiting to be stored, in the order they were first seen
+PENDING_DEFINITIONS: Dict[int, Dict[str, List[str]]] = {}
+_last_flush = time.monotonic()
+# Guards PENDING_DEFINITIONS and the flush timer, which flushes from its own thread
+_pending_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+# Appends the values of a JSON array parameter that aren't in the list yet
+APPEND_NEW_VALUES_SQL = """
+{field} = {field} || COALESCE(
+    (
+        SELECT jsonb_agg(new.value ORDER BY new.index)
+        FROM jsonb_array_elements(%s::jsonb) WITH ORDINALITY AS new(value, index)
+        WHERE NOT posthog_team.{field} @> jsonb_build_array(new.value)
+    ),
+    '[]'::jsonb
+)
+"""
+
+
+def store_names_and_properties(team: Team, event: str, properties: Dict) -> None:
+    """
+    Records the event's name and properties as seen for the team. Only new ones are written, in the background
+    with `flush_event_definitions`: by callers through `flush_event_definitions_if_due` once their events are handled,
+    or by a timer so that idle workers don't hold on to them.
+    """
+    known = _known_definitions(team.pk)
+    new: Dict[str, List[str]] = {field: [] for field in DEFINITION_FIELDS}
+    if event not in known["event_names"]:
+        new["event_names"].append(event)
+    for key, value in properties.items():
+        if key not in known["event_properties"]:
+            new["event_properties"].append(key)
+        if isinstance(value, Number) and key not in known["event_properties_numerical"]:
+            new["event_properties_numerical"].append(key)
+
+    with _pending_lock:
+        for field, values in new.items():
+            for value in values:
+                if value not in known[field]:
+                    known[field].add(value)
+                    PENDING_DEFINITIONS.setdefault(team.pk, {}).setdefault(field, []).append(value)
+        _schedule_flush()
+
+
+def _known_definitions(team_id: int) -> Dict[str, Set[str]]:
+    cached = KNOWN_DEFINITIONS.pop(team_id, None)
+    if cached is None or time.monotonic() - cached[1] >= KNOWN_DEFINITIONS_TTL_SECONDS:
+        stored = Team.objects.filter(pk=team_id).values_list(*DEFINITION_FIELDS).get()
+        known = {field: set(values) for field, values in zip(DEFINITION_FIELDS, stored)}
+        with _pending_lock:
+            # Values waiting to be stored are known as well, so they aren't queued twice
+            for field, values in PENDING_DEFINITIONS.get(team_id, {}).items():
+                known[field].update(values)
+        cached = (known, time.monotonic())
+    KNOWN_DEFINITIONS[team_id] = cached
+    if len(KNOWN_DEFINITIONS) > KNOWN_DEFINITIONS_MAX_TEAMS:
+        # Dicts keep insertion order, so the first key is the least recently used
+        KNOWN_DEFINITIONS.pop(next(iter(KNOWN_DEFINITIONS)))
+    return cached[0]
+
+
+def flush_event_definitions_if_due() -> None:
+    """
+    Flushes the pending names and properties if the last flush was long enough ago. Called once events are handled.
+    """
+    if PENDING_DEFINITIONS and time.monotonic() - _last_flush >= EVENT_DEFINITIONS_FLUSH_INTERVAL_SECONDS:
+        flush_event_definitions()
+
+
+def flush_event_definitions() -> None:
+    """
+    Appends the pending names and properties to their teams' lists, in one UPDATE per team. Values are merged into
+    the stored lists in SQL, so concurrent flushes from other workers aren't overwritten and nothing is duplicated.
+    If a team's UPDATE fails the error is reported and its values are put back to be retried with the next flush.
+    """
+    global _last_flush, _flush_timer
+    with _pending_lock:
+        _last_flush = time.monotonic()
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        pending = dict(PENDING_DEFINITIONS)
+        PENDING_DEFINITIONS.clear()
+
+    for team_id, new in pending.items():
+        try:
+            _append_definitions(team_id, new)
+        except Exception as e:
+            capture_exception(e)
+            _requeue(team_id, new)
+
+    with _pending_lock:
+        _schedule_flush()
+
+
+def _append_definitions(team_id: int, new: Dict[str, List[str]]) -> None:
+    fields = list(new.keys())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE posthog_team SET {} WHERE id = %s".format(
+                ", ".join(APPEND_NEW_VALUES_SQL.format(field=field) for field in fields)
+            ),
+            [*(json.dumps(new[field]) for field in fields), team_id],
+        )
+
+
+def _requeue(team_id: int, failed: Dict[str, List[str]]) -> None:
+    with _pending_lock:
+        team_pending = PENDING_DEFINITIONS.setdefault(team_id, {})
+        for field, values in failed.items():
+            team_pending[field] = values + [value for value in team_pending.get(field, []) if value not in values]
+
+
+def _schedule_flush() -> None:
+    # Makes sure pending values are written even if no more events come in. Callers hold _pending_lock.
+    # Tests flush explicitly, as the timer's connection wouldn't see their uncommitted data.
+    global _flush_timer
+    if PENDING_DEFINITIONS and _flush_timer is None and not settings.TEST:
+        _flush_timer = threading.Timer(EVENT_DEFINITIONS_FLUSH_INTERVAL_SECONDS, _flush_from_timer)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def _flush_from_timer() -> None:
+    try:
+        flush_event_definitions()
+    finally:
+        # The timer thread has its own database connection
+        connection.close()
@@ -1,6 +1,5 @@
 import datetime
-from numbers import Number
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import posthoganalytics
 from celery import shared_task
@@ -9,22 +8,27 @@ from dateutil.relativedelta import relativedelta
 from django.db import IntegrityError
 from sentry_sdk import capture_exception
 
-from posthog.models import Element, Event, Person, Team, User
+from posthog.models import Element, Event, Person, Team, User, get_person_id
+from posthog.models.person_identity import forget_distinct_ids
+from posthog.tasks.event_buffer import EventBuffer
+from posthog.tasks.event_definitions import flush_event_definitions_if_due, store_names_and_properties
 
 
-def _alias(previous_distinct_id: str, distinct_id: str, team_id: int, retry_if_failed: bool = True,) -> None:
-    old_person: Optional[Person] = None
-    new_person: Optional[Person] = None
-
+def _get_person(team_id: int, distinct_id: str) -> Optional[Person]:
+    person_id = get_person_id(team_id, distinct_id)
+    if person_id is None:
+        return None
     try:
-        old_person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=previous_distinct_id)
+        return Person.objects.get(pk=person_id)
     except Person.DoesNotExist:
-        pass
+        # Merged into another person or deleted since the person id was cached
+        forget_distinct_ids(team_id, [distinct_id])
+        return Person.objects.filter(team_id=team_id, persondistinctid__distinct_id=distinct_id).first()
 
-    try:
-        new_person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=distinct_id)
-    except Person.DoesNotExist:
-        pass
+
+def _alias(previous_distinct_id: str, distinct_id: str, team_id: int, retry_if_failed: bool = True,) -> None:
+    old_person = _get_person(team_id, previous_distinct_id)
+    new_person = _get_person(team_id, distinct_id)
 
     if old_person and not new_person:
         try:
@@ -57,24 +61,17 @@ def _alias(previous_distinct_id: str, distinct_id: str, team_id: int, retry_if_f
         return
 
     if old_person and new_person and old_person != new_person:
-        new_person.merge_people([old_person])
-
-
-def store_names_and_properties(team: Team, event: str, properties: Dict) -> None:
-    # In _capture we only prefetch a couple of fields in Team to avoid fetching too much data
-    save = False
-    if event not in team.event_names:
-        save = True
-        team.event_names.append(event)
-    for key, value in properties.items():
-        if key not in team.event_properties:
-            team.event_properties.append(key)
-            save = True
-        if isinstance(value, Number) and key not in team.event_properties_numerical:
-            team.event_properties_numerical.append(key)
-            save = True
-    if save:
-        team.save()
+        try:
+            new_person.merge_people([old_person])
+        # Catch race case when somebody else merged or deleted new_person since it was looked up
+        except Person.DoesNotExist:
+            if retry_if_failed:
+                _alias(previous_distinct_id, distinct_id, team_id, False)
+
+
+def _get_team_for_capture(team_id: int) -> Team:
+    # Only prefetch the couple of fields in Team that _capture needs to avoid fetching too much data
+    return Team.objects.only("slack_incoming_webhook", "anonymize_ips", "ingested_event").get(pk=team_id)
 
 
 def _capture(
@@ -85,6 +82,8 @@ def _capture(
     distinct_id: str,
     properties: Dict,
     timestamp: Union[datetime.datetime, str],
+    team: Optional[Team] = None,
+    event_buffer: Optional[EventBuffer] = None,
 ) -> None:
     elements = properties.get("$elements")
     elements_list = None
@@ -104,9 +103,8 @@ def _capture(
             for index, el in enumerate(elements)
         ]
 
-    team = Team.objects.only(
-        "slack_incoming_webhook", "event_names", "event_properties", "anonymize_ips", "ingested_event",
-    ).get(pk=team_id)
+    if team is None:
+        team = _get_team_for_capture(team_id)
 
     if not team.ingested_event:
         # First event for the team captured
@@ -114,14 +112,34 @@ def _capture(
             posthoganalytics.capture(user.distinct_id, "first team event ingested", {"team": str(team.uuid)})
 
         team.ingested_event = True
-        team.save()
+        team.save(update_fields=["ingested_event"])
 
     if not team.anonymize_ips and "$ip" not in properties:
         properties["$ip"] = ip
 
+    if event_buffer is not None:
+        # Event and person are written in bulk when the buffer is flushed
+        event_buffer.add(
+            team=team,
+            event=event,
+            distinct_id=distinct_id,
+            properties=properties,
+            timestamp=timestamp,
+            site_url=site_url,
+            elements=elements_list,
+        )
+        store_names_and_properties(team=team, event=event, properties=properties)
+        return
+
+    # The person is created first so the event is written with its person_id
+    person_id = get_person_id(team_id, str(distinct_id))
+    if person_id is None:
+        person_id = _create_person(team_id, str(distinct_id)).pk
+
     Event.objects.create(
         event=event,
         distinct_id=distinct_id,
+        person_id=person_id,
         properties=properties,
         team=team,
         site_url=site_url,
@@ -129,55 +147,33 @@ def _capture(
         **({"elements": elements_list} if elements_list else {})
     )
     store_names_and_properties(team=team, event=event, properties=properties)
-    if not Person.objects.distinct_ids_exist(team_id=team_id, distinct_ids=[str(distinct_id)]):
-        # Catch race condition where in between getting and creating,
-        # another request already created this user
-        try:
-            Person.objects.create(team_id=team_id, distinct_ids=[str(distinct_id)])
-        except IntegrityError:
-            pass
+    flush_event_definitions_if_due()
 
 
 def get_or_create_person(team_id: int, distinct_id: str) -> Tuple[Person, bool]:
-    person: Person
-    created = False
+    person = _get_person(team_id, str(distinct_id))
+    if person is not None:
+        return person, False
+
+    return _create_person(team_id, str(distinct_id)), True
 
-    if not Person.objects.distinct_ids_exist(team_id=team_id, distinct_ids=[str(distinct_id)]):
-        try:
-            person = Person.objects.create(team_id=team_id, distinct_ids=[str(distinct_id)])
-            created = True
-        except IntegrityError:
-            person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=str(distinct_id))
-            created = False
-    else:
-        person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=str(distinct_id))
-        created = False
 
-    return person, created
+def _create_person(team_id: int, distinct_id: str) -> Person:
+    try:
+        return Person.objects.create(team_id=team_id, distinct_ids=[distinct_id])
+    # Catch race condition where in between getting and creating, another request already created this person
+    except IntegrityError:
+        return Person.objects.get(team_id=team_id, persondistinctid__distinct_id=distinct_id)
 
 
 def _update_person_properties(team_id: int, distinct_id: str, properties: Dict) -> None:
-    try:
-        person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=str(distinct_id))
-    except Person.DoesNotExist:
-        try:
-            person = Person.objects.create(team_id=team_id, distinct_ids=[str(distinct_id)])
-        # Catch race condition where in between getting and creating, another request already created this person
-        except:
-            person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=str(distinct_id))
+    person, _ = get_or_create_person(team_id, distinct_id)
     person.properties.update(properties)
     person.save()
 
 
 def _set_is_identified(team_id: int, distinct_id: str, is_identified: bool = True) -> None:
-    try:
-        person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=str(distinct_id))
-    except Person.DoesNotExist:
-        try:
-            person = Person.objects.create(team_id=team_id, distinct_ids=[str(distinct_id)])
-        # Catch race condition where in between getting and creating, another request already created this person
-        except:
-            person = Person.objects.get(team_id=team_id, persondistinctid__distinct_id=str(distinct_id))
+    person, _ = get_or_create_person(team_id, distinct_id)
     if not person.is_identified:
         person.is_identified = is_identified
         person.save()
@@ -201,9 +197,16 @@ def handle_timestamp(data: dict, now: str, sent_at: Optional[str]) -> datetime.d
     return now_datetime
 
 
-@shared_task
-def process_event(
-    distinct_id: str, ip: str, site_url: str, data: dict, team_id: int, now: str, sent_at: Optional[str],
+def _process_event(
+    distinct_id: str,
+    ip: str,
+    site_url: str,
+    data: dict,
+    team_id: int,
+    now: str,
+    sent_at: Optional[str],
+    team: Optional[Team] = None,
+    event_buffer: Optional[EventBuffer] = None,
 ) -> None:
     if data["event"] == "$create_alias":
         _alias(
@@ -229,4 +232,46 @@ def process_event(
         distinct_id=distinct_id,
         properties=properties,
         timestamp=handle_timestamp(data, now, sent_at),
+        team=team,
+        event_buffer=event_buffer,
+    )
+
+
+@shared_task
+def process_event(
+    distinct_id: str, ip: str, site_url: str, data: dict, team_id: int, now: str, sent_at: Optional[str],
+) -> None:
+    _process_event(
+        distinct_id=distinct_id, ip=ip, site_url=site_url, data=data, team_id=team_id, now=now, sent_at=sent_at,
     )
+
+
+@shared_task
+def process_event_batch(
+    events: List[Dict], ip: str, site_url: str, team_id: int, now: str, sent_at: Optional[str],
+) -> None:
+    """
+    Process all events from a single capture request in one task.
+    `events` is a list of {"distinct_id": ..., "data": ...} dicts, already validated in the capture endpoint.
+    A failing event is reported to Sentry and doesn't stop the rest of the batch from being processed.
+    Events are written to Postgres in bulk through an EventBuffer.
+    """
+    team = _get_team_for_capture(team_id)
+    event_buffer = EventBuffer()
+    for event in events:
+        try:
+            _process_event(
+                distinct_id=event["distinct_id"],
+                ip=ip,
+                site_url=site_url,
+                data=event["data"],
+                team_id=team_id,
+                now=now,
+                sent_at=sent_at,
+                team=team,
+                event_buffer=event_buffer,
+            )
+        except Exception as e:
+            capture_exception(e)
+    event_buffer.flush()
+    flush_event_definitions_if_due()
@@ -0,0 +1,28 @@
+from typing import List
+
+from posthog.models import Event
+from posthog.models.person_identity import PERSON_ID_LOCAL_TTL_SECONDS
+from posthog.tasks.event_buffer import EVENT_BUFFER_MAX_AGE_MS
+
+# Events repointed per UPDATE, so merging someone with a long history doesn't hold one huge transaction
+REPOINT_EVENTS_BATCH_SIZE = 10000
+# Other processes keep the merged people's ids cached for a while after the merge, and buffer events that they
+# resolved with them before writing those. Their events are repointed by a second pass once that's over, with a margin
+# for slow batches
+REPOINT_EVENTS_AGAIN_AFTER_SECONDS = PERSON_ID_LOCAL_TTL_SECONDS + EVENT_BUFFER_MAX_AGE_MS // 1000 + 60
+
+
+def repoint_events(team_id: int, from_person_ids: List[int], to_person_id: int) -> None:
+    """
+    Points the events of people that were merged into another person to that person.
+    Until this has run their events still have the person_id of the merged, deleted, people.
+    """
+    while True:
+        event_ids = list(
+            Event.objects.filter(team_id=team_id, person_id__in=from_person_ids).values_list("pk", flat=True)[
+                :REPOINT_EVENTS_BATCH_SIZE
+            ]
+        )
+        if not event_ids:
+            return
+        Event.objects.filter(pk__in=event_ids).update(person_id=to_person_id)
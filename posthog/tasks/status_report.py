@@ -46,7 +46,7 @@ def status_report(*, dry_run: bool = False) -> Dict[str, Any]:
                 sql.SQL(
                     """
                 SELECT COUNT(DISTINCT person_id) as persons_count
-                FROM posthog_event JOIN posthog_persondistinctid ON (posthog_event.distinct_id = posthog_persondistinctid.distinct_id) WHERE posthog_event.team_id = %s AND posthog_event.created_at >= %s AND posthog_event.created_at <= %s
+                FROM posthog_event WHERE team_id = %s AND created_at >= %s AND created_at <= %s
             """
                 ),
                 (team.id, report["period"]["start_inclusive"], report["period"]["end_inclusive"]),
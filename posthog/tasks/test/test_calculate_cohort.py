@@ -0,0 +1,67 @@
+from unittest.mock import MagicMock, patch
+
+from celery.exceptions import Retry
+from django.core.cache import cache
+
+from posthog.api.test.base import BaseTest
+from posthog.models import Cohort, Person
+from posthog.tasks.calculate_cohort import (
+    _full_calculation_key,
+    _lock_key,
+    calculate_cohort,
+    calculate_cohorts,
+    update_cohort,
+)
+
+
+class TestCalculateCohort(BaseTest):
+    def setUp(self) -> None:
+        super().setUp()
+        self.person = Person.objects.create(distinct_ids=["person_1"], team=self.team, properties={"$os": "Chrome"})
+        self.cohort = Cohort.objects.create(team=self.team, groups=[{"properties": {"$os": "Chrome"}}])
+
+    @patch("posthog.tasks.calculate_cohort.group.apply_async")
+    @patch("posthog.tasks.calculate_cohort.update_cohort.s")
+    def test_calculate_cohorts_fans_out(self, patch_update_cohort: MagicMock, patch_apply_async: MagicMock) -> None:
+        other_cohort = Cohort.objects.create(team=self.team, groups=[{"properties": {"$os": "Safari"}}])
+
+        calculate_cohorts()
+
+        self.assertEqual(
+            [call[0] for call in patch_update_cohort.call_args_list], [(self.cohort.pk,), (other_cohort.pk,)]
+        )
+        patch_apply_async.assert_called_once()
+
+    def test_update_cohort(self) -> None:
+        with patch.object(Cohort, "calculate_people") as patch_calculate_people:
+            update_cohort(self.cohort.pk)
+            update_cohort(self.cohort.pk)
+        # The first update calculates the cohort from scratch
+        self.assertEqual(
+            [call[1] for call in patch_calculate_people.call_args_list], [{"incremental": False}, {"incremental": True}]
+        )
+        self.assertIsNone(cache.get(_lock_key(self.cohort.pk)))
+
+    def test_update_cohort_skips_locked_cohort(self) -> None:
+        cache.set(_lock_key(self.cohort.pk), True)
+
+        update_cohort(self.cohort.pk)
+
+        self.assertEqual(list(self.cohort.people.all()), [])
+
+    def test_calculate_cohort(self) -> None:
+        calculate_cohort(self.cohort.pk)
+
+        self.assertEqual(list(self.cohort.people.all()), [self.person])
+        self.assertTrue(cache.get(_full_calculation_key(self.cohort.pk)))
+        self.assertIsNone(cache.get(_lock_key(self.cohort.pk)))
+
+    def test_calculate_cohort_retries_locked_cohort(self) -> None:
+        cache.set(_lock_key(self.cohort.pk), True)
+
+        with patch("posthog.tasks.calculate_cohort.calculate_cohort.retry", side_effect=Retry) as patch_retry:
+            with self.assertRaises(Retry):
+                calculate_cohort(self.cohort.pk)
+
+        patch_retry.assert_called_once()
+        self.assertEqual(list(self.cohort.people.all()), [])
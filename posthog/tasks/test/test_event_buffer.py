@@ -0,0 +1,64 @@
+from django.test import override_settings
+from django.utils.timezone import now
+
+from posthog.api.test.base import BaseTest
+from posthog.models import Action, ActionStep, Element, ElementGroup, Event, Person
+from posthog.tasks.event_buffer import EventBuffer
+
+
+class TestEventBuffer(BaseTest):
+    def _add_events(self, event_buffer: EventBuffer) -> None:
+        for distinct_id in ["1", "2", "1"]:
+            event_buffer.add(
+                team=self.team,
+                event="$autocapture",
+                distinct_id=distinct_id,
+                properties={"$current_url": "https://posthog.com/\tpricing"},
+                timestamp=now(),
+                site_url="http://testserver",
+                elements=[Element(tag_name="a", href="/pricing", nth_child=1), Element(tag_name="div")],
+            )
+
+    def test_flush_writes_events_elements_and_people(self) -> None:
+        action = Action.objects.create(team=self.team, name="clicked link")
+        ActionStep.objects.create(action=action, event="$autocapture", selector="a")
+        Person.objects.create(team=self.team, distinct_ids=["1"])
+
+        event_buffer = EventBuffer()
+        self._add_events(event_buffer)
+        self.assertEqual(Event.objects.count(), 0)
+        event_buffer.flush()
+
+        self.assertEqual(len(event_buffer), 0)
+        events = Event.objects.all()
+        self.assertEqual(len(events), 3)
+        self.assertEqual(len(set(event.elements_hash for event in events)), 1)
+        self.assertEqual(ElementGroup.objects.count(), 1)
+        self.assertEqual(
+            list(ElementGroup.objects.get().element_set.order_by("order").values_list("tag_name", flat=True)),
+            ["a", "div"],
+        )
+        self.assertEqual(Person.objects.count(), 2)
+        self.assertEqual(Person.objects.get(persondistinctid__distinct_id="2").distinct_ids, ["2"])
+        self.assertEqual(action.events.count(), 3)
+
+    @override_settings(ASYNC_EVENT_ACTION_MAPPING=True)
+    def test_flush_with_copy(self) -> None:
+        event_buffer = EventBuffer()
+        self._add_events(event_buffer)
+        event_buffer.flush()
+
+        events = Event.objects.all()
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[0].properties, {"$current_url": "https://posthog.com/\tpricing"})
+        self.assertIsNotNone(events[0].elements_hash)
+        self.assertEqual(Person.objects.count(), 2)
+
+    def test_flushes_when_full(self) -> None:
+        event_buffer = EventBuffer(max_size=2)
+        self._add_events(event_buffer)
+
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertEqual(len(event_buffer), 1)
+        event_buffer.flush()
+        self.assertEqual(Event.objects.count(), 3)
@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+from django.db import DatabaseError
+from django.test import override_settings
+
+from posthog.api.test.base import BaseTest
+from posthog.models import Team
+from posthog.tasks import event_definitions
+from posthog.tasks.event_definitions import (
+    flush_event_definitions,
+    flush_event_definitions_if_due,
+    store_names_and_properties,
+)
+
+
+@patch("posthog.tasks.event_definitions.EVENT_DEFINITIONS_FLUSH_INTERVAL_SECONDS", 3600)
+class TestEventDefinitions(BaseTest):
+    def test_new_definitions_are_flushed(self) -> None:
+        flush_event_definitions()
+        store_names_and_properties(self.team, "purchase", {"price": 10, "name": "AirPods"})
+
+        with self.assertNumQueries(0):
+            store_names_and_properties(self.team, "purchase", {"price": 20, "name": "AirPods Pro"})
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, [])
+
+        flush_event_definitions()
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual(team.event_names, ["purchase"])
+        self.assertEqual(team.event_properties, ["price", "name"])
+        self.assertEqual(team.event_properties_numerical, ["price"])
+
+    def test_flush_merges_with_stored_definitions(self) -> None:
+        flush_event_definitions()
+        store_names_and_properties(self.team, "$pageview", {"$browser": "Chrome"})
+        # Written by another worker in the meantime
+        Team.objects.filter(pk=self.team.pk).update(event_names=["signup", "$pageview"])
+
+        with self.assertNumQueries(1):
+            flush_event_definitions()
+
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual(team.event_names, ["signup", "$pageview"])
+        self.assertEqual(team.event_properties, ["$browser"])
+
+    def test_known_definitions_are_reloaded(self) -> None:
+        flush_event_definitions()
+        store_names_and_properties(self.team, "purchase", {})
+        flush_event_definitions()
+        # Reset outside of ingestion
+        Team.objects.filter(pk=self.team.pk).update(event_names=[])
+
+        store_names_and_properties(self.team, "purchase", {})
+        flush_event_definitions()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, [])
+
+        with patch("posthog.tasks.event_definitions.KNOWN_DEFINITIONS_TTL_SECONDS", 0):
+            store_names_and_properties(self.team, "purchase", {})
+        flush_event_definitions()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, ["purchase"])
+
+    @patch("posthog.tasks.event_definitions.KNOWN_DEFINITIONS_MAX_TEAMS", 1)
+    @patch.dict(event_definitions.KNOWN_DEFINITIONS, clear=True)
+    def test_known_definitions_are_bounded(self) -> None:
+        other_team = Team.objects.create(api_token="other")
+        store_names_and_properties(self.team, "purchase", {})
+        store_names_and_properties(other_team, "purchase", {})
+        self.assertEqual(list(event_definitions.KNOWN_DEFINITIONS.keys()), [other_team.pk])
+
+    def test_failed_flush_is_retried(self) -> None:
+        flush_event_definitions()
+        store_names_and_properties(self.team, "purchase", {"price": 10})
+
+        with patch("posthog.tasks.event_definitions._append_definitions", side_effect=DatabaseError("boom")), patch(
+            "posthog.tasks.event_definitions.capture_exception"
+        ) as capture_exception:
+            flush_event_definitions()
+        capture_exception.assert_called_once()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, [])
+
+        store_names_and_properties(self.team, "signup", {})
+        flush_event_definitions()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, ["purchase", "signup"])
+
+    def test_flush_if_due(self) -> None:
+        flush_event_definitions()
+        store_names_and_properties(self.team, "purchase", {})
+        flush_event_definitions_if_due()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, [])
+
+        with patch("posthog.tasks.event_definitions.EVENT_DEFINITIONS_FLUSH_INTERVAL_SECONDS", 0):
+            flush_event_definitions_if_due()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, ["purchase"])
+
+    @override_settings(TEST=False)
+    @patch("posthog.tasks.event_definitions.threading.Timer")
+    def test_pending_definitions_are_flushed_by_timer(self, timer: MagicMock) -> None:
+        flush_event_definitions()
+        store_names_and_properties(self.team, "purchase", {})
+        store_names_and_properties(self.team, "signup", {})
+        timer.assert_called_once_with(3600, event_definitions._flush_from_timer)
+        timer.return_value.start.assert_called_once()
+
+        flush_event_definitions()
+        timer.return_value.cancel.assert_called_once()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, ["purchase", "signup"])
@@ -18,10 +18,12 @@ from posthog.models import (
     Team,
     User,
 )
-from posthog.tasks.process_event import process_event
+from posthog.tasks.event_definitions import flush_event_definitions
+from posthog.tasks.process_event import process_event, process_event_batch
 
 
 class TestProcessEvent(BaseTest):
+    @patch("posthog.tasks.event_definitions.EVENT_DEFINITIONS_FLUSH_INTERVAL_SECONDS", 3600)
     def test_capture_new_person(self) -> None:
         user = self._create_user("tim")
         action1 = Action.objects.create(team=self.team)
@@ -62,6 +64,7 @@ class TestProcessEvent(BaseTest):
         self.assertEqual(elements[1].order, 1)
         self.assertEqual(elements[1].text, "💻")
         self.assertEqual(event.distinct_id, "2")
+        self.assertEqual(event.person_id, Person.objects.get().pk)
 
     def test_capture_no_element(self) -> None:
         user = self._create_user("tim")
@@ -506,6 +509,16 @@ class TestIdentify(TransactionBaseTest):
     TESTS_EMAIL: str = "tim@posthog.com"
     TESTS_PASSWORD: Optional[str] = None
 
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = patch("posthog.celery.repoint_events_task.delay")
+        self.repoint_events = patcher.start()
+        self.addCleanup(patcher.stop)
+        # The second pass, for events written before other processes heard about the merge
+        patcher = patch("posthog.celery.repoint_events_task.apply_async")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_distinct_with_anonymous_id(self) -> None:
         Person.objects.create(team=self.team, distinct_ids=["anonymous_id"])
 
@@ -553,7 +566,7 @@ class TestIdentify(TransactionBaseTest):
     # 3. In the frontend, try to alias anonymous_id with new_distinct_id
     # Result should be that we end up with one Person with both ID's
     def test_distinct_with_anonymous_id_which_was_already_created(self) -> None:
-        Person.objects.create(team=self.team, distinct_ids=["anonymous_id"])
+        anonymous_person = Person.objects.create(team=self.team, distinct_ids=["anonymous_id"])
         Person.objects.create(
             team=self.team, distinct_ids=["new_distinct_id"], properties={"email": "someone@gmail.com"},
         )
@@ -579,6 +592,7 @@ class TestIdentify(TransactionBaseTest):
         person = Person.objects.get()
         self.assertEqual(person.distinct_ids, ["anonymous_id", "new_distinct_id"])
         self.assertEqual(person.properties["email"], "someone@gmail.com")
+        self.repoint_events.assert_called_once_with(self.team.pk, [anonymous_person.pk], person.pk)
 
     def test_distinct_with_multiple_anonymous_ids_which_were_already_created(self,) -> None:
         # logging in the first time
@@ -690,6 +704,31 @@ class TestIdentify(TransactionBaseTest):
             now().isoformat(),
             now().isoformat(),
         )
+        flush_event_definitions()
         self.team.refresh_from_db()
         self.assertListEqual(self.team.event_properties, ["price", "name", "$ip"])
         self.assertListEqual(self.team.event_properties_numerical, ["price"])
+
+    def test_process_event_batch(self) -> None:
+        process_event_batch(
+            [
+                {"distinct_id": "xxx", "data": {"event": "$pageview", "properties": {"distinct_id": "xxx"}}},
+                # broken alias event missing the alias property shouldn't stop the rest of the batch
+                {"distinct_id": "xxx", "data": {"event": "$create_alias", "properties": {}}},
+                {"distinct_id": "yyy", "data": {"event": "purchase", "properties": {"distinct_id": "yyy"}}},
+            ],
+            "",
+            "",
+            self.team.pk,
+            now().isoformat(),
+            now().isoformat(),
+        )
+
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertListEqual(
+            sorted(Event.objects.values_list("event", flat=True)), ["$pageview", "purchase"],
+        )
+        self.assertEqual(Person.objects.count(), 2)
+        flush_event_definitions()
+        self.team.refresh_from_db()
+        self.assertIn("purchase", self.team.event_names)
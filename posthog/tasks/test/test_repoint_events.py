@@ -0,0 +1,44 @@
+from unittest.mock import MagicMock, patch
+
+from posthog.api.test.base import BaseTest
+from posthog.models import Event, Person
+from posthog.tasks.repoint_events import REPOINT_EVENTS_AGAIN_AFTER_SECONDS, repoint_events
+
+
+class TestRepointEvents(BaseTest):
+    def test_events_written_before_person(self) -> None:
+        Event.objects.create(team=self.team, distinct_id="1", event="$pageview")
+        person = Person.objects.create(team=self.team, distinct_ids=["1"])
+        Event.objects.create(team=self.team, distinct_id="1", event="$pageview")
+
+        self.assertEqual(list(Event.objects.values_list("person_id", flat=True)), [person.pk, person.pk])
+
+    @patch("posthog.tasks.repoint_events.REPOINT_EVENTS_BATCH_SIZE", 2)
+    def test_repoint_events(self) -> None:
+        person = Person.objects.create(team=self.team, distinct_ids=["1"])
+        merged_people = [Person.objects.create(team=self.team, distinct_ids=[distinct_id]) for distinct_id in "23"]
+        other_person = Person.objects.create(team=self.team, distinct_ids=["4"])
+        for distinct_id in "112234":
+            Event.objects.create(team=self.team, distinct_id=distinct_id, event="$pageview")
+
+        merged_person_ids = [merged_person.pk for merged_person in merged_people]
+        person.merge_people(merged_people)
+        # Until the merged people's events are repointed they're not counted as the person's
+        self.assertEqual(Event.objects.filter(person_id=person.pk).count(), 2)
+
+        repoint_events(self.team.pk, merged_person_ids, person.pk)
+
+        self.assertEqual(Event.objects.filter(person_id=person.pk).count(), 5)
+        self.assertEqual(Event.objects.get(distinct_id="4").person_id, other_person.pk)
+
+    @patch("posthog.celery.repoint_events_task.apply_async")
+    @patch("posthog.celery.repoint_events_task.delay")
+    def test_events_are_repointed_again_later(self, patch_delay: MagicMock, patch_apply_async: MagicMock) -> None:
+        person = Person.objects.create(team=self.team, distinct_ids=["1"])
+
+        person._repoint_events([123])
+
+        patch_delay.assert_called_once_with(self.team.pk, [123], person.pk)
+        patch_apply_async.assert_called_once_with(
+            (self.team.pk, [123], person.pk), countdown=REPOINT_EVENTS_AGAIN_AFTER_SECONDS
+        )
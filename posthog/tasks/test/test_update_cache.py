@@ -6,9 +6,9 @@ from django.utils.timezone import now
 from freezegun import freeze_time
 
 from posthog.api.test.base import BaseTest
+from posthog.decorators import CLICKHOUSE_BACKEND, POSTGRES_BACKEND, TRENDS_ENDPOINT, generate_insight_cache_key
 from posthog.models import Dashboard, DashboardItem, Filter, Funnel
 from posthog.tasks.update_cache import update_cache_item, update_cached_items
-from posthog.utils import generate_cache_key
 
 
 class TestUpdateCache(BaseTest):
@@ -49,8 +49,8 @@ class TestUpdateCache(BaseTest):
             team=self.team,
         )
 
-        item_key = generate_cache_key(filter.toJSON() + "_" + str(self.team.pk))
-        funnel_key = generate_cache_key(filter.toJSON() + "_" + str(self.team.pk))
+        item_key = generate_insight_cache_key(TRENDS_ENDPOINT, filter, self.team.pk, POSTGRES_BACKEND)
+        funnel_key = generate_insight_cache_key(TRENDS_ENDPOINT, funnel_filter, self.team.pk, POSTGRES_BACKEND)
         update_cached_items()
 
         # pass the caught calls straight to the function
@@ -63,3 +63,20 @@ class TestUpdateCache(BaseTest):
         self.assertIsNotNone(DashboardItem.objects.get(pk=item_do_not_cache.pk).last_refresh)
         self.assertEqual(cache.get(item_key)["result"][0]["count"], 0)
         self.assertEqual(cache.get(funnel_key)["result"][0]["count"], 0)
+
+    @patch("posthog.tasks.update_cache._calculate_insight_ee")
+    @patch("posthog.decorators.check_ee_enabled", return_value=True)
+    def test_refresh_uses_backend_of_cached_result(
+        self, patch_check_ee_enabled: MagicMock, patch_calculate_insight_ee: MagicMock
+    ) -> None:
+        # Users can be on Postgres when the instance defaults to ClickHouse
+        filter = Filter(data={"events": [{"id": "$pageview"}]})
+        key = generate_insight_cache_key(TRENDS_ENDPOINT, filter, self.team.pk, POSTGRES_BACKEND)
+        self.assertNotEqual(key, generate_insight_cache_key(TRENDS_ENDPOINT, filter, self.team.pk, CLICKHOUSE_BACKEND))
+
+        update_cache_item(
+            key, TRENDS_ENDPOINT, {"filter": filter.toJSON(), "team_id": self.team.pk, "backend": POSTGRES_BACKEND}
+        )
+
+        patch_calculate_insight_ee.assert_not_called()
+        self.assertEqual(cache.get(key)["result"][0]["count"], 0)
@@ -4,16 +4,32 @@ from typing import Any, Dict, List, Optional, Union
 
 from celery import group
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Prefetch, Q
+from django.db.models import Q
 from django.utils import timezone
 
 from posthog.celery import update_cache_item_task
-from posthog.decorators import FUNNEL_ENDPOINT, TRENDS_ENDPOINT
-from posthog.models import Action, ActionStep, DashboardItem, Filter, Team
-from posthog.queries.funnel import Funnel
+from posthog.constants import TRENDS_STICKINESS
+from posthog.decorators import (
+    CLICKHOUSE_BACKEND,
+    FUNNEL_ENDPOINT,
+    INSIGHT_CACHE_TTL,
+    PATHS_ENDPOINT,
+    RETENTION_ENDPOINT,
+    SESSIONS_ENDPOINT,
+    TRENDS_ENDPOINT,
+    default_insight_backend,
+    generate_insight_cache_key,
+    get_cache_type,
+)
+from posthog.models import DashboardItem, Filter, Team
+from posthog.queries.funnel import Funnel, StreamingFunnel
+from posthog.queries.paths import Paths
+from posthog.queries.retention import Retention
+from posthog.queries.sessions import Sessions
+from posthog.queries.stickiness import Stickiness
 from posthog.queries.trends import Trends
-from posthog.utils import generate_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -23,13 +39,21 @@ def update_cache_item(key: str, cache_type: str, payload: dict) -> None:
     result: Optional[Union[List, Dict]] = None
     filter_dict = json.loads(payload["filter"])
     filter = Filter(data=filter_dict)
-    if cache_type == TRENDS_ENDPOINT:
-        result = _calculate_trends(filter, int(payload["team_id"]))
-    elif cache_type == FUNNEL_ENDPOINT:
-        result = _calculate_funnel(filter, int(payload["team_id"]))
+    team_id = int(payload["team_id"])
+    dashboard_items = DashboardItem.objects.filter(team_id=team_id, filters=filter.to_dict())
+    dashboard_items.update(refreshing=True)
+    # Refreshed with the backend of the request that cached the result, payloads from before there were several lack it
+    backend = payload.get("backend", default_insight_backend())
+    result = calculate_insight(cache_type, filter, Team(pk=team_id), backend)
+    dashboard_items.update(last_refresh=timezone.now(), refreshing=False)
 
     if result:
-        cache.set(key, {"result": result, "details": payload, "type": cache_type}, 25 * 60)
+        cache.set(
+            key,
+            {"result": result, "details": payload, "type": cache_type, "last_refresh": timezone.now()},
+            INSIGHT_CACHE_TTL,
+        )
+    cache.delete(key + "_refreshing")
 
 
 def update_cached_items() -> None:
@@ -46,15 +70,16 @@ def update_cached_items() -> None:
 
     for item in items.filter(filters__isnull=False).exclude(filters={}).distinct("filters"):
         filter = Filter(data=item.filters)
-        cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), item.team_id))
+        cache_type = get_cache_type(filter)
+        backend = default_insight_backend()
+        cache_key = generate_insight_cache_key(cache_type, filter, item.team_id, backend)
         curr_data = cache.get(cache_key)
 
         # if task is logged and loading leave it alone
         if curr_data and curr_data.get("task_id", None):
             continue
 
-        cache_type = FUNNEL_ENDPOINT if filter.insight == "FUNNELS" else TRENDS_ENDPOINT
-        payload = {"filter": filter.toJSON(), "team_id": item.team_id}
+        payload = {"filter": filter.toJSON(), "team_id": item.team_id, "backend": backend}
         tasks.append(update_cache_item_task.s(cache_key, cache_type, payload))
 
     logger.info("Found {} items to refresh".format(len(tasks)))
@@ -62,19 +87,46 @@ def update_cached_items() -> None:
     taskset.apply_async()
 
 
-def _calculate_trends(filter: Filter, team_id: int) -> List[Dict[str, Any]]:
-    actions = Action.objects.filter(team_id=team_id)
-    actions = actions.prefetch_related(Prefetch("steps", queryset=ActionStep.objects.order_by("id")))
-    dashboard_items = DashboardItem.objects.filter(team_id=team_id, filters=filter.to_dict())
-    dashboard_items.update(refreshing=True)
-    result = Trends().run(filter, Team(pk=team_id))
-    dashboard_items.update(last_refresh=timezone.now(), refreshing=False)
-    return result
+def calculate_insight(cache_type: str, filter: Filter, team: Team, backend: str) -> Optional[Union[List, Dict]]:
+    if backend == CLICKHOUSE_BACKEND:
+        return _calculate_insight_ee(cache_type, filter, team)
 
+    if cache_type == TRENDS_ENDPOINT:
+        if filter.shown_as == TRENDS_STICKINESS:
+            return Stickiness().run(filter, team)
+        return Trends().run(filter, team)
+    elif cache_type == FUNNEL_ENDPOINT:
+        if settings.STREAMING_FUNNELS:
+            return StreamingFunnel(filter=filter, team=team).run()
+        return Funnel(filter=filter, team=team).run()
+    elif cache_type == SESSIONS_ENDPOINT:
+        return Sessions().run(filter, team)
+    elif cache_type == PATHS_ENDPOINT:
+        return Paths().run(filter=filter, team=team)
+    elif cache_type == RETENTION_ENDPOINT:
+        filter._date_from = "-11d"
+        return Retention().run(filter, team)
+    return None
+
+
+def _calculate_insight_ee(cache_type: str, filter: Filter, team: Team) -> Optional[Union[List, Dict]]:
+    from ee.clickhouse.queries.clickhouse_funnel import ClickhouseFunnel
+    from ee.clickhouse.queries.clickhouse_paths import ClickhousePaths
+    from ee.clickhouse.queries.clickhouse_retention import ClickhouseRetention
+    from ee.clickhouse.queries.clickhouse_sessions import ClickhouseSessions
+    from ee.clickhouse.queries.clickhouse_stickiness import ClickhouseStickiness
+    from ee.clickhouse.queries.clickhouse_trends import ClickhouseTrends
 
-def _calculate_funnel(filter: Filter, team_id: int) -> List[Dict[str, Any]]:
-    dashboard_items = DashboardItem.objects.filter(team_id=team_id, filters=filter.to_dict())
-    dashboard_items.update(refreshing=True)
-    result = Funnel(filter=filter, team=Team(pk=team_id)).run()
-    dashboard_items.update(last_refresh=timezone.now(), refreshing=False)
-    return result
+    if cache_type == TRENDS_ENDPOINT:
+        if filter.shown_as == TRENDS_STICKINESS:
+            return ClickhouseStickiness().run(filter, team)
+        return ClickhouseTrends().run(filter, team)
+    elif cache_type == FUNNEL_ENDPOINT:
+        return ClickhouseFunnel(filter=filter, team=team).run()
+    elif cache_type == SESSIONS_ENDPOINT:
+        return ClickhouseSessions().run(filter, team)
+    elif cache_type == PATHS_ENDPOINT:
+        return ClickhousePaths().run(filter=filter, team=team)
+    elif cache_type == RETENTION_ENDPOINT:
+        return ClickhouseRetention().run(filter, team)
+    return None
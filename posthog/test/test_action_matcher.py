@@ -0,0 +1,146 @@
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from posthog.api.test.base import BaseTest
+from posthog.models import Action, ActionStep, Element, Event, Person
+from posthog.models.action_matcher import get_team_action_matcher
+from posthog.models.property import MatchNotSupported, Property
+
+
+class TestActionMatcher(BaseTest):
+    def _create_events(self):
+        Person.objects.create(distinct_ids=["whatever"], team=self.team)
+        events = [
+            Event.objects.create(
+                team=self.team,
+                event="$autocapture",
+                distinct_id="whatever",
+                properties={"$current_url": "https://posthog.com/pricing", "plan": "free", "seats": 5},
+                elements=[
+                    Element(tag_name="a", href="/signup", text="Sign up", attr_class=["btn", "primary"], nth_child=2),
+                    Element(tag_name="div", attr_id="header", attributes={"attr__data-attr": "nav"}),
+                    Element(tag_name="div"),
+                ],
+            ),
+            Event.objects.create(
+                team=self.team,
+                event="$autocapture",
+                distinct_id="whatever",
+                properties={"$current_url": "https://posthog.com/docs_page", "plan": None, "seats": "5"},
+                elements=[Element(tag_name="button", text="Sign up"), Element(tag_name="div")],
+            ),
+            Event.objects.create(
+                team=self.team,
+                event="$pageview",
+                distinct_id="whatever",
+                properties={"$current_url": "https://posthog.com/", "seats": True},
+            ),
+        ]
+        return events
+
+    def _create_actions(self):
+        steps: List[Dict[str, Any]] = [
+            {"event": "$autocapture", "selector": "div > a.btn"},
+            {"event": "$autocapture", "selector": "div a:nth-child(2)"},
+            {"event": "$autocapture", "selector": "[data-attr='nav'] a"},
+            {"event": "$autocapture", "selector": "div#header > a"},
+            {"event": "$autocapture", "selector": "div div a"},
+            {"event": "$autocapture", "tag_name": "button", "text": "Sign up"},
+            {"event": "$autocapture", "tag_name": "a", "text": "Sign up", "href": "/other"},
+            {"event": "$autocapture", "url": "pricing"},
+            {"event": "$autocapture", "url": "docs_page", "url_matching": ActionStep.CONTAINS},
+            {"event": "$autocapture", "url": "posthog.com/d%", "url_matching": ActionStep.CONTAINS},
+            {"event": "$pageview", "url": "https://posthog.com/", "url_matching": ActionStep.EXACT},
+            {"event": "$pageview", "url": r"^https://posthog\.com/$", "url_matching": ActionStep.REGEX},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "free"}]},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "free", "operator": "is_not"}]},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "is_set", "operator": "is_set"}]},
+            {"event": "$pageview", "properties": [{"key": "plan", "value": "is_not_set", "operator": "is_not_set"}]},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "FRE", "operator": "icontains"}]},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "FRE", "operator": "not_icontains"}]},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "^f", "operator": "regex"}]},
+            {"event": "$autocapture", "properties": [{"key": "plan", "value": "^f", "operator": "not_regex"}]},
+            {"event": "$autocapture", "properties": [{"key": "seats", "value": "5"}]},
+            {"event": "$autocapture", "properties": [{"key": "seats", "value": "4", "operator": "gt"}]},
+            {"event": "$pageview", "properties": [{"key": "seats", "value": "4", "operator": "gt"}]},
+            {"event": "$autocapture", "properties": [{"key": "seats", "value": "6", "operator": "lt"}]},
+            {"event": "$pageview", "properties": {"seats": "true"}},
+        ]
+        actions = []
+        for index, step in enumerate(steps):
+            action = Action.objects.create(team=self.team, name="action {}".format(index))
+            ActionStep.objects.create(action=action, **step)
+            actions.append(action)
+        return actions
+
+    def test_matches_same_actions_as_database(self):
+        actions = self._create_actions()
+        events = self._create_events()
+
+        for event in events:
+            expected = [
+                action
+                for action in actions
+                if Event.objects.filter(pk=event.pk).query_db_by_action(action).exists()
+                and event.event in [step.event for step in action.steps.all()]
+            ]
+            with patch("posthog.models.event.EventManager.query_db_by_action") as query_db_by_action:
+                self.assertEqual(get_team_action_matcher(self.team.pk).actions_for(event), expected)
+            query_db_by_action.assert_not_called()
+
+    def test_falls_back_to_database(self):
+        Person.objects.create(distinct_ids=["whatever"], team=self.team, properties={"email": "tim@posthog.com"})
+        action = Action.objects.create(team=self.team, name="person")
+        ActionStep.objects.create(
+            action=action,
+            event="$pageview",
+            properties=[{"key": "email", "value": "tim@posthog.com", "type": "person"}],
+        )
+        event = Event.objects.create(team=self.team, event="$pageview", distinct_id="whatever")
+
+        self.assertEqual(get_team_action_matcher(self.team.pk).actions_for(event), [action])
+        self.assertEqual(list(action.events.all()), [event])
+
+    def test_cache_invalidated_when_actions_change(self):
+        action = Action.objects.create(team=self.team, name="pageview")
+        ActionStep.objects.create(action=action, event="$pageview")
+        Event.objects.create(team=self.team, event="$pageview", distinct_id="whatever")
+
+        with self.assertNumQueries(1):
+            matcher = get_team_action_matcher(self.team.pk)
+        self.assertEqual(get_team_action_matcher(self.team.pk), matcher)
+
+        action.deleted = True
+        action.save()
+        self.assertEqual(get_team_action_matcher(self.team.pk).actions_for(Event.objects.get()), [])
+
+    def test_match_actions_in_bulk(self):
+        action = Action.objects.create(team=self.team, name="pageview")
+        ActionStep.objects.create(action=action, event="$pageview")
+        with self.settings(ASYNC_EVENT_ACTION_MAPPING=True):
+            events = [Event.objects.create(team=self.team, event="$pageview", distinct_id="whatever") for _ in range(3)]
+
+        # Loading the matcher (3 queries) and a single insert for all matches
+        with patch("posthog.models.action.Action.on_perform") as on_perform, self.assertNumQueries(4):
+            Event.objects.match_actions([(event, None, None) for event in events])
+        self.assertEqual(on_perform.call_count, 3)
+        self.assertEqual(action.events.count(), 3)
+
+
+class TestPropertyMatches(BaseTest):
+    def test_json_types(self):
+        self.assertTrue(Property(key="a", value="1").matches({"a": 1}))
+        self.assertTrue(Property(key="a", value="1").matches({"a": 1.0}))
+        self.assertFalse(Property(key="a", value="1").matches({"a": "1"}))
+        self.assertFalse(Property(key="a", value="1").matches({"a": True}))
+        self.assertTrue(Property(key="a", value="true").matches({"a": True}))
+        self.assertTrue(Property(key="a", value="1", operator="lt").matches({"a": None}))
+        self.assertTrue(Property(key="a", value="1", operator="gt").matches({"a": False}))
+
+    def test_not_supported(self):
+        with self.assertRaises(MatchNotSupported):
+            Property(key="a__b", value="1").matches({})
+        with self.assertRaises(MatchNotSupported):
+            Property(key="a", value="b", operator="gt").matches({"a": "c"})
+        with self.assertRaises(MatchNotSupported):
+            Property(key="id", value="1", type="cohort").matches({})
@@ -1,5 +1,7 @@
+from freezegun import freeze_time
+
 from posthog.api.test.base import BaseTest
-from posthog.models import Action, ActionStep, Cohort, Element, Event, Person, Team
+from posthog.models import Action, ActionStep, Cohort, CohortPeople, Element, Event, Person, Team
 
 
 class TestCohort(BaseTest):
@@ -34,3 +36,60 @@ class TestCohort(BaseTest):
         )
         cohort.calculate_people()
         self.assertCountEqual([p for p in cohort.people.all()], [person1, person2])
+
+    def test_recalculating_keeps_unchanged_members(self):
+        person1 = Person.objects.create(distinct_ids=["person_1"], team=self.team, properties={"$os": "Chrome"})
+        person2 = Person.objects.create(distinct_ids=["person_2"], team=self.team, properties={"$os": "Chrome"})
+        cohort = Cohort.objects.create(team=self.team, groups=[{"properties": {"$os": "Chrome"}}])
+        cohort.calculate_people()
+        membership = CohortPeople.objects.get(cohort=cohort, person=person1)
+
+        person2.properties = {"$os": "Safari"}
+        person2.save()
+        person3 = Person.objects.create(distinct_ids=["person_3"], team=self.team, properties={"$os": "Chrome"})
+        cohort.calculate_people()
+
+        self.assertCountEqual(cohort.people.all(), [person1, person3])
+        self.assertEqual(CohortPeople.objects.get(cohort=cohort, person=person1).pk, membership.pk)
+
+    def test_calculate_people_incrementally(self):
+        action = Action.objects.create(team=self.team)
+        ActionStep.objects.create(action=action, event="user signed up")
+        person1 = Person.objects.create(distinct_ids=["person_1"], team=self.team)
+        person2 = Person.objects.create(distinct_ids=["person_2"], team=self.team)
+        person3 = Person.objects.create(distinct_ids=["person_3"], team=self.team)
+
+        with freeze_time("2020-01-01T12:00:00Z"):
+            Event.objects.create(event="user signed up", team=self.team, distinct_id="person_1")
+            Event.objects.create(event="user signed up", team=self.team, distinct_id="person_2")
+            action.calculate_events()
+            cohort = Cohort.objects.create(team=self.team, groups=[{"action_id": action.pk, "days": 7}])
+            cohort.calculate_people()
+        self.assertCountEqual(cohort.people.all(), [person1, person2])
+
+        with freeze_time("2020-01-06T12:00:00Z"):
+            Event.objects.create(event="user signed up", team=self.team, distinct_id="person_2")
+            action.calculate_events()
+        with freeze_time("2020-01-09T12:00:00Z"):
+            # Not in `Action.events` yet
+            Event.objects.create(event="user signed up", team=self.team, distinct_id="person_3")
+            cohort.calculate_people(incremental=True)
+
+        cohort.refresh_from_db()
+        self.assertCountEqual(cohort.people.all(), [person2, person3])
+        self.assertEqual(cohort.last_calculation.isoformat(), "2020-01-09T12:00:00+00:00")
+        self.assertFalse(cohort.is_calculating)
+
+    def test_edited_cohort_is_calculated_in_full(self):
+        person = Person.objects.create(distinct_ids=["person_1"], team=self.team, properties={"$os": "Chrome"})
+        action = Action.objects.create(team=self.team)
+        ActionStep.objects.create(action=action, event="user signed up")
+        cohort = Cohort.objects.create(team=self.team, groups=[{"action_id": action.pk, "days": 7}])
+        cohort.calculate_people()
+
+        cohort.groups = [{"properties": {"$os": "Chrome"}}]
+        cohort.is_calculating = True
+        cohort.save()
+        cohort.calculate_people(incremental=True)
+
+        self.assertEqual(list(cohort.people.all()), [person])
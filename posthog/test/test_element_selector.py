@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+from celery.exceptions import Retry
+from django.core.cache import cache
+
+from posthog.api.test.base import BaseTest
+from posthog.models import Action, ActionStep, Element, ElementGroup, ElementSelector, Event, Person
+from posthog.tasks.calculate_element_selector import _lock_key, calculate_element_selector
+
+
+class TestElementSelector(BaseTest):
+    def _event(self, elements):
+        return Event.objects.create(team=self.team, event="$autocapture", distinct_id="whatever", elements=elements)
+
+    def _action(self, selector):
+        action = Action.objects.create(team=self.team, name="button")
+        ActionStep.objects.create(action=action, event="$autocapture", selector=selector)
+        return action
+
+    def test_calculated_when_first_used(self):
+        self._action("div > a.btn")
+        Person.objects.create(team=self.team, distinct_ids=["whatever"])
+        event = self._event([Element(tag_name="a", attr_class=["btn"]), Element(tag_name="div")])
+        self._event([Element(tag_name="a"), Element(tag_name="div")])
+
+        with patch("posthog.models.element_selector.transaction.on_commit", lambda callback: callback()), patch(
+            "posthog.tasks.calculate_element_selector.calculate_element_selector.delay", calculate_element_selector
+        ):
+            # Queried directly until the index has been calculated in the background
+            self.assertIsNone(ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn"))
+        self.assertIsNone(cache.get(_lock_key(ElementSelector.objects.get().pk)))
+
+        element_selector = ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+        assert element_selector is not None
+        self.assertIsNotNone(element_selector.calculated_at)
+        self.assertEqual([group.hash for group in element_selector.groups.all()], [event.elements_hash])
+
+        with self.assertNumQueries(1):
+            ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+
+    def test_new_groups_are_added(self):
+        self._action("div > a.btn")
+        ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+        event = self._event([Element(tag_name="a", attr_class=["btn"]), Element(tag_name="div")])
+        self._event([Element(tag_name="a"), Element(tag_name="div")])
+
+        self.assertEqual(
+            list(ElementGroup.objects.filter(selectors__selector="div > a.btn").values_list("hash", flat=True)),
+            [event.elements_hash],
+        )
+
+    def test_action_uses_index(self):
+        Person.objects.create(team=self.team, distinct_ids=["whatever"])
+        action = self._action("div > a.btn")
+        event = self._event([Element(tag_name="a", attr_class=["btn"]), Element(tag_name="div")])
+        self._event([Element(tag_name="a"), Element(tag_name="div")])
+        self.assertEqual(list(Event.objects.query_db_by_action(action)), [event])
+        calculate_element_selector(ElementSelector.objects.get(selector="div > a.btn").pk)
+
+        query, _ = Event.objects.query_db_by_action(action).query.sql_with_params()
+        self.assertNotIn('"posthog_element"', query)
+        self.assertEqual(list(Event.objects.query_db_by_action(action)), [event])
+
+    def test_unsupported_selector_is_queried_directly(self):
+        self._action("a:nth-child(odd)")
+        self.assertIsNone(ElementSelector.objects.get_calculated(self.team.pk, "a:nth-child(odd)"))
+
+    def test_ad_hoc_selector_is_not_indexed(self):
+        self.assertIsNone(ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn"))
+        self.assertFalse(ElementSelector.objects.exists())
+
+    def test_index_dropped_once_no_action_uses_it(self):
+        action = self._action("div > a.btn")
+        ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+        action.deleted = True
+        action.save()
+
+        self._event([Element(tag_name="a", attr_class=["btn"]), Element(tag_name="div")])
+        self.assertFalse(ElementSelector.objects.exists())
+
+    def test_failed_calculation_is_retried(self):
+        self._action("div > a.btn")
+        ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+        element_selector = ElementSelector.objects.get()
+        cache.set(_lock_key(element_selector.pk), True)
+
+        with patch.object(ElementSelector, "calculate_groups", side_effect=Exception), patch(
+            "posthog.tasks.calculate_element_selector.calculate_element_selector.retry", side_effect=Retry
+        ) as patch_retry:
+            with self.assertRaises(Retry):
+                calculate_element_selector(element_selector.pk)
+        patch_retry.assert_called_once()
+        self.assertIsNone(ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn"))
+
+        # Once the lock expired, the next use schedules the calculation again
+        cache.delete(_lock_key(element_selector.pk))
+        with patch("posthog.models.element_selector.transaction.on_commit", lambda callback: callback()), patch(
+            "posthog.tasks.calculate_element_selector.calculate_element_selector.delay"
+        ) as patch_delay:
+            ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+            ElementSelector.objects.get_calculated(self.team.pk, "div > a.btn")
+        patch_delay.assert_called_once_with(element_selector.pk)
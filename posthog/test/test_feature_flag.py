@@ -1,5 +1,7 @@
+from unittest.mock import patch
+
 from posthog.api.test.base import BaseTest
-from posthog.models import FeatureFlag, Person
+from posthog.models import Cohort, FeatureFlag, FeatureFlagMatcher, Person, get_active_feature_flags
 
 
 class TestFeatureFlag(BaseTest):
@@ -52,3 +54,58 @@ class TestFeatureFlag(BaseTest):
             self.assertTrue(feature_flag.distinct_id_matches("example_id"))
         self.assertFalse(feature_flag.distinct_id_matches("another_id"))
         self.assertFalse(feature_flag.distinct_id_matches("id_number_3"))
+
+    def test_matcher_loads_person_once(self):
+        user = self._create_user("tim")
+        Person.objects.create(
+            team=self.team, distinct_ids=["example_id"], properties={"email": "tim@posthog.com", "age": 30},
+        )
+        feature_flags = [
+            FeatureFlag.objects.create(
+                team=self.team, filters={"properties": properties}, name=key, key=key, created_by=user,
+            )
+            for key, properties in [
+                ("email", [{"key": "email", "value": "tim@posthog.com", "type": "person"}]),
+                ("older", [{"key": "age", "value": 40, "operator": "gt", "type": "person"}]),
+                ("posthog", [{"key": "email", "value": "posthog", "operator": "icontains", "type": "person"}]),
+            ]
+        ]
+
+        matcher = FeatureFlagMatcher(self.team.pk, "example_id")
+        with self.assertNumQueries(1):
+            self.assertEqual([matcher.matches(feature_flag) for feature_flag in feature_flags], [True, False, True])
+        with self.assertNumQueries(1):
+            self.assertFalse(FeatureFlagMatcher(self.team.pk, "another_id").matches(feature_flags[0]))
+
+    def test_cohort_filter(self):
+        user = self._create_user("tim")
+        person = Person.objects.create(team=self.team, distinct_ids=["example_id"])
+        Person.objects.create(team=self.team, distinct_ids=["another_id"])
+        cohort = Cohort.objects.create(team=self.team, groups=[])
+        cohort.people.add(person)
+        feature_flag = FeatureFlag.objects.create(
+            team=self.team,
+            filters={"properties": [{"key": "id", "value": cohort.pk, "type": "cohort"}]},
+            name="Beta feature",
+            key="beta-feature",
+            created_by=user,
+        )
+        self.assertTrue(feature_flag.distinct_id_matches("example_id"))
+        self.assertFalse(feature_flag.distinct_id_matches("another_id"))
+
+    def test_active_feature_flags_cache(self):
+        user = self._create_user("tim")
+        feature_flag = FeatureFlag.objects.create(team=self.team, name="Beta", key="beta", created_by=user)
+        FeatureFlag.objects.create(team=self.team, name="Old", key="old", created_by=user, deleted=True)
+
+        self.assertEqual([flag.key for flag in get_active_feature_flags(self.team.pk)], ["beta"])
+        with self.assertNumQueries(0):
+            get_active_feature_flags(self.team.pk)
+
+        feature_flag.active = False
+        with patch("posthog.models.feature_flag.transaction.on_commit") as on_commit:
+            feature_flag.save()
+        # Dropped from the cache once the change is committed
+        self.assertEqual([flag.key for flag in get_active_feature_flags(self.team.pk)], ["beta"])
+        on_commit.call_args[0][0]()
+        self.assertEqual(get_active_feature_flags(self.team.pk), [])
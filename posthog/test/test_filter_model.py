@@ -133,7 +133,7 @@ class TestPropertiesToQ(BaseTest):
             properties={"$current_url": "https://something.com"},
         )
         filter = Filter(data={"properties": [{"key": "group", "value": 1, "type": "person"}]})
-        events = Event.objects.add_person_id(self.team.pk).filter(filter.properties_to_Q(team_id=self.team.pk))
+        events = Event.objects.filter(filter.properties_to_Q(team_id=self.team.pk))
         self.assertEqual(events[0], event2)
         self.assertEqual(len(events), 1)
 
@@ -194,7 +194,7 @@ class TestPropertiesToQ(BaseTest):
                 ]
             }
         )
-        events = Event.objects.add_person_id(self.team.pk).filter(filter.properties_to_Q(team_id=self.team.pk))
+        events = Event.objects.filter(filter.properties_to_Q(team_id=self.team.pk))
         self.assertEqual(events[0], event1)
         self.assertEqual(len(events), 1)
 
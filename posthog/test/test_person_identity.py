@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from posthog.api.test.base import TransactionBaseTest
+from posthog.cache import redis_instance
+from posthog.models import Person, get_person_id, get_person_ids
+from posthog.models.person_identity import PERSON_ID_CACHE, _redis_key
+from posthog.tasks.process_event import process_event
+
+
+class TestPersonIdentity(TransactionBaseTest):
+    def _capture(self, distinct_id: str, data: dict) -> None:
+        process_event(
+            distinct_id,
+            "",
+            "",
+            {"properties": {"distinct_id": distinct_id, "token": self.team.api_token}, **data},
+            self.team.pk,
+            now().isoformat(),
+            now().isoformat(),
+        )
+
+    def test_get_person_ids(self):
+        person = Person.objects.create(team=self.team, distinct_ids=["1", "2"])
+        PERSON_ID_CACHE.clear()
+        redis_instance.flushdb()  # type: ignore
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_person_ids(self.team.pk, ["1", "2", "3"]), {"1": person.pk, "2": person.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_person_id(self.team.pk, "1"), person.pk)
+
+        PERSON_ID_CACHE.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_person_id(self.team.pk, "2"), person.pk)
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_person_id(self.team.pk, "3"))
+
+    @patch("posthog.models.person_identity.PERSON_ID_LOCAL_TTL_SECONDS", 0)
+    def test_local_copy_expires(self):
+        person = Person.objects.create(team=self.team, distinct_ids=["1"])
+        get_person_id(self.team.pk, "1")
+
+        with patch.object(redis_instance, "mget", wraps=redis_instance.mget) as redis_mget:  # type: ignore
+            self.assertEqual(get_person_id(self.team.pk, "1"), person.pk)
+            redis_mget.assert_called_once()
+
+    @patch("posthog.models.person.Person._repoint_events")
+    def test_alias_and_merge_update_cache(self, patch_repoint_events):
+        anonymous = Person.objects.create(team=self.team, distinct_ids=["anonymous_id"])
+        identified = Person.objects.create(team=self.team, distinct_ids=["new_distinct_id"])
+        self.assertEqual(get_person_id(self.team.pk, "anonymous_id"), anonymous.pk)
+
+        self._capture("new_distinct_id", {"event": "$identify", "properties": {"$anon_distinct_id": "anonymous_id"}})
+
+        self.assertEqual(get_person_id(self.team.pk, "anonymous_id"), identified.pk)
+        self._capture("new_distinct_id", {"event": "$create_alias", "properties": {"alias": "alias_id"}})
+        self.assertEqual(get_person_id(self.team.pk, "alias_id"), identified.pk)
+
+        identified.delete()
+        self.assertIsNone(get_person_id(self.team.pk, "anonymous_id"))
+        self.assertIsNone(get_person_id(self.team.pk, "new_distinct_id"))
+
+    def test_returning_person_skips_person_queries(self):
+        Person.objects.create(team=self.team, distinct_ids=["returning"])
+        self.team.ingested_event = True
+        self.team.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self._capture("returning", {"event": "$pageview"})
+
+        self.assertFalse([query for query in queries.captured_queries if "posthog_person" in query["sql"]])
+        self.assertEqual(Person.objects.count(), 1)
+
+    def test_stale_person_id(self):
+        person = Person.objects.create(team=self.team, distinct_ids=["1"])
+        get_person_id(self.team.pk, "1")
+        # Another process merges the person without this process hearing about it
+        other_person = Person.objects.create(team=self.team)
+        Person.objects.filter(pk=other_person.pk).update(properties={"merged": True})
+        person.persondistinctid_set.update(person=other_person)
+        Person.objects.filter(pk=person.pk).delete()
+
+        self._capture("1", {"event": "$identify", "$set": {"email": "someone@gmail.com"}})
+
+        self.assertEqual(Person.objects.get().properties, {"merged": True, "email": "someone@gmail.com"})
+        self.assertEqual(get_person_id(self.team.pk, "1"), other_person.pk)
+
+    def test_rolled_back_person_is_not_cached(self):
+        person = Person.objects.create(team=self.team, distinct_ids=["1"])
+        get_person_id(self.team.pk, "1")
+
+        with self.assertRaises(ValueError), patch("posthog.models.person.Person._repoint_events"):
+            with transaction.atomic():
+                person.add_distinct_id("2")
+                person.merge_people([Person.objects.create(team=self.team, distinct_ids=["3"])])
+                raise ValueError()
+
+        self.assertIsNone(redis_instance.get(_redis_key(self.team.pk, "2")))  # type: ignore
+        self.assertIsNone(get_person_id(self.team.pk, "2"))
+        self.assertIsNone(get_person_id(self.team.pk, "3"))
+        self.assertEqual(get_person_id(self.team.pk, "1"), person.pk)
@@ -45,6 +45,33 @@ class TestPerson(BaseTest):
             person0.created_at, datetime.datetime(2019, 7, 1, tzinfo=pytz.UTC),
         )  # oldest created_at is kept
 
+    def test_merge_people_query_count(self):
+        person = Person.objects.create(distinct_ids=["person"], team=self.team)
+        other_people = [
+            Person.objects.create(distinct_ids=["{}_{}".format(index, i) for i in range(20)], team=self.team)
+            for index in range(3)
+        ]
+        cohort = Cohort.objects.create(team=self.team, groups=[])
+        cohort.people.add(person, *other_people)
+
+        with self.assertNumQueries(11):
+            person.merge_people(other_people)
+
+        self.assertEqual(len(person.distinct_ids), 61)
+        self.assertEqual(list(cohort.people.all()), [person])
+        self.assertEqual(Person.objects.get(persondistinctid__distinct_id="2_19"), person)
+
+    def test_merge_into_deleted_person(self):
+        person = Person.objects.create(distinct_ids=["person"], team=self.team)
+        other_person = Person.objects.create(distinct_ids=["other_person"], team=self.team)
+        # Merged into someone else by another process
+        Person.objects.filter(pk=person.pk).delete()
+
+        with self.assertRaises(Person.DoesNotExist):
+            person.merge_people([other_person])
+
+        self.assertEqual(Person.objects.get(persondistinctid__distinct_id="other_person"), other_person)
+
     def test_person_is_identified(self):
         person_identified = Person.objects.create(team=self.team, is_identified=True)
         person_anonymous = Person.objects.create(team=self.team)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from posthog.api.test.base import BaseTest
+from posthog.models import PersonalAPIKey, Team
+
+
+class TestTeamCache(BaseTest):
+    @patch("posthog.models.team.TEAM_CACHE", {})
+    def test_get_team_from_token_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(Team.objects.get_team_from_token(self.team.api_token), self.team)
+        with self.assertNumQueries(0):
+            self.assertEqual(Team.objects.get_team_from_token(self.team.api_token), self.team)
+
+    @patch("posthog.models.team.TEAM_CACHE", {})
+    def test_cache_invalidated_on_save(self):
+        Team.objects.get_team_from_token(self.team.api_token)
+        self.team.session_recording_opt_in = True
+        self.team.save()
+
+        with self.assertNumQueries(1):
+            team = Team.objects.get_team_from_token(self.team.api_token)
+        assert team is not None
+        self.assertTrue(team.session_recording_opt_in)
+
+    @patch("posthog.models.team.TEAM_CACHE", {})
+    def test_cache_invalidated_on_token_change(self):
+        old_token = self.team.api_token
+        Team.objects.get_team_from_token(old_token)
+        self.team.api_token = "new_token"
+        self.team.save()
+
+        self.assertIsNone(Team.objects.get_team_from_token(old_token))
+        self.assertEqual(Team.objects.get_team_from_token("new_token"), self.team)
+
+    @patch("posthog.models.team.TEAM_CACHE_MAX_SIZE", 2)
+    @patch("posthog.models.team.TEAM_CACHE", {})
+    def test_cache_evicts_least_recently_used(self):
+        from posthog.models import team as team_module
+
+        team2 = Team.objects.create(api_token="token2")
+        team3 = Team.objects.create(api_token="token3")
+        Team.objects.get_team_from_token(self.team.api_token)
+        Team.objects.get_team_from_token(team2.api_token)
+        Team.objects.get_team_from_token(self.team.api_token)
+        Team.objects.get_team_from_token(team3.api_token)
+
+        self.assertListEqual(list(team_module.TEAM_CACHE.keys()), [self.team.api_token, team3.api_token])
+
+    @patch("posthog.models.team.TEAM_CACHE", {})
+    def test_personal_api_key_last_used_at_writes_are_coalesced(self):
+        key = PersonalAPIKey.objects.create(label="X", user=self.user, team=self.team)
+        self.assertEqual(Team.objects.get_team_from_token(key.value, is_personal_api_key=True), self.team)
+        key.refresh_from_db()
+        self.assertIsNotNone(key.last_used_at)
+
+        last_used_at = key.last_used_at
+        key.update_last_used_at()
+        key.refresh_from_db()
+        self.assertEqual(key.last_used_at, last_used_at)
+
+        PersonalAPIKey.objects.filter(pk=key.pk).update(last_used_at=timezone.now() - timedelta(hours=1))
+        key.refresh_from_db()
+        key.update_last_used_at()
+        key.refresh_from_db()
+        self.assertGreater(key.last_used_at, last_used_at)